@@ -0,0 +1,279 @@
+'''
+Benchmark de desempenho dos caminhos críticos de scripts/
+
+Gera entradas sintéticas (ADN aleatório, mutantes com substituições e indels, sequências
+alinhadas para a PWM) com tamanhos de 10^2 a 10^6 e mede, para cada caso e tamanho, o tempo
+(o melhor de várias repetições), o pico de memória (tracemalloc, numa execução à parte, porque
+torna as alocações mais lentas) e o débito (elementos por segundo: células da matriz nos
+alinhamentos, bases nos restantes casos). Cada caso tem um tamanho máximo e os tamanhos acima
+dele são ignorados: os alinhamentos são quadráticos e o nw_ciclico alinha todos os pares.
+
+Os resultados podem ser guardados em JSON e comparados com uma execução de referência. Um caso
+regride se o tempo ou o pico de memória crescerem mais do que a tolerância; nesse caso o
+programa termina com código 1.
+
+Utilização (a partir da raiz do repositório):
+
+    python -m benchmarks.desempenho --saida base.json
+    python -m benchmarks.desempenho --casos needleman_wunsch best_hit --tamanhos 100 1000
+    python -m benchmarks.desempenho --comparar base.json --saida atual.json
+    python -m benchmarks.desempenho --comparar base.json --atual atual.json
+'''
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from scripts.alinhamentos import needleman_wunsch_vetorizado, smith_waterman_vetorizado
+from scripts.auxiliares import complemento_inverso, procurar_orfs
+from scripts.blast import best_hit
+from scripts.composicao import perfil_gc
+from scripts.filogenia import nw_ciclico
+from scripts.kmers import contar_kmers
+from scripts.motifs import pwm
+
+TAMANHOS = [100, 1000, 10000, 100000, 1000000]
+
+# Aumento relativo do tempo e do pico de memória aceite na comparação com a referência
+TOLERANCIA_TEMPO   = 0.25
+TOLERANCIA_MEMORIA = 0.10
+
+# Abaixo destes valores as diferenças são ruído (tempo em segundos, memória em bytes)
+MINIMO_TEMPO   = 1e-3
+MINIMO_MEMORIA = 64 * 1024
+
+_BASES = np.frombuffer(b'ACGT', dtype = np.uint8)
+
+
+def gerar_dna(tamanho, rng):
+    ''' Gera uma sequência de ADN aleatória com o tamanho pedido '''
+    return _BASES[rng.integers(0, 4, tamanho)].tobytes().decode('ascii')
+
+
+def gerar_mutante(seq, taxa, rng):
+    ''' Devolve uma cópia da sequência com substituições, deleções e inserções, cada uma em taxa / 3 das posições '''
+    bases = np.frombuffer(seq.encode('ascii'), dtype = np.uint8)
+    sorteio = rng.random(len(bases))
+
+    bases = np.where(sorteio < taxa / 3, _BASES[rng.integers(0, 4, len(bases))], bases)
+    manter = (sorteio < taxa / 3) | (sorteio >= 2 * taxa / 3)
+    inserir = rng.random(len(bases)) < taxa / 3
+
+    # Cada posição dá a sua base (se não for apagada) seguida de uma base aleatória (se houver inserção)
+    pares = np.stack((bases, _BASES[rng.integers(0, 4, len(bases))]), axis = 1)
+    mascara = np.stack((manter, inserir), axis = 1)
+
+    return pares[mascara].tobytes().decode('ascii')
+
+
+def gerar_alinhadas(numero, largura, taxa, rng):
+    ''' Gera numero ocorrências de um motif de tamanho largura, com substituições numa fração taxa das posições '''
+    motif = rng.integers(0, 4, largura)
+    mutadas = np.where(rng.random((numero, largura)) < taxa, rng.integers(0, 4, (numero, largura)), motif)
+
+    return [linha.tobytes().decode('ascii') for linha in _BASES[mutadas]]
+
+
+# Cada caso recebe o tamanho e o gerador e devolve (função sem argumentos a medir, número de elementos)
+
+def _caso_needleman_wunsch(tamanho, rng):
+    seq_1 = gerar_dna(tamanho, rng)
+    seq_2 = gerar_mutante(seq_1, 0.1, rng)
+    return (lambda: needleman_wunsch_vetorizado(seq_1, seq_2)), len(seq_1) * len(seq_2)
+
+
+def _caso_smith_waterman(tamanho, rng):
+    seq_1 = gerar_dna(tamanho, rng)
+    seq_2 = gerar_mutante(seq_1[tamanho // 4 : 3 * tamanho // 4], 0.1, rng)
+    return (lambda: smith_waterman_vetorizado(seq_1, seq_2)), len(seq_1) * len(seq_2)
+
+
+def _caso_best_hit(tamanho, rng):
+    seq = gerar_dna(tamanho, rng)
+    inicio = tamanho // 2 - min(tamanho // 2, 500)
+    query = gerar_mutante(seq[inicio : inicio + 1000], 0.05, rng)
+    return (lambda: best_hit(query, seq, 11)), tamanho
+
+
+def _caso_pwm(tamanho, rng):
+    seqs = gerar_alinhadas(max(1, tamanho // 20), 20, 0.2, rng)
+    return (lambda: pwm(seqs, 0.1)), 20 * len(seqs)
+
+
+def _caso_complemento_inverso(tamanho, rng):
+    seq = gerar_dna(tamanho, rng)
+    return (lambda: complemento_inverso(seq)), tamanho
+
+
+def _caso_nw_ciclico(tamanho, rng):
+    base = gerar_dna(tamanho, rng)
+    sequencias = [(f'seq{i}', gerar_mutante(base, 0.1, rng)) for i in range(8)]
+    celulas = sum(len(a) * len(b) for i, (_, a) in enumerate(sequencias) for _, b in sequencias[i + 1:])
+    return (lambda: nw_ciclico(sequencias, 2, -4)), celulas
+
+
+def _caso_contar_kmers(tamanho, rng):
+    seq = gerar_dna(tamanho, rng)
+    return (lambda: contar_kmers(seq, 21)), tamanho
+
+
+def _caso_perfil_gc(tamanho, rng):
+    seq = gerar_dna(tamanho, rng)
+    return (lambda: perfil_gc(seq, 100, 1)), tamanho
+
+
+def _caso_procurar_orfs(tamanho, rng):
+    seq = gerar_dna(tamanho, rng)
+    return (lambda: sum(1 for _ in procurar_orfs(seq))), tamanho
+
+
+# nome : (preparação, tamanho máximo)
+CASOS = {
+    'needleman_wunsch'    : (_caso_needleman_wunsch,    10**4),
+    'smith_waterman'      : (_caso_smith_waterman,      10**4),
+    'best_hit'            : (_caso_best_hit,            10**6),
+    'pwm'                 : (_caso_pwm,                 10**6),
+    'complemento_inverso' : (_caso_complemento_inverso, 10**6),
+    'nw_ciclico'          : (_caso_nw_ciclico,          10**3),
+    'contar_kmers'        : (_caso_contar_kmers,        10**6),
+    'perfil_gc'           : (_caso_perfil_gc,           10**6),
+    'procurar_orfs'       : (_caso_procurar_orfs,       10**6),
+}
+
+
+def medir(caso, tamanho, rng, repeticoes):
+    ''' Mede um caso num tamanho e devolve o registo com tempo, pico de memória e débito '''
+    preparar, _ = CASOS[caso]
+    funcao, elementos = preparar(tamanho, rng)
+
+    # O tempo é medido sem o tracemalloc, que torna as alocações muito mais lentas
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tempo = min(tempos)
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'caso' : caso, 'tamanho' : tamanho, 'elementos' : elementos, 'tempo' : tempo,
+            'pico' : pico, 'debito' : elementos / tempo if tempo > 0 else float('inf')}
+
+
+def executar(casos, tamanhos, semente, repeticoes):
+    ''' Corre os casos em todos os tamanhos (até ao máximo de cada caso), imprimindo uma linha por medição '''
+    resultados = []
+
+    print(f"{'caso':<20} {'tamanho':>9} {'tempo (s)':>10} {'pico (MB)':>10} {'débito (/s)':>12}")
+
+    for caso in casos:
+        for tamanho in tamanhos:
+            if tamanho > CASOS[caso][1]:
+                print(f"{caso:<20} {tamanho:>9} {'ignorado (máximo ' + str(CASOS[caso][1]) + ')':>34}")
+                continue
+
+            # Cada medição tem o seu gerador, para que as entradas não dependam dos casos escolhidos
+            rng = np.random.default_rng([semente, tamanho])
+            registo = medir(caso, tamanho, rng, repeticoes)
+            resultados.append(registo)
+
+            print(f"{caso:<20} {tamanho:>9} {registo['tempo']:>10.4f} {registo['pico'] / 2**20:>10.2f} {registo['debito']:>12.3g}")
+
+    return resultados
+
+
+def comparar(referencia, atual, tolerancia_tempo = TOLERANCIA_TEMPO, tolerancia_memoria = TOLERANCIA_MEMORIA):
+    '''
+    Compara duas listas de resultados pelo par (caso, tamanho) e imprime a variação de cada medida
+
+    Devolve a lista de regressões, tuplos (caso, tamanho, medida, referência, atual)
+    '''
+    anteriores = {(r['caso'], r['tamanho']) : r for r in referencia}
+    regressoes = []
+
+    print(f"\n{'caso':<20} {'tamanho':>9} {'tempo':>9} {'memória':>9}")
+
+    for registo in atual:
+        chave = (registo['caso'], registo['tamanho'])
+        if chave not in anteriores:
+            print(f"{chave[0]:<20} {chave[1]:>9} {'sem referência':>19}")
+            continue
+
+        anterior = anteriores[chave]
+        estado = []
+
+        for medida, tolerancia, minimo in (('tempo', tolerancia_tempo, MINIMO_TEMPO), ('pico', tolerancia_memoria, MINIMO_MEMORIA)):
+            antes, depois = anterior[medida], registo[medida]
+            if depois > max(antes, minimo) * (1 + tolerancia):
+                regressoes.append((*chave, medida, antes, depois))
+                estado.append(medida)
+
+        variacao = lambda medida: f"{(registo[medida] / anterior[medida] - 1) * 100:+.0f}%" if anterior[medida] else 'n/a'
+        alerta = '  REGRESSÃO (' + ', '.join(estado) + ')' if estado else ''
+
+        print(f"{chave[0]:<20} {chave[1]:>9} {variacao('tempo'):>9} {variacao('pico'):>9}{alerta}")
+
+    return regressoes
+
+
+def _ler(caminho):
+    with open(caminho, encoding = 'utf-8') as ficheiro:
+        return json.load(ficheiro)['resultados']
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--casos', nargs = '+', choices = list(CASOS), default = list(CASOS))
+    parser.add_argument('--tamanhos', type = int, nargs = '+', default = TAMANHOS)
+    parser.add_argument('--repeticoes', type = int, default = 3)
+    parser.add_argument('--semente', type = int, default = 0)
+    parser.add_argument('--saida', help = 'ficheiro JSON onde guardar os resultados')
+    parser.add_argument('--comparar', metavar = 'REFERENCIA', help = 'ficheiro JSON de referência')
+    parser.add_argument('--atual', help = 'compara este ficheiro JSON com a referência em vez de correr o benchmark')
+    parser.add_argument('--tolerancia-tempo', type = float, default = TOLERANCIA_TEMPO)
+    parser.add_argument('--tolerancia-memoria', type = float, default = TOLERANCIA_MEMORIA)
+    args = parser.parse_args(argv)
+
+    if args.atual and not args.comparar:
+        parser.error('--atual exige --comparar')
+
+    if args.repeticoes < 1:
+        parser.error('--repeticoes deve ser pelo menos 1')
+
+    if args.atual:
+        resultados = _ler(args.atual)
+    else:
+        resultados = executar(args.casos, args.tamanhos, args.semente, args.repeticoes)
+
+    if args.saida:
+        meta = {'python' : platform.python_version(), 'numpy' : np.__version__, 'plataforma' : platform.platform(),
+                'data' : datetime.datetime.now().isoformat(timespec = 'seconds'),
+                'semente' : args.semente, 'repeticoes' : args.repeticoes}
+
+        with open(args.saida, 'w', encoding = 'utf-8') as ficheiro:
+            json.dump({'meta' : meta, 'resultados' : resultados}, ficheiro, indent = 2)
+
+    if not args.comparar:
+        return 0
+
+    regressoes = comparar(_ler(args.comparar), resultados, args.tolerancia_tempo, args.tolerancia_memoria)
+
+    for caso, tamanho, medida, antes, depois in regressoes:
+        print(f"Regressão: {caso} ({tamanho}) {medida} {antes:.4g} -> {depois:.4g}")
+
+    print(f"\n{len(regressoes)} regressões" if regressoes else "\nSem regressões")
+
+    return 1 if regressoes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+'''
+Benchmark de memória do alinhamento global Hirschberg
+
+Alinha pares de sequências aleatórias de tamanho crescente e mede o pico de memória com o
+tracemalloc (o NumPy regista as suas alocações no tracemalloc). Falha se o pico ultrapassar
+o teto linear BYTES_POR_BASE * (n + m) + MARGEM, o que não acontece com a matriz completa.
+
+Utilização (a partir da raiz do repositório):
+
+    python -m benchmarks.memoria_hirschberg --tamanhos 1000 10000 100000
+'''
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+from scripts.alinhamentos import hirschberg, LIMITE_HIRSCHBERG
+
+BYTES_POR_BASE = 256
+MARGEM         = 4 * LIMITE_HIRSCHBERG + (1 << 20)
+
+
+def seq_aleatoria(tamanho, rng):
+    ''' Gera uma sequência de ADN aleatória com o tamanho pedido '''
+    return ''.join(rng.choice('ACGT') for _ in range(tamanho))
+
+
+def mutar(seq, taxa, rng):
+    ''' Devolve uma cópia da sequência com substituições e indels numa fração taxa das posições '''
+    resultado = []
+    for base in seq:
+        sorteio = rng.random()
+        if sorteio < taxa / 3:
+            continue                                   # deleção
+        elif sorteio < 2 * taxa / 3:
+            resultado.append(rng.choice('ACGT'))       # substituição
+        else:
+            resultado.append(base)
+        if rng.random() < taxa / 3:
+            resultado.append(rng.choice('ACGT'))       # inserção
+    return ''.join(resultado)
+
+
+def medir(tamanho, rng):
+    ''' Alinha um par de sequências e devolve (tempo, pico de memória, teto) '''
+    seq_1 = seq_aleatoria(tamanho, rng)
+    seq_2 = mutar(seq_1, 0.1, rng)
+
+    # O tempo é medido sem o tracemalloc, que torna as alocações muito mais lentas
+    inicio = time.perf_counter()
+    hirschberg(seq_1, seq_2)
+    tempo = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    hirschberg(seq_1, seq_2)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    teto = BYTES_POR_BASE * (len(seq_1) + len(seq_2)) + MARGEM
+
+    return tempo, pico, teto
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type = int, nargs = '+', default = [1000, 5000, 10000])
+    parser.add_argument('--semente', type = int, default = 0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.semente)
+    excedidos = 0
+
+    print(f"{'tamanho':>10} {'tempo (s)':>10} {'pico (MB)':>10} {'teto (MB)':>10} {'matriz (MB)':>12}")
+
+    for tamanho in args.tamanhos:
+        tempo, pico, teto = medir(tamanho, rng)
+        matriz = (tamanho + 1) ** 2 / 2**20            # traceback int8 completa
+        estado = '' if pico <= teto else '  EXCEDIDO'
+        excedidos += pico > teto
+        print(f'{tamanho:>10} {tempo:>10.2f} {pico / 2**20:>10.2f} {teto / 2**20:>10.2f} {matriz:>12.1f}{estado}')
+
+    return 1 if excedidos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def score_subst(ele_string_1, ele_string_2, equal = 2, subst = -1, g = -4):
   '''Função que compara um elemento das sequências e calcula a pontuação
 
@@ -16,11 +19,14 @@ def score_subst(ele_string_1, ele_string_2, equal = 2, subst = -1, g = -4):
       return subst
   
   
-def reconstroi(string_1, string_2, score, matriz_traceback, algoritmo):
+def reconstroi(string_1, string_2, score, matriz_traceback, algoritmo, imprimir = True, coords = None):
   '''
 
   Função que reconstroi a sequência alinhada em função do algoritmo selecionado (NW ou SW)
 
+  Os elementos são acrescentados a listas, que são invertidas uma única vez no fim. Para um
+  resultado estruturado e sem impressão ver alinhamento_traceback.
+
   Parameteres
   -----------
 
@@ -34,6 +40,13 @@ def reconstroi(string_1, string_2, score, matriz_traceback, algoritmo):
     lista de listas correspondente a uma matriz com direções para percorrer as strings
     e reconstruir os alinhamentos
 
+  imprimir : bool
+    se True (por omissão) imprime as strings alinhadas
+
+  coords : tuple, opcional
+    no SW, coordenadas (linha, coluna) do score máximo registadas durante o preenchimento;
+    se None são procuradas na matriz score com max_score_loc
+
   Returns
   -------
 
@@ -42,9 +55,9 @@ def reconstroi(string_1, string_2, score, matriz_traceback, algoritmo):
   
   '''
   
-  # Iniciamos as variáveis-resultado
-  string_1_alinhada = ''
-  string_2_alinhada = ''
+  # Iniciamos as variáveis-resultado (construídas de trás para a frente)
+  string_1_alinhada = []
+  string_2_alinhada = []
   
   if algoritmo == 'nw':
     # Criamos os contador para iterar, que nos devolverá o último elemento de cada string
@@ -55,111 +68,265 @@ def reconstroi(string_1, string_2, score, matriz_traceback, algoritmo):
     # Itera pela matriz traceback e em função da direção calculada determina a posição e o elemento a atribuir.
     
     while matriz_traceback[linhas][colunas] != 0:
-      # print(linhas, colunas, string_2[linhas], string_1[colunas], matriz_traceback[linhas][colunas])
 
       # Se na matriz andarmos na diagonal significa que os elementos são iguais, então saltam para o alinhamento
       if matriz_traceback[linhas][colunas] == 'D':
-        string_1_alinhada = string_1[colunas] + string_1_alinhada  # De notar que adicionamos sempre a string alinhada no fim 
-        string_2_alinhada = string_2[linhas]  + string_2_alinhada  # pois estamos a construí-la de trás para a frente
+        string_1_alinhada.append(string_1[colunas])
+        string_2_alinhada.append(string_2[linhas])
 
         linhas  -= 1                                               # Subtraímos 1 a linhas e colunas para avançar para percorrer
         colunas -= 1                                               # mais um nível na nossa matriz traceback
 
       # Se na matriz andarmos para cima, significa que não são iguais e conservamos o elemento da segunda string
       elif matriz_traceback[linhas][colunas] == 'C':
-        string_1_alinhada = '-'              + string_1_alinhada
-        string_2_alinhada = string_2[linhas] + string_2_alinhada
+        string_1_alinhada.append('-')
+        string_2_alinhada.append(string_2[linhas])
 
         linhas  -= 1                                              # Como andamos para cima só avançamos nas linhas
 
       # Se na matriz andarmos para a esquerda, significa que não são iguais e conservamos o elemento da primeira string
       elif matriz_traceback[linhas][colunas] == 'E':
-        string_1_alinhada = string_1[colunas] + string_1_alinhada
-        string_2_alinhada = '-'               + string_2_alinhada
+        string_1_alinhada.append(string_1[colunas])
+        string_2_alinhada.append('-')
 
         colunas -= 1                                               # Como andamos para a esquerda só avançamos nas colunas
 
   elif algoritmo == 'sw':
-    coord_string_1, coord_string_2 = max_score_loc(score)
+    coord_string_1, coord_string_2 = max_score_loc(score) if coords is None else coords
 
     # i = linha (s2)
     # j = coluna (s1)
 
-#    s1 = '-' + s1
-#    s2 = '-' + s2
-#    print(coord_string_2,coord_string_1,s1[coord_string_2],s2[coord_string_1])
     while coord_string_1 > 0 and coord_string_2 > 0:
 
         if matriz_traceback[coord_string_1][coord_string_2] == 'D':
-            string_1_alinhada = string_1[coord_string_2] + string_1_alinhada
-            string_2_alinhada = string_2[coord_string_1] + string_2_alinhada
-
-            coord_string_1 -= 1
-            coord_string_2 -= 1
+            string_1_alinhada.append(string_1[coord_string_2])
+            string_2_alinhada.append(string_2[coord_string_1])
 
         elif matriz_traceback[coord_string_1][coord_string_2] == 'C':
-            string_1_alinhada = '-' + string_1_alinhada
-            string_2_alinhada = string_2[coord_string_1] + string_2_alinhada
-
-            coord_string_1 -= 1
-            coord_string_2 -= 1
+            string_1_alinhada.append('-')
+            string_2_alinhada.append(string_2[coord_string_1])
 
         elif matriz_traceback[coord_string_1][coord_string_2] == 'E':
-            string_1_alinhada = string_1[coord_string_2] + string_1_alinhada
-            string_2_alinhada = '-' + string_2_alinhada
-
-            coord_string_1 -= 1
-            coord_string_2 -= 1
+            string_1_alinhada.append(string_1[coord_string_2])
+            string_2_alinhada.append('-')
         
         elif matriz_traceback[coord_string_1][coord_string_2] == 0:
-            string_1_alinhada = '-' + string_1_alinhada
-            string_2_alinhada = '-' + string_2_alinhada
+            string_1_alinhada.append('-')
+            string_2_alinhada.append('-')
 
-            coord_string_1 -= 1
-            coord_string_2 -= 1
+        coord_string_1 -= 1
+        coord_string_2 -= 1
   
   else: raise ValueError("Algoritmo inválido - escolher entre Needleman-Wunch (NW) ou Smith-Waterman (SW)")
-     
-  print()
-  print(string_1_alinhada, string_2_alinhada, sep = "\n")        # Imprimimos as nossas strings alinhadas em linhas separadas
+
+  string_1_alinhada = ''.join(reversed(string_1_alinhada))
+  string_2_alinhada = ''.join(reversed(string_2_alinhada))
+
+  if imprimir:
+    print()
+    print(string_1_alinhada, string_2_alinhada, sep = "\n")      # Imprimimos as nossas strings alinhadas em linhas separadas
 
   return (string_1_alinhada, string_2_alinhada)                  # Obtemos as strings alinhadas reconstruídas para uso futuro
 
-def print_matrix(primeira_string : str, segunda_string : str, matriz_scores : list):
-  '''
-  Função usada para imprimir a matriz corretamente formatada
 
-  S1 -> primeira string
-  S2 -> segunda string
-  M  -> matriz
+class Alinhamento:
+  '''
+  Resultado estruturado de um alinhamento de pares, sem qualquer impressão
 
+  As coordenadas são posições nas sequências originais (a começar em 0, fim exclusivo):
+  string_1[inicio_1:fim_1] e string_2[inicio_2:fim_2] são as regiões alinhadas. O CIGAR toma
+  string_1 como referência: M para pares de resíduos, I para resíduos só de string_2 e D
+  para resíduos só de string_1. Iterar sobre o alinhamento dá as duas strings alinhadas,
+  como o tuplo devolvido por reconstroi.
   '''
+  __slots__ = ('score', 'alinhada_1', 'alinhada_2', 'inicio_1', 'fim_1', 'inicio_2', 'fim_2')
+
+  def __init__(self, score, alinhada_1, alinhada_2, fim_1, fim_2):
+    self.score = score
+    self.alinhada_1, self.alinhada_2 = alinhada_1, alinhada_2
+    self.fim_1, self.fim_2 = fim_1, fim_2
+    self.inicio_1 = fim_1 - (len(alinhada_1) - alinhada_1.count('-'))
+    self.inicio_2 = fim_2 - (len(alinhada_2) - alinhada_2.count('-'))
+
+  def __iter__(self):
+    return iter((self.alinhada_1, self.alinhada_2))
+
+  def __repr__(self):
+    return (f"Alinhamento(score={self.score}, cigar={self.cigar()!r}, "
+            f"string_1[{self.inicio_1}:{self.fim_1}], string_2[{self.inicio_2}:{self.fim_2}])")
+
+  @property
+  def comprimento(self):
+    '''Número de colunas do alinhamento'''
+    return len(self.alinhada_1)
+
+  @property
+  def matches(self):
+    '''Número de colunas com o mesmo resíduo nas duas strings'''
+    return sum(1 for a, b in zip(self.alinhada_1, self.alinhada_2) if a == b and a != '-')
+
+  @property
+  def identidade(self):
+    '''Fração das colunas do alinhamento que são matches (0 se o alinhamento for vazio)'''
+    return self.matches / self.comprimento if self.comprimento else 0.0
+
+  def cigar(self, estendido = False):
+    '''
+    String CIGAR do alinhamento; com estendido = True os pares são = (match) ou X (mismatch)
+    '''
+    operacoes = []
+
+    for a, b in zip(self.alinhada_1, self.alinhada_2):
+      if a == '-':
+        operacoes.append('I')
+      elif b == '-':
+        operacoes.append('D')
+      elif estendido:
+        operacoes.append('=' if a == b else 'X')
+      else:
+        operacoes.append('M')
+
+    partes, anterior, contagem = [], None, 0
+
+    for operacao in operacoes + [None]:
+      if operacao == anterior:
+        contagem += 1
+        continue
+
+      if anterior is not None:
+        partes.append(f"{contagem}{anterior}")
+      anterior, contagem = operacao, 1
+
+    return ''.join(partes)
+
+  def formatar(self, largura = 60):
+    '''
+    Texto do alinhamento em blocos de largura colunas, com uma linha de | nos matches
+    '''
+    meio = ''.join('|' if a == b and a != '-' else ' ' for a, b in zip(self.alinhada_1, self.alinhada_2))
+    blocos = []
+
+    for inicio in range(0, self.comprimento, largura):
+      blocos.append('\n'.join((self.alinhada_1[inicio:inicio + largura], meio[inicio:inicio + largura],
+                               self.alinhada_2[inicio:inicio + largura])))
+
+    return '\n\n'.join(blocos)
 
+  def imprimir(self, largura = 60):
+    '''Imprime o alinhamento (apenas para depuração)'''
+    print(self.formatar(largura))
+
+
+def alinhamento_traceback(string_1, string_2, matriz_traceback, algoritmo, score = None, coords = None):
   '''
-  Começamos por construir e formatadar a nossa linha de colunas.
+  Reconstroi um alinhamento a partir de uma matriz traceback em listas de listas ('D', 'E', 'C'
+  e 0, com as strings começadas por '-', como no notebook) e devolve um Alinhamento, sem imprimir
 
-  Para isso convertemos a string 1, correspondente às colunas, em lista e iteramos elemento a elemento.
+  No NW parte da última célula; no SW parte de coords, o máximo registado durante o
+  preenchimento (ou, se não for dado, do primeiro máximo da matriz score) e termina na
+  primeira célula com direção 0.
 
-  Usamos operador * para fazer unpack da lista, carater a carater. Desta forma não imprime a lista como um todo. 
-  Neste caso usamos definimos o parâmetro sep da função print, indicando 2 espaços em branco para espaçar melhor a nossa linha de colunas.
-  
+  Parameters
+  ----------
+  string_1, string_2 : str
+    strings da matriz (colunas e linhas), começadas por '-'
+
+  matriz_traceback : list
+    lista de listas com as direções
+
+  algoritmo : str
+    'nw' ou 'sw'
+
+  score : int ou list, opcional
+    score do alinhamento, ou a matriz score (de onde se tira o score e, no SW, o máximo)
+
+  coords : tuple, opcional
+    coordenadas (linha, coluna) de onde parte a reconstrução
+
+  Returns
+  -------
+  Alinhamento
+
+  Raises
+  ------
+  ValueError
+    se o algoritmo for inválido
   '''
-  
-  print(*list(" " + primeira_string), sep = '   ')
+  if algoritmo not in ('nw', 'sw'):
+    raise ValueError("Algoritmo inválido - escolher entre Needleman-Wunch (NW) ou Smith-Waterman (SW)")
+
+  matriz_score = score if isinstance(score, list) else None
+
+  if coords is None:
+    if algoritmo == 'nw':
+      coords = (len(string_2) - 1, len(string_1) - 1)
+    else:
+      coords = max_score_loc(matriz_score)
+
+  linha, coluna = coords
+  fim_2, fim_1 = linha, coluna
+  alinhada_1, alinhada_2 = [], []
+
+  while True:
+    direcao = matriz_traceback[linha][coluna]
+
+    if direcao == 'D':
+      alinhada_1.append(string_1[coluna])
+      alinhada_2.append(string_2[linha])
+      linha, coluna = linha - 1, coluna - 1
+
+    elif direcao == 'E':
+      alinhada_1.append(string_1[coluna])
+      alinhada_2.append('-')
+      coluna -= 1
+
+    elif direcao == 'C':
+      alinhada_1.append('-')
+      alinhada_2.append(string_2[linha])
+      linha -= 1
+
+    else:
+      break
 
+  if matriz_score is not None:
+    score = matriz_score[fim_2][fim_1]
+
+  return Alinhamento(score, ''.join(reversed(alinhada_1)), ''.join(reversed(alinhada_2)), fim_1, fim_2)
+
+
+def formatar_matriz(primeira_string : str, segunda_string : str, matriz_scores : list) -> str:
   '''
-  Formatamos o conteúdo da nossa coluna de linhas e respetivo conteúdo das linhas.
+  Devolve o texto da matriz formatada (o mesmo que print_matrix imprime), sem imprimir
 
-  Para isto usamos um ciclo for que irá iterar por cada elemento do emparelhamento da nossa segunda string e a matriz de scores obtida.
+  S1 -> primeira string
+  S2 -> segunda string
+  M  -> matriz
 
   '''
 
+  # Linha de colunas: cada caracter da primeira string separado por 3 espaços
+  linhas = ['   '.join(" " + primeira_string)]
+
+  # Cada linha começa pelo elemento da segunda string, seguido do conteúdo formatado
   for linha, conteudo_linha in zip(segunda_string, matriz_scores):
-    #print('linha', linha)
-    conteudo_formatado = [formatar(conteudo) for conteudo in conteudo_linha]
-    print(linha, *conteudo_formatado)
+    linhas.append(' '.join([linha] + [str(formatar(conteudo)) for conteudo in conteudo_linha]))
 
-  print()       # Adicionamos um alinha em branco para separar do conteúdo seguinte.
+  return '\n'.join(linhas) + '\n'
+
+
+def print_matrix(primeira_string : str, segunda_string : str, matriz_scores : list):
+  '''
+  Função usada para imprimir a matriz corretamente formatada (renderizador de depuração;
+  o texto é construído por formatar_matriz)
+
+  S1 -> primeira string
+  S2 -> segunda string
+  M  -> matriz
+
+  '''
+
+  print(formatar_matriz(primeira_string, segunda_string, matriz_scores))
 
 def formatar(conteudo):
 
@@ -191,15 +358,1116 @@ def formatar(conteudo):
     
 
 def max_score_loc(scr):
-    '''Função que encontra as coordenadas do valor mais alto da matrix score.'''
+    '''Função que encontra as coordenadas do valor mais alto da matrix score (a primeira, em caso de empate).'''
 
-    ms = scr[0][0]
-    mi,mj = 0,0
-    for linha in range(len(scr)): # itera por cada linha
-    
-        for coluna in range(len(scr[linha])): # itera por cada item de cada linha 
-            if scr[linha][coluna] > ms:
-                ms = scr[linha][coluna] # regista o maior
-                mi,mj = linha,coluna # regista as coordenadas
-    
-    return mi,mj
\ No newline at end of file
+    # argmax devolve a primeira ocorrência do máximo, percorrendo a matriz linha a linha
+    matriz = np.asarray(scr)
+    mi, mj = np.unravel_index(int(np.argmax(matriz)), matriz.shape)
+
+    return int(mi), int(mj)
+
+
+##################################
+#   Motor vetorizado (NumPy)     #
+##################################
+
+# Códigos da matriz traceback compacta (int8). Equivalem às direções 0, 'D', 'E' e 'C'
+# usadas na matriz traceback em listas de listas.
+TB_NADA = 0
+TB_DIAG = 1
+TB_ESQ  = 2
+TB_CIMA = 3
+
+
+def codificar_seq(seq):
+  '''
+  Codifica uma sequência num array uint8 com os códigos ASCII de cada elemento
+
+  Parâmetros
+  ----------
+  seq : str, VistaSequencia ou PackedSeq
+    sequência a codificar (é aprimorada antes de ser codificada)
+
+  Returns
+  -------
+  numpy.ndarray
+    array uint8 com um elemento por base
+  '''
+  from scripts.auxiliares import aprimorar_seq, _e_vista, _normalizar_bytes
+
+  # Vistas e sequências compactas são lidas diretamente em bytes, sem passar por str
+  if _e_vista(seq):
+    return np.frombuffer(_normalizar_bytes(seq), dtype = np.uint8)
+
+  return np.frombuffer(aprimorar_seq(seq).encode('ascii'), dtype = np.uint8)
+
+
+def _linha_score(anterior, cod_1, base_2, inicio, desl, equal, subst, score_space, local):
+  '''
+  Calcula uma linha da matriz score a partir da linha anterior, com operações vetoriais
+
+  Returns
+  -------
+  tuple
+    linha de scores (int32) e valores vindos da diagonal (para as colunas 1..m)
+  '''
+
+  subs = np.where(cod_1 == base_2, equal, subst).astype(np.int32)
+
+  return _linha_subs(anterior, subs, inicio, desl, score_space, local)
+
+
+def _linha_subs(anterior, subs, inicio, desl, espaco_cima, local):
+  '''
+  Calcula uma linha da matriz score dados os scores de substituição de cada coluna
+
+  A diagonal e o valor de cima dependem apenas da linha anterior. A dependência à esquerda
+  (H[j] = max(V[j], H[j-1] + g_j)) é resolvida com um máximo acumulado:
+  H[j] = G[j] + max_{k <= j}(V[k] - G[k]), em que desl = G é a soma acumulada das penalidades
+  dos espaços (j*g quando a penalidade é constante).
+  '''
+
+  diag = anterior[:-1] + subs
+  cima = anterior[1:]  + espaco_cima
+
+  melhor = np.empty_like(anterior)
+  melhor[0] = inicio
+  np.maximum(diag, cima, out = melhor[1:])
+
+  if local:
+    np.maximum(melhor, 0, out = melhor)
+
+  linha = np.maximum.accumulate(melhor - desl) + desl
+
+  return linha, diag
+
+
+def _direcoes(linha, diag, score_space, local):
+  '''
+  Converte uma linha de scores nas direções da matriz traceback (int8)
+
+  A ordem das atribuições dá a mesma prioridade que escolhas.index(valor) com "DEC". A
+  penalidade score_space pode ser um array com a penalidade de cada coluna 1..m.
+  '''
+
+  direcoes = np.full(len(linha), TB_CIMA, dtype = np.int8)
+  direcoes[1:][linha[1:] == linha[:-1] + score_space] = TB_ESQ
+  direcoes[1:][linha[1:] == diag] = TB_DIAG
+
+  if local:
+    direcoes[linha == 0] = TB_NADA
+
+  return direcoes
+
+
+def _preencher(cod_1, cod_2, equal, subst, score_space, local):
+  '''
+  Preenche a matriz traceback (int8) linha a linha, guardando apenas duas linhas de score (int32)
+
+  Returns
+  -------
+  tuple
+    matriz traceback, score final e coordenadas (linha, coluna) de onde parte a reconstrução
+  '''
+
+  nlins, ncols = len(cod_2) + 1, len(cod_1) + 1
+
+  matriz_traceback = np.zeros((nlins, ncols), dtype = np.int8)
+  desl = np.arange(ncols, dtype = np.int32) * np.int32(score_space)
+
+  if local:
+    linha = np.zeros(ncols, dtype = np.int32)
+  else:
+    linha = desl.copy()
+    matriz_traceback[0, 1:] = TB_ESQ
+
+  # No SW o máximo é registado durante o preenchimento (equivalente ao max_score_loc)
+  max_score, coords = 0, (0, 0)
+
+  for posicao_linha in range(1, nlins):
+    inicio = 0 if local else posicao_linha * score_space
+
+    linha, diag = _linha_score(linha, cod_1, cod_2[posicao_linha - 1], inicio, desl, equal, subst, score_space, local)
+    matriz_traceback[posicao_linha] = _direcoes(linha, diag, score_space, local)
+
+    if local:
+      posicao_coluna = int(np.argmax(linha))
+      if linha[posicao_coluna] > max_score:
+        max_score, coords = int(linha[posicao_coluna]), (posicao_linha, posicao_coluna)
+
+  if local:
+    return matriz_traceback, max_score, coords
+
+  return matriz_traceback, int(linha[-1]), (nlins - 1, ncols - 1)
+
+
+def _reconstroi_vetorizado(string_1, string_2, matriz_traceback, linha, coluna):
+  '''
+  Reconstroi o alinhamento a partir da matriz traceback compacta
+
+  Acrescenta os elementos a listas e inverte-as uma única vez no fim, em vez de concatenar
+  strings pela frente a cada passo.
+  '''
+
+  alinhada_1, alinhada_2 = [], []
+
+  while True:
+    direcao = matriz_traceback[linha, coluna]
+
+    if direcao == TB_DIAG:
+      alinhada_1.append(string_1[coluna - 1])
+      alinhada_2.append(string_2[linha - 1])
+      linha  -= 1
+      coluna -= 1
+
+    elif direcao == TB_ESQ:
+      alinhada_1.append(string_1[coluna - 1])
+      alinhada_2.append('-')
+      coluna -= 1
+
+    elif direcao == TB_CIMA:
+      alinhada_1.append('-')
+      alinhada_2.append(string_2[linha - 1])
+      linha -= 1
+
+    else:
+      break
+
+  return ''.join(reversed(alinhada_1)), ''.join(reversed(alinhada_2))
+
+
+def needleman_wunsch_vetorizado(string_1 : str, string_2 : str, equal = 2, subst = -1, score_space : int = -4, estruturado = False) -> tuple:
+  '''
+  Alinhamento global Needleman-Wunsch com matrizes NumPy
+
+  Cada linha da matriz score é calculada com operações vetoriais e a matriz traceback é
+  guardada em int8. Devolve o mesmo resultado que o needleman_wunsch do notebook, sem imprimir
+  as matrizes.
+
+  Parameters
+  ----------
+  string_1 : str
+    primeira string (colunas da matriz)
+
+  string_2 : str
+    segunda string (linhas da matriz)
+
+  equal : int
+    score atribuído a elementos iguais
+
+  subst : int
+    score atribuído a uma substituição
+
+  score_space : int
+    valor penalidade atribuido a espaços vazios
+
+  estruturado : bool
+    se True devolve um Alinhamento (com score, CIGAR, identidade e coordenadas)
+
+  Returns
+  -------
+  tuple
+    devolve um tuplo com o score do melhor alinhamento possível e o respetivo alinhamento
+  '''
+  from scripts.auxiliares import validar_dna, aprimorar_seq
+
+  assert validar_dna(string_1) and validar_dna(string_2)
+
+  string_1 = aprimorar_seq(string_1)
+  string_2 = aprimorar_seq(string_2)
+
+  matriz_traceback, score, (linha, coluna) = _preencher(codificar_seq(string_1), codificar_seq(string_2),
+                                                        equal, subst, score_space, local = False)
+
+  alinhadas = _reconstroi_vetorizado(string_1, string_2, matriz_traceback, linha, coluna)
+
+  if estruturado:
+    return Alinhamento(score, *alinhadas, coluna, linha)
+
+  return score, alinhadas
+
+
+def smith_waterman_vetorizado(string_1 : str, string_2 : str, equal = 1, subst = -1, score_space : int = -4, estruturado = False) -> tuple:
+  '''
+  Alinhamento local Smith-Waterman com matrizes NumPy
+
+  O score máximo e a sua posição são registados durante o preenchimento, pelo que não é
+  necessário percorrer a matriz score no fim. A reconstrução termina na primeira célula com
+  score 0.
+
+  Parameters
+  ----------
+  string_1 : str
+    primeira string (colunas da matriz)
+
+  string_2 : str
+    segunda string (linhas da matriz)
+
+  equal : int
+    score atribuído a elementos iguais
+
+  subst : int
+    score atribuído a uma substituição
+
+  score_space : int
+    valor penalidade atribuido a espaços vazios
+
+  estruturado : bool
+    se True devolve um Alinhamento (com score, CIGAR, identidade e coordenadas)
+
+  Returns
+  -------
+  tuple
+    devolve um tuplo com o score do melhor alinhamento local e o respetivo alinhamento
+  '''
+  from scripts.auxiliares import validar_dna, aprimorar_seq
+
+  assert validar_dna(string_1) and validar_dna(string_2)
+
+  string_1 = aprimorar_seq(string_1)
+  string_2 = aprimorar_seq(string_2)
+
+  matriz_traceback, max_score, (linha, coluna) = _preencher(codificar_seq(string_1), codificar_seq(string_2),
+                                                            equal, subst, score_space, local = True)
+
+  alinhadas = _reconstroi_vetorizado(string_1, string_2, matriz_traceback, linha, coluna)
+
+  if estruturado:
+    return Alinhamento(max_score, *alinhadas, coluna, linha)
+
+  return max_score, alinhadas
+
+
+##################################
+#   Hirschberg (memória linear)  #
+##################################
+
+# Abaixo deste número de células o bloco é alinhado com a matriz traceback completa
+LIMITE_HIRSCHBERG = 1 << 16
+
+
+def _propagar_esquerda(valores, fixos):
+  '''
+  Copia para cada posição não fixa o valor da posição fixa mais próxima à sua esquerda
+
+  Usado para seguir cadeias de movimentos 'E' numa linha sem ciclos em Python.
+  A posição 0 tem de ser fixa.
+  '''
+
+  indices = np.where(fixos, np.arange(len(valores)), 0)
+  np.maximum.accumulate(indices, out = indices)
+
+  return valores[indices]
+
+
+def _coluna_saida(cod_1, cod_2, meio, equal, subst, score_space):
+  '''
+  Devolve o score final e a coluna em que o traceback a partir do canto inferior direito
+  sai da linha meio (a célula mais à esquerda do caminho nessa linha)
+
+  Para cada célula das linhas >= meio guarda-se a coluna de saída do caminho de traceback
+  que parte dessa célula, propagada a partir do antecessor escolhido (D, E ou C). Assim só
+  são necessárias duas linhas em memória.
+  '''
+
+  ncols = len(cod_1) + 1
+  desl  = np.arange(ncols, dtype = np.int32) * np.int32(score_space)
+  linha = desl.copy()
+  saida = None
+
+  for posicao_linha in range(1, len(cod_2) + 1):
+    linha, diag = _linha_score(linha, cod_1, cod_2[posicao_linha - 1], posicao_linha * score_space, desl,
+                               equal, subst, score_space, False)
+
+    if posicao_linha < meio:
+      continue
+
+    direcoes = _direcoes(linha, diag, score_space, False)
+
+    if posicao_linha == meio:
+      saida = _propagar_esquerda(np.arange(ncols), direcoes != TB_ESQ)
+
+    else:
+      herdada     = np.empty_like(saida)
+      herdada[0]  = saida[0]
+      herdada[1:] = np.where(direcoes[1:] == TB_DIAG, saida[:-1], saida[1:])
+      saida = _propagar_esquerda(herdada, direcoes != TB_ESQ)
+
+  return int(linha[-1]), int(saida[-1])
+
+
+def _hirschberg(string_1, string_2, cod_1, cod_2, inicio_1, inicio_2, equal, subst, score_space, alinhada_1, alinhada_2):
+  '''
+  Alinha recursivamente o bloco cod_1 x cod_2 (vistas dos arrays originais, com início em
+  inicio_1 e inicio_2) e acrescenta o resultado às listas alinhada_1 e alinhada_2
+  '''
+
+  nlins, ncols = len(cod_2), len(cod_1)
+
+  if nlins == 0:
+    alinhada_1.extend(string_1[inicio_1:inicio_1 + ncols])
+    alinhada_2.extend('-' * ncols)
+    return
+
+  if ncols == 0:
+    alinhada_1.extend('-' * nlins)
+    alinhada_2.extend(string_2[inicio_2:inicio_2 + nlins])
+    return
+
+  if nlins == 1 or nlins * ncols <= LIMITE_HIRSCHBERG:
+    matriz_traceback, _, (linha, coluna) = _preencher(cod_1, cod_2, equal, subst, score_space, local = False)
+    bloco_1, bloco_2 = _reconstroi_vetorizado(string_1[inicio_1:inicio_1 + ncols], string_2[inicio_2:inicio_2 + nlins],
+                                              matriz_traceback, linha, coluna)
+    alinhada_1.extend(bloco_1)
+    alinhada_2.extend(bloco_2)
+    return
+
+  meio = nlins // 2
+  _, coluna = _coluna_saida(cod_1, cod_2, meio, equal, subst, score_space)
+
+  _hirschberg(string_1, string_2, cod_1[:coluna], cod_2[:meio], inicio_1, inicio_2,
+              equal, subst, score_space, alinhada_1, alinhada_2)
+  _hirschberg(string_1, string_2, cod_1[coluna:], cod_2[meio:], inicio_1 + coluna, inicio_2 + meio,
+              equal, subst, score_space, alinhada_1, alinhada_2)
+
+
+def hirschberg(string_1 : str, string_2 : str, equal = 2, subst = -1, score_space : int = -4) -> tuple:
+  '''
+  Alinhamento global em memória linear (Hirschberg), equivalente ao Needleman-Wunsch
+
+  A matriz é dividida pela linha do meio e cada metade é alinhada recursivamente. A coluna de
+  divisão é a coluna em que o traceback do Needleman-Wunsch passa nessa linha, pelo que o
+  alinhamento devolvido é exatamente o mesmo do needleman_wunsch_vetorizado, usando
+  O(n + m) de memória em vez de O(n * m).
+
+  Parameters
+  ----------
+  string_1 : str
+    primeira string (colunas da matriz)
+
+  string_2 : str
+    segunda string (linhas da matriz)
+
+  equal : int
+    score atribuído a elementos iguais
+
+  subst : int
+    score atribuído a uma substituição
+
+  score_space : int
+    valor penalidade atribuido a espaços vazios
+
+  Returns
+  -------
+  tuple
+    devolve um tuplo com o score do melhor alinhamento possível e o respetivo alinhamento
+  '''
+  from scripts.auxiliares import validar_dna, aprimorar_seq
+
+  assert validar_dna(string_1) and validar_dna(string_2)
+
+  string_1 = aprimorar_seq(string_1)
+  string_2 = aprimorar_seq(string_2)
+
+  cod_1, cod_2 = codificar_seq(string_1), codificar_seq(string_2)
+
+  score, _ = _coluna_saida(cod_1, cod_2, len(cod_2), equal, subst, score_space)
+
+  alinhada_1, alinhada_2 = [], []
+  _hirschberg(string_1, string_2, cod_1, cod_2, 0, 0, equal, subst, score_space, alinhada_1, alinhada_2)
+
+  return score, (''.join(alinhada_1), ''.join(alinhada_2))
+
+
+##################################
+#   Só score / banda diagonal    #
+##################################
+
+# Valor usado para as células fora da banda (longe do limite do int32 para não haver overflow)
+FORA_BANDA = np.iinfo(np.int32).min // 2
+
+
+def _comprimento_linha(anterior, diag, linha, inicio, score_space):
+  '''
+  Calcula o comprimento do caminho de traceback que termina em cada célula da linha
+
+  Segue a mesma escolha de antecessor que o traceback (D > E > C): D e C herdam da linha
+  anterior e as cadeias de 'E' são resolvidas com _propagar_esquerda.
+  '''
+
+  posicoes = np.arange(len(linha), dtype = np.int32)
+
+  herdado     = np.empty_like(anterior)
+  herdado[0]  = inicio
+  herdado[1:] = np.where(linha[1:] == diag, anterior[:-1], anterior[1:]) + 1
+
+  fixos     = np.ones(len(linha), dtype = bool)
+  fixos[1:] = (linha[1:] == diag) | (linha[1:] != linha[:-1] + score_space)
+
+  return _propagar_esquerda(herdado - posicoes, fixos) + posicoes
+
+
+def nw_score(string_1 : str, string_2 : str, equal = 2, subst = -1, score_space : int = -4, comprimento = False):
+  '''
+  Score do alinhamento global Needleman-Wunsch, sem matriz traceback
+
+  Mantém apenas duas linhas da matriz score, pelo que usa O(m) de memória e não faz
+  reconstrução. Útil para preencher matrizes de distâncias, que só precisam do score.
+  Como o score só compara elementos, aceita qualquer alfabeto (ADN, ARN ou proteínas).
+
+  Parameters
+  ----------
+  string_1 : str
+    primeira string (colunas da matriz)
+
+  string_2 : str
+    segunda string (linhas da matriz)
+
+  equal : int
+    score atribuído a elementos iguais
+
+  subst : int
+    score atribuído a uma substituição
+
+  score_space : int
+    valor penalidade atribuido a espaços vazios
+
+  comprimento : bool
+    se True devolve também o comprimento do alinhamento que o traceback reconstruiria
+
+  Returns
+  -------
+  int ou tuple
+    score do melhor alinhamento, ou tuplo (score, comprimento) se comprimento = True
+  '''
+  cod_1, cod_2 = codificar_seq(string_1), codificar_seq(string_2)
+
+  desl  = np.arange(len(cod_1) + 1, dtype = np.int32) * np.int32(score_space)
+  linha = desl.copy()
+  tamanhos = np.arange(len(cod_1) + 1, dtype = np.int32)
+
+  for posicao_linha in range(1, len(cod_2) + 1):
+    nova, diag = _linha_score(linha, cod_1, cod_2[posicao_linha - 1], posicao_linha * score_space, desl,
+                              equal, subst, score_space, False)
+
+    if comprimento:
+      tamanhos = _comprimento_linha(tamanhos, diag, nova, posicao_linha, score_space)
+
+    linha = nova
+
+  if comprimento:
+    return int(linha[-1]), int(tamanhos[-1])
+
+  return int(linha[-1])
+
+
+def nw_banda(string_1 : str, string_2 : str, k : int, equal = 2, subst = -1, score_space : int = -4, comprimento = False):
+  '''
+  Score do alinhamento global restrito a uma banda diagonal de largura k
+
+  Só são calculadas as células com |linha - coluna| <= k, pelo que o custo é O(k) por linha
+  em vez de O(m). Para sequências quase idênticas o resultado coincide com o nw_score; caso o
+  alinhamento ótimo saia da banda, o score devolvido é o melhor dentro da banda.
+  Tal como o nw_score, aceita qualquer alfabeto.
+
+  Parameters
+  ----------
+  string_1 : str
+    primeira string (colunas da matriz)
+
+  string_2 : str
+    segunda string (linhas da matriz)
+
+  k : int
+    largura da banda (número máximo de posições fora da diagonal principal)
+
+  equal : int
+    score atribuído a elementos iguais
+
+  subst : int
+    score atribuído a uma substituição
+
+  score_space : int
+    valor penalidade atribuido a espaços vazios
+
+  comprimento : bool
+    se True devolve também o comprimento do alinhamento que o traceback reconstruiria
+
+  Returns
+  -------
+  int ou tuple
+    score do melhor alinhamento na banda, ou tuplo (score, comprimento) se comprimento = True
+
+  Raises
+  ------
+  ValueError
+    se k não for um inteiro não negativo ou se a banda não contiver o canto final da matriz
+  '''
+  if not isinstance(k, int) or k < 0:
+    raise ValueError('A largura da banda tem de ser um inteiro não negativo.')
+
+  cod_1, cod_2 = codificar_seq(string_1), codificar_seq(string_2)
+  ncols, nlins = len(cod_1), len(cod_2)
+
+  if abs(ncols - nlins) > k:
+    raise ValueError('A banda não contém o fim do alinhamento: |len(string_1) - len(string_2)| > k.')
+
+  desl = np.arange(2 * k + 2, dtype = np.int32) * np.int32(score_space)
+
+  # Duas linhas completas reutilizadas; fora da banda ficam com FORA_BANDA
+  anterior = np.full(ncols + 1, FORA_BANDA, dtype = np.int32)
+  atual    = anterior.copy()
+  anterior[:k + 1] = desl[:min(k, ncols) + 1]
+
+  tam_anterior = np.zeros(ncols + 1, dtype = np.int32)
+  tam_atual    = tam_anterior.copy()
+  tam_anterior[:k + 1] = np.arange(min(k, ncols) + 1)
+
+  for posicao_linha in range(1, nlins + 1):
+    inicio = max(0, posicao_linha - k)
+    fim    = min(ncols, posicao_linha + k)
+
+    # Limpa o que restou da linha de há dois passos à esquerda da banda atual
+    atual[max(0, inicio - 2):inicio] = FORA_BANDA
+
+    # Para a coluna 0 usa-se o valor da fronteira, para as outras o bloco começa em inicio - 1
+    if inicio == 0:
+      primeiro = posicao_linha * score_space
+      bloco_anterior = anterior[0:fim + 1]
+      tam_bloco      = tam_anterior[0:fim + 1]
+      bases          = cod_1[0:fim]
+    else:
+      primeiro = FORA_BANDA
+      bloco_anterior = anterior[inicio - 1:fim + 1]
+      tam_bloco      = tam_anterior[inicio - 1:fim + 1]
+      bases          = cod_1[inicio - 1:fim]
+
+    nova, diag = _linha_score(bloco_anterior, bases, cod_2[posicao_linha - 1], primeiro,
+                              desl[:len(bloco_anterior)], equal, subst, score_space, False)
+
+    if comprimento:
+      tamanhos = _comprimento_linha(tam_bloco, diag, nova, posicao_linha, score_space)
+
+    # Sem coluna 0, a primeira posição do bloco é um apoio fora da banda e é descartada
+    desvio = 0 if inicio == 0 else 1
+    atual[inicio:fim + 1] = nova[desvio:]
+
+    if comprimento:
+      tam_atual[inicio:fim + 1] = tamanhos[desvio:]
+
+    anterior, atual = atual, anterior
+    tam_anterior, tam_atual = tam_atual, tam_anterior
+
+  if comprimento:
+    return int(anterior[ncols]), int(tam_anterior[ncols])
+
+  return int(anterior[ncols])
+
+
+##################################
+#   Gaps afins (Gotoh)           #
+##################################
+
+# A matriz traceback afim guarda em cada célula (int8) o estado de onde vem H nos bits 0-1
+# (TB_NADA, TB_DIAG, TB_ESQ = matriz E, TB_CIMA = matriz F) e, nos bits 2 e 3, se E e F
+# prolongam um gap já aberto (em vez de o abrirem a partir de H)
+TB_E_PROLONGA = 4
+TB_F_PROLONGA = 8
+
+NEGATIVO = np.iinfo(np.int32).min // 4
+
+
+def _preencher_afim(cod_1, cod_2, tabela, abertura, extensao, local):
+  '''
+  Preenche a matriz traceback afim (Gotoh) linha a linha, com operações vetoriais
+
+  F (gap vertical) e a diagonal dependem só da linha anterior. E (gap horizontal) tem
+  dependência à esquerda, resolvida com um máximo acumulado sobre G = max(diagonal, F):
+  E[j] = abertura + (j-1)*extensao + max_{k < j}(G[k] - k*extensao), o que é exato quando
+  abertura <= extensao (abrir um gap a partir de E nunca é melhor do que prolongá-lo).
+
+  Returns
+  -------
+  tuple
+    matriz traceback, score final e coordenadas (linha, coluna) de onde parte a reconstrução
+  '''
+  nlins, ncols = len(cod_2) + 1, len(cod_1) + 1
+  colunas = np.arange(ncols, dtype = np.int32)
+  desl = colunas * np.int32(extensao)
+
+  matriz_traceback = np.zeros((nlins, ncols), dtype = np.int8)
+  f = np.full(ncols, NEGATIVO, dtype = np.int32)
+
+  if local:
+    h = np.zeros(ncols, dtype = np.int32)
+  else:
+    h = np.where(colunas > 0, abertura + desl - extensao, 0).astype(np.int32)
+    matriz_traceback[0, 1:] = TB_ESQ
+    matriz_traceback[0, 2:] |= TB_E_PROLONGA
+
+  max_score, coords = 0, (0, 0)
+
+  for posicao_linha in range(1, nlins):
+    abre_f = h + abertura
+    prolonga_f = f + extensao
+    f = np.maximum(abre_f, prolonga_f)
+
+    g = np.empty(ncols, dtype = np.int32)
+    g[0] = 0 if local else abertura + (posicao_linha - 1) * extensao
+    diag = h[:-1] + tabela[cod_2[posicao_linha - 1]][cod_1]
+    np.maximum(diag, f[1:], out = g[1:])
+
+    if local:
+      np.maximum(g, 0, out = g)
+
+    e = np.full(ncols, NEGATIVO, dtype = np.int32)
+    e[1:] = (np.maximum.accumulate(g - desl)[:-1] + desl[:-1]) + abertura
+
+    h = np.maximum(g, e)
+
+    direcoes = np.full(ncols, TB_CIMA, dtype = np.int8)
+    direcoes[h == e] = TB_ESQ
+    direcoes[1:][h[1:] == diag] = TB_DIAG
+
+    if local:
+      direcoes[h == 0] = TB_NADA
+
+    direcoes[2:] |= np.where(e[2:] == e[1:-1] + extensao, TB_E_PROLONGA, 0).astype(np.int8)
+    direcoes |= np.where(f == prolonga_f, TB_F_PROLONGA, 0).astype(np.int8)
+    matriz_traceback[posicao_linha] = direcoes
+
+    if local:
+      posicao_coluna = int(np.argmax(h))
+      if h[posicao_coluna] > max_score:
+        max_score, coords = int(h[posicao_coluna]), (posicao_linha, posicao_coluna)
+
+  if local:
+    return matriz_traceback, max_score, coords
+
+  return matriz_traceback, int(h[-1]), (nlins - 1, ncols - 1)
+
+
+def _reconstroi_afim(string_1, string_2, matriz_traceback, linha, coluna):
+  '''
+  Reconstroi o alinhamento a partir da matriz traceback afim, seguindo o estado (H, E ou F)
+  '''
+  alinhada_1, alinhada_2 = [], []
+  estado = TB_DIAG
+
+  while True:
+    celula = int(matriz_traceback[linha, coluna])
+
+    if estado == TB_DIAG:
+      estado = celula & 3
+
+      if estado == TB_NADA:
+        break
+
+      if estado == TB_DIAG:
+        alinhada_1.append(string_1[coluna - 1])
+        alinhada_2.append(string_2[linha - 1])
+        linha  -= 1
+        coluna -= 1
+
+    elif estado == TB_ESQ:
+      alinhada_1.append(string_1[coluna - 1])
+      alinhada_2.append('-')
+      coluna -= 1
+      estado = TB_ESQ if celula & TB_E_PROLONGA else TB_DIAG
+
+    else:
+      alinhada_1.append('-')
+      alinhada_2.append(string_2[linha - 1])
+      linha -= 1
+      estado = TB_CIMA if celula & TB_F_PROLONGA else TB_DIAG
+
+  return ''.join(reversed(alinhada_1)), ''.join(reversed(alinhada_2))
+
+
+def _alinhar_afim(string_1, string_2, matriz, abertura, extensao, local, estruturado):
+  from scripts.auxiliares import aprimorar_seq
+  from scripts.matrizes import carregar_matriz
+
+  if abertura > extensao:
+    raise ValueError("A penalidade de abertura deve ser menor ou igual à de extensão (abertura <= extensao)")
+
+  matriz = carregar_matriz(matriz)
+
+  string_1 = aprimorar_seq(string_1)
+  string_2 = aprimorar_seq(string_2)
+
+  matriz_traceback, score, (linha, coluna) = _preencher_afim(matriz.codificar(string_1), matriz.codificar(string_2),
+                                                             matriz.tabela, abertura, extensao, local)
+
+  alinhadas = _reconstroi_afim(string_1, string_2, matriz_traceback, linha, coluna)
+
+  if estruturado:
+    return Alinhamento(score, *alinhadas, coluna, linha)
+
+  return score, alinhadas
+
+
+def needleman_wunsch_afim(string_1 : str, string_2 : str, matriz = 'BLOSUM62', abertura : int = -11, extensao : int = -1, estruturado = False) -> tuple:
+  '''
+  Alinhamento global com matriz de substituição e gaps afins (Gotoh), para proteínas ou ADN
+
+  Um gap de comprimento L vale abertura + (L-1)*extensao. Com abertura == extensao e
+  MatrizSubstituicao.identidade(equal = 2, subst = -1) dá o mesmo score que o
+  needleman_wunsch_vetorizado com score_space = abertura.
+
+  Parameters
+  ----------
+  string_1 : str
+    primeira string (colunas da matriz)
+
+  string_2 : str
+    segunda string (linhas da matriz)
+
+  matriz : MatrizSubstituicao ou str
+    matriz de substituição, nome de uma matriz embutida ('BLOSUM62') ou caminho de um ficheiro
+
+  abertura : int
+    score do primeiro resíduo de um gap
+
+  extensao : int
+    score de cada resíduo seguinte de um gap
+
+  estruturado : bool
+    se True devolve um Alinhamento (com score, CIGAR, identidade e coordenadas)
+
+  Returns
+  -------
+  tuple
+    devolve um tuplo com o score do melhor alinhamento possível e o respetivo alinhamento
+
+  Raises
+  ------
+  ValueError
+    se as sequências tiverem resíduos fora do alfabeto da matriz ou abertura > extensao
+  '''
+  return _alinhar_afim(string_1, string_2, matriz, abertura, extensao, local = False, estruturado = estruturado)
+
+
+def smith_waterman_afim(string_1 : str, string_2 : str, matriz = 'BLOSUM62', abertura : int = -11, extensao : int = -1, estruturado = False) -> tuple:
+  '''
+  Alinhamento local com matriz de substituição e gaps afins (Gotoh), para proteínas ou ADN
+
+  Tal como no smith_waterman_vetorizado, a reconstrução parte do primeiro máximo e termina
+  na primeira célula com score 0.
+
+  Parameters
+  ----------
+  string_1 : str
+    primeira string (colunas da matriz)
+
+  string_2 : str
+    segunda string (linhas da matriz)
+
+  matriz : MatrizSubstituicao ou str
+    matriz de substituição, nome de uma matriz embutida ('BLOSUM62') ou caminho de um ficheiro
+
+  abertura : int
+    score do primeiro resíduo de um gap
+
+  extensao : int
+    score de cada resíduo seguinte de um gap
+
+  estruturado : bool
+    se True devolve um Alinhamento (com score, CIGAR, identidade e coordenadas)
+
+  Returns
+  -------
+  tuple
+    devolve um tuplo com o score do melhor alinhamento local e o respetivo alinhamento
+
+  Raises
+  ------
+  ValueError
+    se as sequências tiverem resíduos fora do alfabeto da matriz ou abertura > extensao
+  '''
+  return _alinhar_afim(string_1, string_2, matriz, abertura, extensao, local = True, estruturado = estruturado)
+
+
+##################################
+#   Alinhamento em lote          #
+##################################
+
+def perfil_query(query, matriz):
+  '''
+  Perfil da query: para cada resíduo r do alfabeto da matriz, a linha com o score de r contra
+  cada posição da query (matriz K x len(query), int32). Cada linha da DP de um alvo é então
+  uma simples leitura perfil[resíduo do alvo].
+
+  Parameters
+  ----------
+  query : str
+    query já aprimorada
+
+  matriz : MatrizSubstituicao
+    matriz de substituição compilada
+  '''
+  return np.ascontiguousarray(matriz.tabela[:, matriz.codificar(query)])
+
+
+def _scores_lote(perfil, codigos, comprimentos, score_space, local):
+  '''
+  Scores de um lote de alvos contra a mesma query, calculados em simultâneo
+
+  A matriz de estado tem uma linha por alvo (lote x colunas da query); em cada passo é
+  calculada a linha i da DP de todos os alvos, como em _linha_score mas com o máximo
+  acumulado ao longo do eixo das colunas. Os alvos já terminados ficam congelados.
+  '''
+  lote, ncols = len(comprimentos), perfil.shape[1] + 1
+  desl = np.arange(ncols, dtype = np.int32) * np.int32(score_space)
+
+  linha = np.zeros((lote, ncols), dtype = np.int32) if local else np.tile(desl, (lote, 1))
+  scores = np.zeros(lote, dtype = np.int64) if local else linha[:, -1].astype(np.int64)
+
+  melhor = np.empty((lote, ncols), dtype = np.int32)
+
+  for posicao_linha in range(1, int(comprimentos.max(initial = 0)) + 1):
+    diag = linha[:, :-1] + perfil[codigos[:, posicao_linha - 1]]
+
+    melhor[:, 0] = 0 if local else posicao_linha * score_space
+    np.maximum(diag, linha[:, 1:] + score_space, out = melhor[:, 1:])
+
+    if local:
+      np.maximum(melhor, 0, out = melhor)
+
+    nova = np.maximum.accumulate(melhor - desl, axis = 1) + desl
+    ativos = comprimentos >= posicao_linha
+
+    linha = np.where(ativos[:, None], nova, linha)
+
+    if local:
+      scores = np.where(ativos, np.maximum(scores, nova.max(axis = 1)), scores)
+    else:
+      terminados = comprimentos == posicao_linha
+      scores[terminados] = nova[terminados, -1]
+
+  return scores
+
+
+def alinhar_lote(query, alvos, local = False, equal = None, subst = -1, score_space : int = -4, matriz = None,
+                 tamanho_lote = 64, ordenar = True, bloco = 4096):
+  '''
+  Alinha uma query contra muitos alvos (NW global ou SW local), devolvendo só os scores
+
+  A query é validada, aprimorada e codificada uma única vez e o seu perfil (uma linha de
+  scores por resíduo) é partilhado por todos os alvos. Os alvos são lidos por blocos (podem
+  vir de um gerador, por exemplo ler_fasta ou FicheiroIndexado) e alinhados em lotes de
+  tamanho_lote, vários alvos de cada vez. Com ordenar = True os alvos de cada bloco são
+  ordenados pelo tamanho antes de formar os lotes, o que reduz o preenchimento inútil dos
+  alvos mais curtos de cada lote.
+
+  Parameters
+  ----------
+  query : str
+    sequência comum a todos os alinhamentos (colunas da matriz)
+
+  alvos : iterable
+    sequências alvo (linhas da matriz), ou tuplos (nome, sequência)
+
+  local : bool
+    False para Needleman-Wunsch, True para Smith-Waterman
+
+  equal : int, opcional
+    score de elementos iguais (por omissão 2 no NW e 1 no SW, como nas funções de pares)
+
+  subst : int
+    score de uma substituição
+
+  score_space : int
+    valor penalidade atribuido a espaços vazios
+
+  matriz : MatrizSubstituicao ou str, opcional
+    matriz de substituição (por exemplo 'BLOSUM62' para proteínas); se None é usada a
+    matriz de ADN com equal e subst e as sequências são validadas com validar_dna
+
+  tamanho_lote : int
+    número de alvos alinhados em simultâneo
+
+  ordenar : bool
+    ordena os alvos de cada bloco pelo tamanho antes de os agrupar em lotes
+
+  bloco : int
+    número de alvos lidos de cada vez
+
+  Returns
+  -------
+  numpy.ndarray
+    scores (int64) pela ordem dos alvos; são iguais aos de nw_score / smith_waterman_vetorizado
+
+  Raises
+  ------
+  AssertionError
+    se alguma sequência não for ADN válido (quando matriz é None)
+
+  ValueError
+    se os tamanhos do lote ou do bloco não forem inteiros positivos
+  '''
+  from itertools import islice
+
+  from scripts.auxiliares import validar_dna, aprimorar_seq
+  from scripts.matrizes import MatrizSubstituicao, carregar_matriz
+
+  if not isinstance(tamanho_lote, int) or tamanho_lote < 1 or not isinstance(bloco, int) or bloco < 1:
+    raise ValueError("O tamanho do lote e do bloco devem ser inteiros positivos")
+
+  if equal is None:
+    equal = 1 if local else 2
+
+  dna = matriz is None
+
+  if dna:
+    assert validar_dna(query)
+    matriz = MatrizSubstituicao.identidade('ACGT', equal, subst)
+  else:
+    matriz = carregar_matriz(matriz)
+
+  perfil = perfil_query(aprimorar_seq(query), matriz)
+
+  alvos = iter(alvos)
+  resultados = []
+
+  while True:
+    registos = list(islice(alvos, bloco))
+
+    if not registos:
+      break
+
+    codificados = []
+    for registo in registos:
+      seq = registo[1] if isinstance(registo, tuple) else registo
+
+      if dna:
+        assert validar_dna(seq)
+
+      codificados.append(matriz.codificar(aprimorar_seq(seq)))
+
+    comprimentos = np.array([len(codigos) for codigos in codificados], dtype = np.int64)
+    ordem = np.argsort(comprimentos, kind = 'stable') if ordenar else np.arange(len(codificados))
+    scores = np.empty(len(codificados), dtype = np.int64)
+
+    for inicio in range(0, len(ordem), tamanho_lote):
+      indices = ordem[inicio:inicio + tamanho_lote]
+      tamanhos = comprimentos[indices]
+
+      # Alvos do lote num array retangular, preenchido até ao maior (as posições extra são ignoradas)
+      codigos = np.zeros((len(indices), max(int(tamanhos.max()), 1)), dtype = np.intp)
+      for linha, indice in enumerate(indices):
+        codigos[linha, :tamanhos[linha]] = codificados[indice]
+
+      scores[indices] = _scores_lote(perfil, codigos, tamanhos, score_space, local)
+
+    resultados.append(scores)
+
+  return np.concatenate(resultados) if resultados else np.zeros(0, dtype = np.int64)
+
+
+##################################
+#   Alinhamento de perfis        #
+##################################
+
+def pontuacao_perfis(matriz, score_space):
+  '''
+  Matriz de pontuação (K+1) x (K+1) usada no alinhamento de perfis: a matriz de substituição
+  com uma linha e uma coluna extra para o espaço ('-'), que vale score_space contra qualquer
+  resíduo e 0 contra outro espaço (score sum-of-pairs)
+
+  Parameters
+  ----------
+  matriz : MatrizSubstituicao
+    matriz de substituição compilada
+
+  score_space : int
+    valor penalidade atribuido a espaços vazios
+  '''
+  tamanho = len(matriz.alfabeto)
+
+  pontuacao = np.full((tamanho + 1, tamanho + 1), score_space, dtype = np.int64)
+  pontuacao[:tamanho, :tamanho] = matriz.tabela
+  pontuacao[tamanho, tamanho] = 0
+
+  return pontuacao
+
+
+def alinhar_perfis(contagens_1, contagens_2, pontuacao):
+  '''
+  Needleman-Wunsch entre dois perfis (dois alinhamentos múltiplos), com score sum-of-pairs
+
+  Cada perfil é dado pelas contagens de cada símbolo em cada coluna (a última coluna das
+  contagens é o número de espaços). O score de alinhar a coluna a do perfil 1 com a coluna b
+  do perfil 2 é a soma dos scores de todos os pares de símbolos, c_1[a] @ pontuacao @ c_2[b],
+  e é calculado para uma linha inteira de uma vez (uma multiplicação matriz-vetor). Como as
+  contagens são inteiras, os scores também o são e o preenchimento usa o mesmo núcleo que o
+  needleman_wunsch_vetorizado (_linha_subs e _direcoes), com a penalidade de cada espaço a
+  depender da coluna que fica em frente a ele.
+
+  Parameters
+  ----------
+  contagens_1 : numpy.ndarray
+    contagens L1 x (K+1) do primeiro perfil (colunas da matriz)
+
+  contagens_2 : numpy.ndarray
+    contagens L2 x (K+1) do segundo perfil (linhas da matriz)
+
+  pontuacao : numpy.ndarray
+    matriz (K+1) x (K+1) dada por pontuacao_perfis
+
+  Returns
+  -------
+  tuple
+    score do alinhamento e, para cada perfil, o array com a coluna de origem de cada coluna
+    do alinhamento (-1 onde é inserida uma coluna de espaços)
+  '''
+  contagens_1 = np.asarray(contagens_1, dtype = np.int64)
+  contagens_2 = np.asarray(contagens_2, dtype = np.int64)
+
+  num_1 = int(contagens_1[0].sum()) if len(contagens_1) else 0
+  num_2 = int(contagens_2[0].sum()) if len(contagens_2) else 0
+  nlins, ncols = len(contagens_2) + 1, len(contagens_1) + 1
+
+  # Scores de cada coluna do perfil 1 contra cada símbolo e penalidades dos espaços de cada lado
+  colunas_1 = contagens_1 @ pontuacao
+  espacos_1 = num_2 * colunas_1[:, -1]
+  espacos_2 = num_1 * (contagens_2 @ pontuacao[:, -1])
+
+  desl = np.zeros(ncols, dtype = np.int64)
+  np.cumsum(espacos_1, out = desl[1:])
+
+  matriz_traceback = np.zeros((nlins, ncols), dtype = np.int8)
+  matriz_traceback[0, 1:] = TB_ESQ
+  linha, inicio = desl.copy(), 0
+
+  for posicao_linha in range(1, nlins):
+    inicio += int(espacos_2[posicao_linha - 1])
+
+    subs = colunas_1 @ contagens_2[posicao_linha - 1]
+    linha, diag = _linha_subs(linha, subs, inicio, desl, espacos_2[posicao_linha - 1], False)
+    matriz_traceback[posicao_linha] = _direcoes(linha, diag, espacos_1, False)
+
+  # Reconstrução do caminho, da última célula para a primeira
+  caminho_1, caminho_2 = [], []
+  posicao_linha, posicao_coluna = nlins - 1, ncols - 1
+
+  while posicao_linha > 0 or posicao_coluna > 0:
+    direcao = matriz_traceback[posicao_linha, posicao_coluna]
+
+    if direcao == TB_DIAG:
+      posicao_linha  -= 1
+      posicao_coluna -= 1
+      caminho_1.append(posicao_coluna)
+      caminho_2.append(posicao_linha)
+
+    elif direcao == TB_ESQ:
+      posicao_coluna -= 1
+      caminho_1.append(posicao_coluna)
+      caminho_2.append(-1)
+
+    else:
+      posicao_linha -= 1
+      caminho_1.append(-1)
+      caminho_2.append(posicao_linha)
+
+  return int(linha[-1]), np.array(caminho_1[::-1], dtype = np.intp), np.array(caminho_2[::-1], dtype = np.intp)
@@ -1,3 +1,82 @@
+# Tabela para bytes.translate que passa as letras ASCII a maiúsculas
+_MAIUSCULAS = bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz', b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+# Alfabetos aceites por tipo_seq, pela ordem em que são testados
+_ALFABETOS = (
+    ("ADN", b"ACGT"),
+    ("RNA", b"ACGU"),
+    ("Sequência aminoácidos", b"ABCDEFGHIKLMNPQRSTVWYZ_"),
+)
+
+
+# Tabelas para str.translate usadas no complemento inverso e na transcrição
+_COMPLEMENTO = str.maketrans('ACGT', 'TGCA')
+_TRANSCRICAO = str.maketrans('ATCG', 'UAGC')
+
+# Código genético usado na tradução
+TABELA_TRADUCAO = {
+        "TTT": "F", "TTC": "F", "TTA": "L", "TTG": "L",
+        "CTT": "L", "CTC": "L", "CTA": "L", "CTG": "L",
+        "ATT": "I", "ATC": "I", "ATA": "I", "ATG": "M",
+        "GTT": "V", "GTC": "V", "GTA": "V", "GTG": "V",
+        "TCT": "S", "TCC": "S", "TCA": "S", "TCG": "S",
+        "CCT": "P", "CCC": "P", "CCA": "P", "CCG": "P",
+        "ACT": "T", "ACC": "T", "ACA": "T", "ACG": "T",
+        "GCT": "A", "GCC": "A", "GCA": "A", "GCG": "A",
+        "TAT": "Y", "TAC": "Y", "TAA": "*", "TAG": "*",
+        "CAT": "H", "CAC": "H", "CAA": "Q", "CAG": "Q",
+        "AAT": "N", "AAC": "N", "AAA": "K", "AAG": "K",
+        "GAT": "D", "GAC": "D", "GAA": "E", "GAG": "E",
+        "TGT": "C", "TGC": "C", "TGA": "*", "TGG": "W",
+        "CGT": "R", "CGC": "R", "CGA": "R", "CGG": "R",
+        "AGT": "S", "AGC": "S", "AGA": "R", "AGG": "R",
+        "GGT": "G", "GGC": "G", "GGA": "G", "GGG": "G"
+        }
+
+# Aminoácido de cada codão indexado por 16*b1 + 4*b2 + b3, com A = 0, C = 1, G = 2 e T = 3
+_AMINOACIDOS_2BITS = ''.join(TABELA_TRADUCAO[b1 + b2 + b3] for b1 in 'ACGT' for b2 in 'ACGT' for b3 in 'ACGT').encode('ascii')
+
+
+def _e_vista(seq):
+    """
+    Indica se seq é uma sequência em bytes: bytes, bytearray, memoryview ou um objeto com __bytes__,
+    como as vistas de scripts.ficheiros.FicheiroIndexado
+    """
+    return isinstance(seq, (bytes, bytearray, memoryview)) or hasattr(type(seq), '__bytes__')
+
+
+def _texto_seq(seq):
+    """
+    Devolve a sequência como str; as vistas (ver _e_vista) são lidas e convertidas, o resto fica igual
+    """
+    if isinstance(seq, str) or not _e_vista(seq):
+        return seq
+
+    return bytes(seq).decode('ascii', errors = 'replace')
+
+
+def _normalizar_bytes(seq):
+    """
+    Passa a sequência a maiúsculas e retira os espaços numa única passagem (bytes.translate)
+
+    Devolve None se a sequência tiver caracteres fora do ASCII, que nunca são válidos.
+    """
+    if _e_vista(seq):
+        dados = bytes(seq)
+
+        if not dados.isascii():
+            return None
+
+        return dados.translate(_MAIUSCULAS, b' ')
+
+    try:
+        dados = seq.encode('ascii')
+    except UnicodeEncodeError:
+        return None
+
+    return dados.translate(_MAIUSCULAS, b' ')
+
+
 def validar_dna(seq):
     
     """
@@ -6,8 +85,8 @@ def validar_dna(seq):
     
     Parâmetro
     -------------
-    seq : str
-        Uma string que representa a sequência de ADN
+    seq : str, bytes ou VistaSequencia
+        Uma string (ou vista de scripts.ficheiros) que representa a sequência de ADN
 
     
     Retorna
@@ -15,24 +94,53 @@ def validar_dna(seq):
     bool : True se for uma sequência válida, False se for uma sequência inválida
     
     """
-    if not isinstance(seq, str):
+    if not isinstance(seq, str) and not _e_vista(seq):
         raise AssertionError("A sequência deve ser uma string")
-    
-    seq = seq.upper()        
-    seq = seq.replace(" ","")   
-    
-    if not bool(seq): return False
 
-    valido_dna = True
-    
-    for base in seq:                  
-        if base not in "ATCG":         
-            valido_dna = False
-    
-    if valido_dna == False:
-        return False
-    else:
-        return True
+    dados = _normalizar_bytes(seq)
+
+    # A sequência é válida se não sobrar nada depois de apagar as bases A, C, G e T
+    return bool(dados) and not dados.translate(None, b"ACGT")
+
+
+def normalizar_seq(seq):
+
+    """
+    Normaliza uma sequência e classifica-a em ADN, RNA ou Sequência aminoácidos, numa só chamada
+
+    A normalização (maiúsculas, sem espaços) é feita numa passagem com bytes.translate e a
+    classificação apaga de uma vez as letras de cada alfabeto, pela ordem ADN, RNA e
+    aminoácidos; para ADN basta uma passagem.
+
+
+    Parâmetro
+    -------------
+    seq : str
+        A sequência a normalizar
+
+
+    Retorna
+    -------------
+    tuple
+        (sequência em maiúsculas e sem espaços, classificação tal como em tipo_seq)
+
+
+    Levanta
+    -------------
+    ValueError
+        Se a sequência for vazia ou inválida
+
+    """
+    dados = _normalizar_bytes(seq)
+
+    if not dados:
+        raise ValueError("É uma sequência inválida")
+
+    for alfabeto, letras in _ALFABETOS:
+        if not dados.translate(None, letras):
+            return dados.decode('ascii'), alfabeto
+
+    raise ValueError("É uma sequência inválida")
 
 def aprimorar_seq(seq):
     """
@@ -41,8 +149,8 @@ def aprimorar_seq(seq):
     
     Parâmetro
     -------------
-    seq : str
-        Uma string que representa a sequência
+    seq : str ou VistaSequencia
+        Uma string (ou vista de scripts.ficheiros) que representa a sequência
 
         
     Retorna
@@ -51,7 +159,94 @@ def aprimorar_seq(seq):
         sequência com as bases em maiúsculas e sem espaços em branco
     
     """
-    return seq.upper().replace(" ","")
+    return _texto_seq(seq).upper().replace(" ","")
+
+
+def contar_bases(seq):
+
+    """
+    Devolve um dicionário com as frequências das bases de uma string de ADN (A, C, T e G)
+
+    
+    Parâmetro
+    -------------
+    seq : str ou VistaSequencia
+        Uma string (ou vista de scripts.ficheiros) que representa a sequência de ADN
+
+    
+    Retorna
+    -------------
+    resultado : dict
+        Dicionário com as frequências das bases da sequência introduzida
+
+        
+    Levanta
+    ----------
+    ValueError
+        No caso da string inserida não ser válida
+    
+    """
+
+    bases = _contar_dna(seq)
+
+    resultado = {"A" : bases[0], "T" : bases[3], "C" : bases[1], "G" : bases[2]}
+
+    return resultado
+
+
+def _contar_dna(seq):
+    """
+    Conta A, C, G e T (maiúsculas ou minúsculas) numa única passagem (np.bincount dos bytes), validando
+    ao mesmo tempo a sequência: os espaços são ignorados e qualquer outro caracter torna-a inválida
+
+    Devolve uma lista [A, C, G, T]; levanta ValueError se a sequência for vazia ou inválida.
+    """
+    import numpy as np
+
+    if not isinstance(seq, str) and not _e_vista(seq):
+        raise AssertionError("A sequência deve ser uma string")
+
+    try:
+        dados = bytes(seq) if _e_vista(seq) else seq.encode('ascii')
+    except UnicodeEncodeError:
+        raise ValueError ("A sequência inserida é inválida")
+
+    contagens = np.bincount(np.frombuffer(dados, dtype = np.uint8), minlength = 256)
+    bases = [int(contagens[ord(base)] + contagens[ord(base.lower())]) for base in "ACGT"]
+
+    if sum(bases) == 0 or sum(bases) + int(contagens[ord(' ')]) != len(dados):
+        raise ValueError ("A sequência inserida é inválida")
+
+    return bases
+
+
+def conteudo_gc(seq):
+
+    """
+    Devolve a percentagem do conteúdo GC presente numa sequência de ADN
+
+
+    Parâmetro
+    -------------
+    seq : str ou VistaSequencia
+        Uma string (ou vista de scripts.ficheiros) que representa a sequência de ADN
+
+
+    Retorna
+    -------------
+    resultado : float
+        Percentagem do conteúdo GC na sequência de ADN, arredondada a uma casa decimal
+
+
+    Levanta
+    ----------
+    ValueError
+        No caso da string inserida não ser válida
+
+    """
+    bases = _contar_dna(seq)
+
+    return round((bases[1] + bases[2]) / sum(bases) * 100, 1)
      
 
 ''' Função usada para formatar o conteúdo, que irá ajudar na formatação da matriz '''
@@ -296,25 +491,10 @@ def tipo_seq(seq):
 
     """
 
-    seq = aprimorar_seq(seq)
-
-    if not bool(seq):
-        raise ValueError("É uma sequência inválida")
-    
-    if validar_dna(seq):
-        return "ADN"
-        
-    if len([c for c in seq if c not in "ACGU"]) == 0:
-        return "RNA"
-        
-    elif len([c for c in seq if c not in "ABCDEFGHIKLMNPQRSTVWYZ_"]) == 0:
-        return "Sequência aminoácidos"
-    
-    else:
-        raise ValueError("É uma sequência inválida")
+    return normalizar_seq(seq)[1]
     
 
-def complemento_inverso(sequencia):
+def complemento_inverso(sequencia, validar = True):
 
     '''
     Função que itera sobre uma sequência de ADN e devolve o complemento inverso de cada nucleótido.
@@ -331,6 +511,10 @@ def complemento_inverso(sequencia):
     sequencia : str
         sequência de ADN 
 
+    validar : bool
+        se False a sequência é considerada já validada e normalizada (maiúsculas, sem
+        espaços) e não volta a ser verificada
+
         
     Retorna
     ----------
@@ -346,23 +530,168 @@ def complemento_inverso(sequencia):
 
     '''
 
-    assert validar_dna(sequencia), "Sequência Inválida"
+    if validar:
+        assert validar_dna(sequencia), "Sequência Inválida"
     
-    sequencia = aprimorar_seq(sequencia)
+        sequencia = aprimorar_seq(sequencia)
+    
+    # Tradução de todas as bases de uma só vez com a tabela de complementos
+    return sequencia.translate(_COMPLEMENTO)[::-1]
+
+
+def transc(seq, validar = True):
+
+    '''
+    Função que itera sobre uma sequência de DNA e devolve a sequência transcrita.
+
+    
+    Parâmetro:
+    -----------
+    seq : str 
+      Uma string que representa a sequência de ADN
+
+    validar : bool
+      se False a sequência é considerada já validada e normalizada
+    
+      
+    Retorna:
+    --------
+    mrna ou None
+      Se a sequência de DNA for válida, retorna a sequência de mRNA correspondente
+      Se a sequência de DNA não for válida, imprime "Sequência inválida" e retorna None
+
+    '''
+
+    if validar:
+        if not validar_dna(seq):
+            print("Sequência inválida")
+            return None
+
+        seq = aprimorar_seq(seq)
+
+    return seq.translate(_TRANSCRICAO)
+
+
+def _indices_codoes(sequencia):
+    '''
+    Devolve, para cada posição p de uma sequência de ADN válida, o índice 16*b[p] + 4*b[p+1] + b[p+2]
+    do codão que começa em p (2 bits por base), e o mesmo para o complemento inverso desse codão
+    '''
+    import numpy as np
+    from scripts.codificacao import codificar_2bits
+
+    bases = codificar_2bits(sequencia).astype(np.uint8)
+
+    if len(bases) < 3:
+        vazio = np.zeros(0, dtype = np.uint8)
+        return vazio, vazio
+
+    primeira, segunda, terceira = bases[:-2], bases[1:-1], bases[2:]
+
+    diretos   = (primeira << 4) | (segunda << 2) | terceira
+    inversos  = ((3 - terceira) << 4) | ((3 - segunda) << 2) | (3 - primeira)
+
+    return diretos, inversos
+
+
+def traducao_personalizada(sequencia_DNA, validar = True):
+        
+    """
+    Traduz uma sequência de ADN na sua correspondente sequência de aminoácidos
+
+    Os codões são convertidos em índices de 2 bits por base e traduzidos de uma só vez com
+    uma tabela de 64 entradas, calculada uma única vez a partir de TABELA_TRADUCAO.
+
     
-    complementar = '' 
+    Parâmetro:
+    -----------
+    sequencia_DNA : str
+        Uma string que representa a sequência de ADN a ser traduzida
+
+    validar : bool
+        se False a sequência é considerada já validada e normalizada
+
+        
+    Retorna:
+    --------
+    str
+        Sequência de aminoácidos resultante da tradução da sequência de ADN
+
+        
+    Levanta:
+    ------
+    AssertionError
+        Se a sequência de ADN não for válida 
+
+    ValueError
+        Se a sequência de DNA não tiver um número de bases múltiplo de 3
+        
+    """
+    import numpy as np
 
-    for base in sequencia.upper():
-        if base == 'A':
-            complementar += 'T'
-        elif base == 'T':
-            complementar += 'A'
-        elif base == 'C':
-            complementar += 'G'
-        elif base == 'G':
-            complementar += 'C'
+    if validar:
+        assert validar_dna(sequencia_DNA), "Sequência inválida"
 
-    return complementar[::-1]
+        sequencia_DNA = aprimorar_seq(sequencia_DNA)
+
+    if len(sequencia_DNA) % 3 != 0:
+        raise ValueError("Sequência de DNA inválida: número de bases não é múltiplo de 3.")
+
+    diretos, _ = _indices_codoes(sequencia_DNA)
+
+    return np.frombuffer(_AMINOACIDOS_2BITS, dtype = np.uint8)[diretos[::3]].tobytes().decode('ascii')
+
+
+def traduzir_seis_frames(seq, validar = True):
+
+    """
+    Traduz os seis frames de leitura de uma sequência de ADN (três na cadeia direta e três no
+    complemento inverso)
+
+    Os índices de todos os codões das duas cadeias são calculados numa única passagem pela
+    sequência; cada frame é depois uma fatia desses índices. Em cada frame são traduzidos
+    apenas os codões completos.
+
+
+    Parâmetro:
+    -----------
+    seq : str
+        Uma string que representa a sequência de ADN
+
+    validar : bool
+        se False a sequência é considerada já validada e normalizada
+
+
+    Retorna:
+    --------
+    list
+        Lista com as seis traduções, pela mesma ordem dos frames de get_orfs: frames 0, 1 e 2
+        da sequência e frames 0, 1 e 2 do complemento inverso
+
+
+    Levanta:
+    ------
+    AssertionError
+        Se a sequência de ADN não for válida
+
+    """
+    import numpy as np
+
+    if validar:
+        assert validar_dna(seq), "Sequência inválida"
+
+        seq = aprimorar_seq(seq)
+
+    tabela = np.frombuffer(_AMINOACIDOS_2BITS, dtype = np.uint8)
+    diretos, inversos = _indices_codoes(seq)
+
+    # O codão do frame f do complemento inverso que começa na posição r corresponde ao codão
+    # direto na posição len(seq) - 3 - r, pelo que os frames inversos são lidos de trás para a frente
+    ultimo = len(seq) - 3
+    frames = [diretos[frame::3] for frame in range(3)]
+    frames += [inversos[ultimo - frame::-3] if ultimo - frame >= 0 else inversos[:0] for frame in range(3)]
+
+    return [tabela[frame].tobytes().decode('ascii') for frame in frames]
 
 
 def get_orfs(seq):
@@ -373,7 +702,7 @@ def get_orfs(seq):
 
     Parâmetro:
     -----------
-    seq : str
+    seq : str ou VistaSequencia
         Sequência de ADN ou RNA
 
 
@@ -391,10 +720,13 @@ def get_orfs(seq):
 
     """
 
-    
-    if tipo_seq(seq) == "ADN":
+    # As vistas de scripts.ficheiros são lidas uma vez; depois classifica e normaliza a sequência uma única vez
+    seq = _texto_seq(seq)
+    seq_normalizada, tipo = normalizar_seq(seq)
+
+    if tipo == "ADN":
 
-        seq_comp_inv = complemento_inverso(seq)
+        seq_comp_inv = complemento_inverso(seq_normalizada, validar = False)
 
         lista_orfs = [
             seq[0:], seq[1:], seq[2:],
@@ -403,7 +735,7 @@ def get_orfs(seq):
 
         return lista_orfs
 
-    elif tipo_seq(seq) == "RNA":
+    elif tipo == "RNA":
 
         lista_orfs = [
             seq[0:], seq[1:], seq[2:],
@@ -414,6 +746,199 @@ def get_orfs(seq):
        raise ValueError("Sequência inválida")
 
 
+# Índices (16*b1 + 4*b2 + b3, com A = 0, C = 1, G = 2 e T = 3) dos codões usados pelo procurar_orfs
+_CODAO_INICIO = 14                      # ATG
+_CODOES_STOP = (48, 50, 56)             # TAA, TAG, TGA
+_CODAO_INICIO_INV = 19                  # CAT, complemento inverso de ATG
+_CODOES_STOP_INV = (60, 28, 52)         # TTA, CTA, TCA, complementos inversos dos stops
+
+
+def _orfs_diretos(inicios, stops, estado):
+    '''
+    Emparelha, num frame da cadeia direta, cada stop com o primeiro ATG depois do stop anterior.
+    estado = [último stop, primeiro ATG ainda sem stop] é atualizado no fim do bloco
+    '''
+    import numpy as np
+
+    ultimo_stop, aberto = estado
+
+    if len(stops) == 0:
+        if aberto is None and len(inicios):
+            estado[1] = int(inicios[0])
+        return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+
+    anteriores = np.concatenate(([-1 if ultimo_stop is None else ultimo_stop], stops[:-1]))
+    indices = np.searchsorted(inicios, anteriores, side = 'right')
+
+    candidatos = np.full(len(stops), np.iinfo(np.int64).max, dtype = np.int64)
+    dentro = indices < len(inicios)
+    candidatos[dentro] = inicios[indices[dentro]]
+
+    # Um ATG de um bloco anterior ainda sem stop pertence ao primeiro stop deste bloco
+    if aberto is not None:
+        candidatos[0] = aberto
+
+    validos = candidatos < stops
+
+    seguinte = np.searchsorted(inicios, stops[-1], side = 'right')
+    estado[0] = int(stops[-1])
+    estado[1] = int(inicios[seguinte]) if seguinte < len(inicios) else None
+
+    return candidatos[validos], stops[validos] + 3
+
+
+def _orfs_inversos(inicios, stops, estado):
+    '''
+    Emparelha, num frame do complemento inverso (percorrido na cadeia direta da esquerda para a direita),
+    cada stop com o último CAT antes do stop seguinte.
+    estado = [último stop, último CAT depois desse stop] é atualizado no fim do bloco
+    '''
+    import numpy as np
+
+    ultimo_stop, pendente = estado
+    vazio = np.zeros(0, dtype = np.int64)
+
+    if len(stops) == 0:
+        if len(inicios):
+            estado[1] = int(inicios[-1])
+        return vazio, vazio
+
+    anteriores = np.concatenate(([-1 if ultimo_stop is None else ultimo_stop], stops[:-1]))
+    indices = np.searchsorted(inicios, stops, side = 'left') - 1
+
+    candidatos = np.full(len(stops), -1, dtype = np.int64)
+    dentro = indices >= 0
+    candidatos[dentro] = inicios[indices[dentro]]
+
+    # Um CAT de um bloco anterior só conta se não houver nenhum neste bloco antes do primeiro stop
+    if candidatos[0] < 0 and pendente is not None:
+        candidatos[0] = pendente
+
+    validos = candidatos > anteriores
+    if ultimo_stop is None:
+        validos[0] = False
+
+    estado[0] = int(stops[-1])
+    estado[1] = int(inicios[-1]) if len(inicios) and inicios[-1] > stops[-1] else None
+
+    return anteriores[validos], candidatos[validos] + 3
+
+
+def procurar_orfs(seq, tamanho_minimo = 0, ambas_cadeias = True, bloco = 1 << 18):
+
+    """
+    Procura ORFs (de um ATG até ao primeiro stop no mesmo frame) nos seis frames de leitura de get_orfs,
+    numa única passagem pela sequência
+
+    Ao contrário de get_orfs, não é criada nenhuma cópia dos frames: a sequência é lida por blocos de
+    `bloco` codões (através de memoryview no caso de bytes, bytearray, memoryview ou mmap), pelo que a
+    memória usada não depende do tamanho da sequência. Para cada stop é devolvido o ORF mais longo, que
+    começa no primeiro ATG depois do stop anterior. ORFs sem stop no fim da sequência são ignorados.
+    Codões com bases que não sejam A, C, G, T ou U (por exemplo N) não são inícios nem stops.
+
+
+    Parâmetros:
+    -----------
+    seq : str, bytes, bytearray, memoryview, mmap ou VistaSequencia
+        Sequência de ADN ou RNA (maiúsculas ou minúsculas, sem espaços)
+
+    tamanho_minimo : int
+        Tamanho mínimo do ORF em bases, incluindo o codão stop
+
+    ambas_cadeias : bool
+        se False apenas são percorridos os frames 0, 1 e 2 da cadeia direta (por exemplo em RNA)
+
+    bloco : int
+        Número de posições tratadas de cada vez
+
+
+    Retorna:
+    --------
+    generator
+        Gera tuplos (frame, início, fim), com fim exclusivo e o stop incluído. Os frames seguem a ordem
+        de get_orfs: 0 a 2 na sequência e 3 a 5 no complemento inverso, sendo as coordenadas destes
+        relativas ao complemento inverso (complemento_inverso(seq)[início:fim] é o ORF)
+
+
+    Levanta:
+    ------
+    ValueError
+        Se o tamanho mínimo ou o tamanho do bloco não forem válidos
+
+    """
+    import mmap
+    import numpy as np
+    from scripts.codificacao import TABELA_2BITS
+
+    if not isinstance(tamanho_minimo, int) or tamanho_minimo < 0:
+        raise ValueError("O tamanho mínimo deve ser um inteiro não negativo")
+
+    if not isinstance(bloco, int) or bloco < 1:
+        raise ValueError("O tamanho do bloco deve ser um inteiro positivo")
+
+    tabela = TABELA_2BITS.copy()
+    tabela[[ord('U'), ord('u')]] = 3
+
+    # As vistas de scripts.ficheiros são lidas bloco a bloco, tal como as strings
+    por_blocos = isinstance(seq, str) or not isinstance(seq, (bytes, bytearray, memoryview, mmap.mmap))
+    if not por_blocos:
+        seq = memoryview(seq).cast('B')
+
+    comprimento = len(seq)
+    posicoes = comprimento - 2
+    diretos = [[None, None] for _ in range(3)]
+    inversos = [[None, None] for _ in range(3)]
+
+    for inicio_bloco in range(0, max(posicoes, 0), bloco):
+        fim_bloco = min(inicio_bloco + bloco, posicoes)
+        pedaco = seq[inicio_bloco:fim_bloco + 2]
+
+        if isinstance(pedaco, str):
+            pedaco = pedaco.encode('ascii', errors = 'replace')
+        elif por_blocos:
+            pedaco = bytes(pedaco)
+
+        bases = tabela[np.frombuffer(pedaco, dtype = np.uint8)]
+
+        # O OR bit a bit só ultrapassa 3 se alguma base do codão for inválida (INVALIDO = 4)
+        invalidos = bases[:-2] | bases[1:-1] | bases[2:]
+        codoes = (bases[:-2].astype(np.int16) << 4) | (bases[1:-1] << 2) | bases[2:]
+        codoes[invalidos > 3] = -1
+
+        posicao = np.arange(inicio_bloco, fim_bloco, dtype = np.int64)
+
+        inicio = codoes == _CODAO_INICIO
+        stop = np.isin(codoes, _CODOES_STOP)
+
+        for frame in range(3):
+            no_frame = posicao % 3 == frame
+            orfs_inicio, orfs_fim = _orfs_diretos(posicao[inicio & no_frame], posicao[stop & no_frame], diretos[frame])
+
+            for a, b in zip(orfs_inicio.tolist(), orfs_fim.tolist()):
+                if b - a >= tamanho_minimo:
+                    yield frame, a, b
+
+        if not ambas_cadeias:
+            continue
+
+        inicio = codoes == _CODAO_INICIO_INV
+        stop = np.isin(codoes, _CODOES_STOP_INV)
+
+        for frame in range(3):
+            # O codão na posição p da cadeia direta está na posição comprimento - 3 - p do complemento inverso
+            no_frame = (comprimento - 3 - posicao) % 3 == frame
+            orfs_stop, orfs_fim = _orfs_inversos(posicao[inicio & no_frame], posicao[stop & no_frame], inversos[frame])
+
+            for a, b in zip(orfs_stop.tolist(), orfs_fim.tolist()):
+                if b - a >= tamanho_minimo:
+                    yield 3 + frame, comprimento - b, comprimento - a
+
+    # ORFs do complemento inverso cujo último CAT ficou depois do último stop
+    for frame, (ultimo_stop, pendente) in enumerate(inversos):
+        if ultimo_stop is not None and pendente is not None and pendente + 3 - ultimo_stop >= tamanho_minimo:
+            yield 3 + frame, comprimento - pendente - 3, comprimento - ultimo_stop
+
+
 def validar_query_map(qm):
     from scripts.auxiliares import validar_dna
     for key in qm.keys():
@@ -427,7 +952,7 @@ def validar_query_map(qm):
 #######################
         
 # RUI 
-def expande_dir(query : str , seq : str , off_q : int , off_s : int, way : int) -> tuple:
+def expande_dir(query : str , seq : str , off_q : int , off_s : int, way : int, validar : bool = True) -> tuple:
     '''
     Função que estende para a esquerda se recebe -1 ou para a direita se 1
 
@@ -455,6 +980,10 @@ def expande_dir(query : str , seq : str , off_q : int , off_s : int, way : int)
         assume o valor 1 ou -1 indicando a direção para qual a 
         função irá estender (direita ou esquerda respetivamente)
 
+    validar : bool
+        se False não valida a query e a sequência (para quem já as validou uma vez
+        e estende muitos hits sobre as mesmas sequências)
+
     Returns
     -------
 
@@ -464,7 +993,8 @@ def expande_dir(query : str , seq : str , off_q : int , off_s : int, way : int)
 
     '''
     from scripts.auxiliares import validar_dna
-    assert validar_dna(query) and validar_dna(seq)
+    if validar:
+        assert validar_dna(query) and validar_dna(seq)
 
     assert way == 1 or way == -1                                                           # Garantimos que apenas é dado à função o valor "legal" para a variável-direção
 
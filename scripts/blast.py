@@ -0,0 +1,1010 @@
+import json
+import os
+
+import numpy as np
+
+from scripts.codificacao import codificar_2bits, codigos_kmers, codigo_kmer
+
+
+# Tamanho máximo de palavra do índice: a tabela de inícios tem 4**w + 1 entradas
+MAX_W_INDICE = 12
+
+# A tabela densa só é criada se não tiver mais do que DENSIDADE_INDICE entradas por k-mer indexado;
+# nos índices mais pequenos (por exemplo uma única sequência curta) guardam-se só os k-mers presentes
+DENSIDADE_INDICE = 4
+
+
+def query_map(query, w):
+    """
+    Mapeia as sequências numa janela  para identificar subsequências
+
+
+    Parâmetros:
+    -------------
+    query : str, VistaSequencia ou PackedSeq
+        Sequência a ser mapeada
+    w : int
+        Tamanho da janela
+
+
+    Retorna:
+    -------------
+    dict: Dicionário de subsequências mapeadas com seus índices.
+
+
+    Levanta:
+    -------------
+    ValueError
+        Caso sequência inserida seja inválida ou tamanho da janela não ser um inteiro positivo
+
+
+    """
+
+    from scripts.auxiliares import aprimorar_seq
+
+    query = aprimorar_seq(_validar_query(query, w))
+
+    seq_dic = {}
+
+    for i in range(len(query) - w + 1):
+
+        subsequence = query[i:i + w]
+
+        if subsequence in seq_dic:
+
+            seq_dic[subsequence].append(i)
+        else:
+            seq_dic[subsequence] = [i]
+
+    return seq_dic
+
+
+def _validar_query(query, w):
+    """
+    Validações da query e da janela feitas pelo query_map (também usadas por quem cria a tabela da
+    query sem passar pelo dicionário, para levantar os mesmos erros)
+
+    Devolve a query como str: as vistas de scripts.ficheiros e a PackedSeq são lidas para str.
+    """
+    from scripts.auxiliares import tipo_seq, _texto_seq
+
+    query = _texto_seq(query)
+
+    if not isinstance(query, str):
+        raise TypeError("A sequência deve ser uma string")
+    if not isinstance(w, int) or w <= 0:
+        raise ValueError("O tamanho da janela deve ser um inteiro positivo")
+
+    if tipo_seq(query) in ["DNA", "Sequência de aminoácidos"]:
+        raise ValueError("Sequência Inválida")
+
+    return query
+
+
+class IndiceKmers:
+    """
+    Índice de k-mers de uma base de dados de sequências de ADN
+
+    Cada k-mer é codificado com 2 bits por base. As posições de todos os k-mers ficam num único
+    array ordenado por k-mer e a tabela inicios (4**w + 1 entradas) indica onde começa cada
+    k-mer, pelo que a procura de um k-mer é O(1). Quando o índice tem poucos k-mers em relação a
+    4**w, a tabela é esparsa: codigos tem os k-mers presentes, por ordem, inicios tem
+    len(codigos) + 1 entradas e a procura é uma pesquisa binária (np.searchsorted).
+
+    As posições são coordenadas do índice: as sequências são concatenadas pela ordem em que
+    foram dadas e limites[k] é a posição onde começa a sequência k. Com uma única sequência, as
+    coordenadas do índice coincidem com as da sequência.
+
+    O índice pode ser guardado numa pasta (um ficheiro .npy por array) e carregado com
+    memory-map, sem ler os arrays para memória.
+    """
+
+    __slots__ = ('w', 'nomes', 'bases', 'limites', 'inicios', 'posicoes', 'codigos')
+
+    def __init__(self, w, nomes, bases, limites, inicios, posicoes, codigos = None):
+        self.w        = w
+        self.nomes    = nomes
+        self.bases    = bases
+        self.limites  = limites
+        self.inicios  = inicios
+        self.posicoes = posicoes
+        self.codigos  = codigos
+
+    @classmethod
+    def criar(cls, seqs, w, denso = None):
+        """
+        Cria o índice de uma lista de sequências
+
+
+        Parâmetros
+        ----------
+        seqs : list
+            lista de sequências de ADN (str, VistaSequencia ou PackedSeq) ou de tuplos (nome, sequência)
+
+        w : int
+            tamanho dos k-mers
+
+        denso : bool, opcional
+            se True a tabela inicios tem sempre 4**w + 1 entradas, se False é sempre esparsa; por
+            omissão é densa quando 4**w não excede DENSIDADE_INDICE vezes o número de k-mers
+
+
+        Retorna
+        -------
+        IndiceKmers
+
+
+        Levanta
+        -------
+        ValueError
+            Caso w seja inválido ou alguma das sequências não seja ADN válido
+
+        """
+        from scripts.auxiliares import validar_dna, _normalizar_bytes
+
+        if not isinstance(w, int) or not 0 < w <= MAX_W_INDICE:
+            raise ValueError(f"O tamanho da janela deve ser um inteiro entre 1 e {MAX_W_INDICE}")
+
+        nomes, partes, limites = [], [], [0]
+        kmers, posicoes = [], []
+
+        for numero, seq in enumerate(seqs):
+            nome, seq = seq if isinstance(seq, tuple) else (str(numero), seq)
+
+            if not validar_dna(seq):
+                raise ValueError(f"A sequência {nome} contém DNA inválido.")
+
+            # str, vistas de scripts.ficheiros e PackedSeq passam diretamente a bytes
+            bases = np.frombuffer(_normalizar_bytes(seq), dtype = np.uint8)
+            codigos, validos = codigos_kmers(codificar_2bits(bases), w)
+
+            kmers.append(codigos[validos])
+            posicoes.append(np.flatnonzero(validos) + limites[-1])
+
+            nomes.append(nome)
+            partes.append(bases)
+            limites.append(limites[-1] + len(bases))
+
+        kmers    = np.concatenate(kmers) if kmers else np.zeros(0, dtype = np.uint64)
+        posicoes = np.concatenate(posicoes) if posicoes else np.zeros(0, dtype = np.int64)
+
+        # Ordenação estável: as posições de cada k-mer ficam por ordem crescente
+        ordem = np.argsort(kmers, kind = 'stable')
+
+        if denso is None:
+            denso = 4 ** w <= DENSIDADE_INDICE * len(kmers)
+
+        if denso:
+            codigos = None
+            inicios = np.zeros(4 ** w + 1, dtype = np.int64)
+            np.cumsum(np.bincount(kmers.astype(np.int64), minlength = 4 ** w), out = inicios[1:])
+        else:
+            codigos, inicios = np.unique(kmers[ordem], return_index = True)
+            inicios = np.append(inicios, len(kmers)).astype(np.int64)
+
+        bases = np.concatenate(partes) if partes else np.zeros(0, dtype = np.uint8)
+
+        return cls(w, nomes, bases, np.array(limites, dtype = np.int64), inicios, posicoes[ordem].astype(np.int64), codigos)
+
+    def guardar(self, pasta):
+        """
+        Guarda o índice numa pasta, com um ficheiro .npy por array e os metadados em JSON
+        """
+        os.makedirs(pasta, exist_ok = True)
+
+        for nome in ('bases', 'limites', 'inicios', 'posicoes', 'codigos'):
+            if getattr(self, nome) is not None:
+                np.save(os.path.join(pasta, nome + '.npy'), getattr(self, nome))
+
+        with open(os.path.join(pasta, 'indice.json'), 'w') as ficheiro:
+            json.dump({'w': self.w, 'nomes': self.nomes}, ficheiro)
+
+    @classmethod
+    def carregar(cls, pasta, mmap = True):
+        """
+        Carrega um índice guardado com guardar; por omissão os arrays são memory-mapped (só leitura)
+        """
+        with open(os.path.join(pasta, 'indice.json')) as ficheiro:
+            meta = json.load(ficheiro)
+
+        modo = 'r' if mmap else None
+        arrays = {nome: np.load(os.path.join(pasta, nome + '.npy'), mmap_mode = modo)
+                  for nome in ('bases', 'limites', 'inicios', 'posicoes')}
+
+        # Só os índices com tabela esparsa têm o ficheiro dos códigos
+        if os.path.exists(os.path.join(pasta, 'codigos.npy')):
+            arrays['codigos'] = np.load(os.path.join(pasta, 'codigos.npy'), mmap_mode = modo)
+
+        return cls(meta['w'], meta['nomes'], **arrays)
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def procurar(self, kmer):
+        """
+        Devolve as posições (coordenadas do índice) do k-mer, por ordem crescente
+        """
+        codigo = codigo_kmer(kmer) if len(kmer) == self.w else None
+
+        if codigo is None:
+            return self.posicoes[:0]
+
+        if self.codigos is not None:
+            indice = int(np.searchsorted(self.codigos, codigo))
+
+            if indice == len(self.codigos) or self.codigos[indice] != codigo:
+                return self.posicoes[:0]
+
+            codigo = indice
+
+        return self.posicoes[self.inicios[codigo]:self.inicios[codigo + 1]]
+
+    def localizar(self, posicao):
+        """
+        Converte uma posição do índice em (número da sequência, offset dentro da sequência)
+        """
+        numero = int(np.searchsorted(self.limites, posicao, side = 'right')) - 1
+
+        return numero, int(posicao - self.limites[numero])
+
+    def sequencia(self, numero):
+        """
+        Devolve a sequência número numero do índice
+        """
+        return self.bases[self.limites[numero]:self.limites[numero + 1]].tobytes().decode('ascii')
+
+
+def _validar_query_map(query_map):
+    """
+    Validações do query map feitas pela função hits
+    """
+    from scripts.auxiliares import validar_dna
+
+    if query_map == {}:
+        raise ValueError('Query map vazio. Inválido.')
+
+    if not all(isinstance(key,str) for key in query_map.keys()):
+        raise TypeError('Chaves do query-map têm de ser strings.')
+
+    if not all(isinstance(value,list) for value in query_map.values()):
+        raise TypeError('Valores das chaves do query map têm de ser listas.')
+
+    if not all(validar_dna(key) for key in query_map.keys()):
+        raise ValueError('Query map contém codões inválidos.')
+
+
+def _hits_procura(query_map, seq):
+    """
+    Procura linear de cada codão na sequência (usada quando o tamanho da palavra excede MAX_W_INDICE)
+    """
+    res = []
+
+    for codon in query_map:
+        if codon in seq:
+            for offset_q in query_map[codon]:
+                offset_seq = seq.find(codon)
+
+                while offset_seq != -1:
+                    res.append((offset_q,offset_seq))
+                    offset_seq = seq.find(codon, offset_seq + 1 )
+
+    return res
+
+
+def hits(query_map : dict , seq) -> list:
+
+  """
+  Devolve uma lista em que cada elemento é um tuplo com dois valores:
+  1. O Offset na query
+  2. O offset na seq
+
+  Em vez de procurar cada codão na sequência, as posições são obtidas de um IndiceKmers
+  (uma consulta O(1) por codão). Se seq for uma string, é criado o índice dessa sequência.
+
+  Parâmetros
+  ----------
+
+  query_map : dict
+    mapa de substrings que é devolvido ao invocar a função query_map
+
+  seq : str, VistaSequencia, PackedSeq ou IndiceKmers
+    sequência-alvo válida de DNA, ou índice de uma base de dados de sequências
+    (neste caso os offsets na seq são coordenadas do índice)
+
+  Returns
+  -------
+
+  list
+    lista que contém um conjunto de tuplos que correspondem aos offsets correspondentes na query e sequência
+
+
+  """
+  from scripts.auxiliares import validar_dna, aprimorar_seq
+
+  if not isinstance(seq, IndiceKmers):
+    if not validar_dna(seq):
+      raise TypeError('Não é DNA válido.')
+
+  _validar_query_map(query_map)
+
+  w = len(next(iter(query_map)))
+
+  if not isinstance(seq, IndiceKmers):
+    if w > MAX_W_INDICE:
+      return _hits_procura(query_map, aprimorar_seq(seq))
+
+    seq = IndiceKmers.criar([seq], w)
+
+  elif w != seq.w:
+    raise ValueError('O tamanho dos codões do query map é diferente do tamanho de palavra do índice.')
+
+  res = []                                                # Lista de resultado que será populada com os tuplos
+
+  for codon in query_map:                                 # Cicla por todos os codons mapeados na query
+
+    posicoes = seq.procurar(aprimorar_seq(codon)).tolist()  # Posições do codon na sequência, sem a percorrer
+
+    for offset_q in query_map[codon]:                     # Cicla por todos os offsets da query para cada codon
+      res.extend((offset_q, offset_seq) for offset_seq in posicoes)
+
+  return res
+
+
+def extend_hit(query : str , seq , hit : tuple, w : int, x_drop : int = None) -> tuple:
+
+    """
+    Estende um hit dado, identificando sua extensão na sequência de busca e na sequência alvo.
+
+
+    Parâmetros
+    ----------
+
+    query : str, VistaSequencia ou PackedSeq
+      sequencia de DNA válida correspondente à sequência de busca
+
+    seq   : str, VistaSequencia, PackedSeq ou IndiceKmers
+      sequencia de DNA válida correspondente à sequência alvo, ou índice de uma base de dados
+      (neste caso o offset do hit é uma coordenada do índice e a extensão fica limitada à
+      sequência que o contém)
+
+    hit   : tuple
+      Um dos elementos devolvidos pela invocação da função hits
+
+    w     : int
+      o tamanho da janela para a criação de dicionários de substrings na função query map
+
+    x_drop : int, opcional
+      se indicado, a extensão é feita com estender_xdrop (pára quando o score desce x_drop
+      abaixo do melhor) em vez do expande_dir
+
+    Retorna:
+    --------
+    tuple
+      Devolve um tuplo com:
+        1. O offset inicial na query
+        2. O offset inicial na seq
+        3. O tamanho do resultado
+        4. O nº de matches corretos
+
+    Levanta:
+    ValueError
+      Caso a sequência (seq) seja inválida
+
+    """
+    from scripts.auxiliares import validar_dna, aprimorar_seq, expande_dir, _texto_seq
+
+    if not validar_dna(query):
+        raise ValueError('Query contém DNA inválido.')
+
+    if not isinstance(seq, IndiceKmers) and not validar_dna(seq):
+        raise ValueError('Sequência-alvo contém DNA inválido.')
+
+    # As vistas de scripts.ficheiros e a PackedSeq são estendidas como str
+    query = _texto_seq(query)
+    if not isinstance(seq, IndiceKmers):
+        seq = _texto_seq(seq)
+
+    if not all(isinstance(value,int) for value in hit):
+        raise TypeError('Coordenadas do hit só podem ser números inteiros.')
+
+    h1 , h2 = hit
+
+    if h1 < 0 or h2 < 0:
+        raise ValueError('Coordenadas não podem ter valores negativos.')
+
+    # Com um índice, a extensão é feita na sequência que contém o hit
+    inicio = 0
+    if isinstance(seq, IndiceKmers):
+        if h2 >= len(seq.bases):
+            raise IndexError('Uma ou mais coordenadas fora da respetiva sequência.')
+
+        numero, local = seq.localizar(h2)
+        inicio, h2 = h2 - local, local
+
+        # O X-drop compara diretamente os bytes do índice, sem criar a string da sequência
+        seq = seq.bases[seq.limites[numero]:seq.limites[numero + 1]] if x_drop is not None else seq.sequencia(numero)
+
+    if h1 >= len(query) or h2 >= len(seq):
+        raise IndexError('Uma ou mais coordenadas fora da respetiva sequência.')
+
+    if w > len(query) or w > len(seq):
+        raise ValueError('Janela é maior que o tamanho de uma ou mais sequências a analisar.')
+
+    if x_drop is not None:
+        off_q, off_s, tam, matches = estender_xdrop(aprimorar_seq(query), codificar_2bits(seq), [(h1, h2)], w, x_drop)[0]
+        return (off_q, inicio + off_s, tam, matches)
+
+    tam_esq, matches_esq = expande_dir(query , seq , h1     , h2     , -1)
+
+    tam_dt , matches_dt  = expande_dir(query , seq , h1 + w , h2 + w ,  1)
+
+    return (h1 - tam_esq , inicio + h2 - tam_esq , tam_esq + w + tam_dt , matches_esq + w + matches_dt)
+
+
+def best_hit(query : str , seq , window : int, x_drop : int = None) -> tuple:
+
+  """
+  Itera sobre todos os hits extendidos e encontra o mais próximo do início
+  e o maior / mais preciso
+
+  Parâmetros
+  ----------
+  query : str, VistaSequencia ou PackedSeq
+    sequencia de DNA válida correspondente à sequência de busca
+
+  seq   : str, VistaSequencia, PackedSeq ou IndiceKmers
+    sequencia de DNA válida correspondente à sequência alvo, ou índice de uma base de dados
+    (o offset na seq devolvido é então uma coordenada do índice, ver IndiceKmers.localizar)
+
+  w     : int
+    o tamanho da janela para a criação de dicionários de substrings na função query map
+
+  x_drop : int, opcional
+    se indicado, todos os hits são estendidos de uma vez com estender_xdrop
+
+  Returns:
+  --------
+  tuple
+    Devolve um tuplo com:
+      1. O offset inicial na query
+      2. O offset inicial na seq
+      3. O tamanho do resultado
+      4. O nº de matches corretos
+  """
+
+  from scripts.auxiliares import validar_dna, aprimorar_seq, _texto_seq
+
+  query = _texto_seq(query)
+  mapa  = query_map(query, window)
+
+  # O índice é criado uma única vez e partilhado pela procura de seeds e pelas extensões
+  # (as validações são as mesmas, e pela mesma ordem, que as da função hits)
+  if not isinstance(seq, IndiceKmers):
+    if not validar_dna(seq):
+      raise TypeError('Não é DNA válido.')
+
+    _validar_query_map(mapa)
+
+    if window <= MAX_W_INDICE:
+      seq = IndiceKmers.criar([seq], window)
+
+  if x_drop is not None:
+    if not validar_dna(query):
+      raise ValueError('Query contém DNA inválido.')
+
+    if not isinstance(seq, IndiceKmers):
+      seq = IndiceKmers.criar([seq], window)
+
+    extended_hits = _estender_indice(codificar_2bits(aprimorar_seq(query)), seq, hits(mapa,seq), window, x_drop)
+
+  else:
+    extended_hits = [extend_hit(query,seq,hit,window) for hit in hits(mapa,seq)]
+
+  best_hit = (0,0,0,0)             # Iniciamos o tuplo-resultado
+
+  for hit in extended_hits:        # Itera por todos os hits e mantém o que tem o match score maior
+    if hit[3] > best_hit[3]:
+        best_hit = hit
+
+  return best_hit
+
+
+##################################
+#   Extensão X-drop              #
+##################################
+
+def _xdrop_sentido(query, seq, pos_q, pos_s, sentido, x_drop, match, mismatch):
+    """
+    Extensão sem gaps de vários seeds em simultâneo, num sentido (1 direita, -1 esquerda)
+
+    pos_q e pos_s são as primeiras posições a comparar. Em cada iteração é comparado um bloco
+    de posições de todos os seeds ainda ativos (o bloco duplica até 1024). Um seed pára quando
+    o score acumulado desce mais de x_drop abaixo do melhor score já obtido ou quando chega ao
+    fim de uma das sequências. A extensão termina no ponto de melhor score.
+
+    Retorna (tamanho, matches) de cada seed, até ao ponto de melhor score.
+    """
+    from scripts.codificacao import INVALIDO
+
+    total = len(pos_q)
+
+    if sentido == 1:
+        limite = np.minimum(len(query) - pos_q, len(seq) - pos_s)
+    else:
+        limite = np.minimum(pos_q + 1, pos_s + 1)
+
+    melhor  = np.zeros(total, dtype = np.int64)    # melhor score, e tamanho / matches nesse ponto
+    tamanho = np.zeros(total, dtype = np.int64)
+    matches = np.zeros(total, dtype = np.int64)
+
+    atual         = np.zeros(total, dtype = np.int64)   # score e matches acumulados até ao bloco atual
+    matches_atual = np.zeros(total, dtype = np.int64)
+    passo         = np.zeros(total, dtype = np.int64)
+
+    ativos = np.flatnonzero(limite > 0)
+    bloco  = 16
+
+    while ativos.size:
+        desloc = passo[ativos, None] + np.arange(bloco)
+        dentro = desloc < limite[ativos, None]
+
+        # Índices fora das sequências são substituídos por 0; essas posições são descartadas
+        indices_q = np.where(dentro, pos_q[ativos, None] + sentido * desloc, 0)
+        indices_s = np.where(dentro, pos_s[ativos, None] + sentido * desloc, 0)
+
+        bases_q = query[indices_q]
+        iguais  = (bases_q == seq[indices_s]) & (bases_q != INVALIDO)
+
+        scores  = np.where(iguais, np.int32(match), np.int32(mismatch))
+        acum    = np.cumsum(scores, axis = 1, dtype = np.int32)
+        acum   += atual[ativos, None].astype(np.int32)
+        maximos = np.maximum.accumulate(acum, axis = 1)
+        np.maximum(maximos, melhor[ativos, None].astype(np.int32), out = maximos)
+
+        # Primeira posição em que o seed pára (fim da sequência ou queda maior que x_drop)
+        parar  = ~dentro | (maximos - acum > x_drop)
+        parou  = parar.any(axis = 1)
+        valido = np.arange(bloco) < np.where(parou, parar.argmax(axis = 1), bloco)[:, None]
+
+        # Novo melhor score: primeira posição válida em que o score supera o melhor anterior
+        candidatos = np.where(valido, acum, np.iinfo(np.int32).min)
+        posicao    = candidatos.argmax(axis = 1)
+        linhas     = np.arange(len(ativos))
+        melhorou   = candidatos[linhas, posicao] > melhor[ativos]
+
+        matches_bloco = matches_atual[ativos, None] + np.cumsum(iguais, axis = 1, dtype = np.int32)
+
+        atualizar = ativos[melhorou]
+        melhor[atualizar]  = candidatos[linhas, posicao][melhorou]
+        tamanho[atualizar] = desloc[linhas, posicao][melhorou] + 1
+        matches[atualizar] = matches_bloco[linhas, posicao][melhorou]
+
+        continuam = ~parou
+        atual[ativos[continuam]]         = acum[continuam, -1]
+        matches_atual[ativos[continuam]] = matches_bloco[continuam, -1]
+        passo[ativos[continuam]]        += bloco
+
+        ativos = ativos[continuam]
+        bloco  = min(2 * bloco, 1024)
+
+    return tamanho, matches
+
+
+def estender_xdrop(query, seq, seeds, w : int, x_drop : int = 10, match : int = 1, mismatch : int = -1) -> list:
+    """
+    Estende um conjunto de seeds com X-drop, sem gaps, comparando arrays de bases
+
+    Todos os seeds são estendidos ao mesmo tempo, para a esquerda a partir de (h1 - 1, h2 - 1) e
+    para a direita a partir de (h1 + w, h2 + w). As sequências não são validadas: quem chama
+    valida-as uma vez e pode passar diretamente os arrays de codificar_2bits (as bases
+    inválidas nunca contam como match).
+
+
+    Parâmetros
+    ----------
+    query : str ou numpy.ndarray
+        sequência de busca (str ou PackedSeq), ou o respetivo array de codificar_2bits
+
+    seq : str ou numpy.ndarray
+        sequência alvo (str ou PackedSeq), ou o respetivo array de codificar_2bits
+
+    seeds : iterável
+        tuplos (offset na query, offset na seq), como os devolvidos pela função hits
+
+    w : int
+        tamanho dos seeds
+
+    x_drop : int
+        queda máxima do score em relação ao melhor score antes de parar a extensão
+
+    match : int
+        score de um match
+
+    mismatch : int
+        score de um mismatch
+
+
+    Retorna
+    -------
+    list
+        um tuplo por seed, como o do extend_hit: (offset inicial na query, offset inicial na
+        seq, tamanho, nº de matches), em que o seed conta como w matches
+
+    """
+    if not isinstance(query, np.ndarray):
+        query = codificar_2bits(query)
+    if not isinstance(seq, np.ndarray):
+        seq = codificar_2bits(seq)
+
+    seeds = np.asarray(seeds if isinstance(seeds, np.ndarray) else list(seeds), dtype = np.int64).reshape(-1, 2)
+    h1, h2 = seeds[:, 0], seeds[:, 1]
+
+    tam_esq, matches_esq = _xdrop_sentido(query, seq, h1 - 1, h2 - 1, -1, x_drop, match, mismatch)
+    tam_dt , matches_dt  = _xdrop_sentido(query, seq, h1 + w, h2 + w,  1, x_drop, match, mismatch)
+
+    return list(zip((h1 - tam_esq).tolist(), (h2 - tam_esq).tolist(),
+                    (tam_esq + w + tam_dt).tolist(), (matches_esq + w + matches_dt).tolist()))
+
+
+def _estender_indice(query, indice, seeds, w, x_drop):
+    """
+    Estende com X-drop seeds em coordenadas do índice, em lote por sequência do índice
+
+    Cada sequência é estendida isoladamente, para que a extensão não passe para a seguinte.
+    Os resultados ficam pela ordem dos seeds e em coordenadas do índice.
+    """
+    seeds = np.asarray(seeds, dtype = np.int64).reshape(-1, 2)
+    numeros = np.searchsorted(indice.limites, seeds[:, 1], side = 'right') - 1
+    resultado = [None] * len(seeds)
+
+    for numero in np.unique(numeros).tolist():
+        selecao = np.flatnonzero(numeros == numero)
+        inicio, fim = int(indice.limites[numero]), int(indice.limites[numero + 1])
+
+        locais = seeds[selecao] - [0, inicio]
+        estendidos = estender_xdrop(query, codificar_2bits(indice.bases[inicio:fim]), locais, w, x_drop)
+
+        for posicao, (off_q, off_s, tam, matches) in zip(selecao.tolist(), estendidos):
+            resultado[posicao] = (off_q, inicio + off_s, tam, matches)
+
+    return resultado
+
+
+##################################
+#   Seeds com dois hits          #
+##################################
+
+def estender_dois_hits(query, seq, seeds, w : int, A : int = 40, x_drop : int = 10) -> tuple:
+    """
+    Filtra os seeds com a regra dos dois hits e estende-os sem repetir extensões na mesma diagonal
+
+    Os seeds são agrupados por diagonal (offset_s - offset_q). Um seed só é estendido se houver
+    outro seed na mesma diagonal, sem sobreposição, a no máximo A posições antes dele
+    (w <= distância <= A). Em cada diagonal os seeds são percorridos por ordem e os que ficam
+    dentro de uma extensão anterior são ignorados. Em cada ronda é estendido, com
+    estender_xdrop, um seed por diagonal.
+
+
+    Parâmetros
+    ----------
+    query : str ou numpy.ndarray
+        sequência de busca (str ou PackedSeq), ou o respetivo array de codificar_2bits
+
+    seq : str ou numpy.ndarray
+        sequência alvo (str ou PackedSeq), ou o respetivo array de codificar_2bits
+
+    seeds : iterável
+        tuplos (offset na query, offset na seq), como os devolvidos pela função hits
+
+    w : int
+        tamanho dos seeds
+
+    A : int
+        distância máxima entre os dois hits da mesma diagonal
+
+    x_drop : int
+        passado ao estender_xdrop
+
+
+    Retorna
+    -------
+    tuple
+        (lista de hits estendidos, dicionário com o número de seeds gerados, de seeds mantidos
+        pela regra dos dois hits e de extensões feitas)
+
+
+    Levanta
+    -------
+    ValueError
+        Caso A seja menor que w
+
+    """
+    if not isinstance(A, int) or A < w:
+        raise ValueError('A janela A tem de ser um inteiro maior ou igual ao tamanho dos seeds.')
+
+    if not isinstance(query, np.ndarray):
+        query = codificar_2bits(query)
+    if not isinstance(seq, np.ndarray):
+        seq = codificar_2bits(seq)
+
+    seeds = np.asarray(seeds if isinstance(seeds, np.ndarray) else list(seeds), dtype = np.int64).reshape(-1, 2)
+    estatisticas = {'seeds': len(seeds), 'seeds_mantidos': 0, 'extensoes': 0}
+
+    if not len(seeds):
+        return [], estatisticas
+
+    # Chave única (diagonal, offset na query), com folga A para as procuras não mudarem de diagonal
+    offset_q, offset_s = seeds[:, 0], seeds[:, 1]
+    largura = len(query) + A + 1
+    chaves  = (offset_s - offset_q + len(query)) * largura + offset_q + A
+
+    ordem = np.argsort(chaves, kind = 'stable')
+    chaves, offset_q, offset_s = chaves[ordem], offset_q[ordem], offset_s[ordem]
+
+    # Regra dos dois hits: existe um seed da mesma diagonal com offset_q em [q - A, q - w]
+    primeiro = np.searchsorted(chaves, chaves - A, side = 'left')
+    ultimo   = np.searchsorted(chaves, chaves - w, side = 'right')
+    mantidos = primeiro < ultimo
+
+    chaves, offset_q, offset_s = chaves[mantidos], offset_q[mantidos], offset_s[mantidos]
+    estatisticas['seeds_mantidos'] = len(chaves)
+
+    # Em cada ronda estende-se o primeiro seed ainda não coberto de cada diagonal
+    diagonais = chaves // largura
+    fim_diagonal = np.searchsorted(diagonais, diagonais, side = 'right')
+    atuais = np.flatnonzero(np.r_[True, diagonais[1:] != diagonais[:-1]]) if len(chaves) else np.zeros(0, dtype = np.int64)
+
+    estendidos = []
+
+    while atuais.size:
+        resultados = estender_xdrop(query, seq, np.stack((offset_q[atuais], offset_s[atuais]), axis = 1), w, x_drop)
+        estendidos.extend(resultados)
+        estatisticas['extensoes'] += len(atuais)
+
+        # Salta os seeds da mesma diagonal que ficaram dentro da extensão
+        cobertos = np.array([off_q + tam for off_q, _, tam, _ in resultados], dtype = np.int64)
+        seguintes = np.searchsorted(chaves, diagonais[atuais] * largura + cobertos + A, side = 'left')
+        seguintes = np.maximum(seguintes, atuais + 1)
+
+        atuais = seguintes[seguintes < fim_diagonal[atuais]]
+
+    return estendidos, estatisticas
+
+
+##################################
+#   Pesquisa numa base de dados  #
+##################################
+
+def _tabela_query(mapa):
+    """
+    Converte o query map em arrays ordenados por código de k-mer
+
+    Retorna (códigos, ordem de inserção do codão no mapa, offset na query), um elemento por
+    ocorrência do codão na query.
+    """
+    codigos, ordens, offsets = [], [], []
+
+    for ordem, (codon, offsets_q) in enumerate(mapa.items()):
+        codigo = codigo_kmer(codon)
+
+        for offset_q in offsets_q:
+            codigos.append(codigo)
+            ordens.append(ordem)
+            offsets.append(offset_q)
+
+    codigos = np.array(codigos, dtype = np.uint64)
+    ordem   = np.argsort(codigos, kind = 'stable')
+
+    return codigos[ordem], np.array(ordens, dtype = np.int64)[ordem], np.array(offsets, dtype = np.int64)[ordem]
+
+
+def _tabela_kmers_query(query, window):
+    """
+    Tabela da query (como _tabela_query) com as mesmas validações do query map
+
+    Até MAX_K bases a tabela vem diretamente do contador de k-mers de scripts.kmers, sem criar o
+    dicionário do query_map; para palavras maiores é usado o query_map. Os erros (tipo, mensagem e
+    ordem das validações) são os mesmos nos dois casos.
+    """
+    from scripts.auxiliares import validar_dna, aprimorar_seq
+    from scripts.kmers import MAX_K, contar_kmers
+
+    if not isinstance(window, int) or not 0 < window <= MAX_K:
+        mapa = query_map(query, window)
+
+        if not validar_dna(query):
+            raise ValueError('Query contém DNA inválido.')
+
+        _validar_query_map(mapa)
+
+        return _tabela_query(mapa)
+
+    query = _validar_query(query, window)
+
+    if not validar_dna(query):
+        raise ValueError('Query contém DNA inválido.')
+
+    contagem = contar_kmers(aprimorar_seq(query), window, canonicos = False, posicoes = True)
+
+    if not len(contagem):
+        raise ValueError('Query map vazio. Inválido.')
+
+    return contagem.tabela_query()
+
+
+def _seeds(tabela, subject, w):
+    """
+    Encontra os hits da query num subject, percorrendo o subject uma única vez
+
+    Os k-mers do subject são codificados de uma vez e procurados na tabela da query com
+    searchsorted. Os hits ficam pela mesma ordem que os da função hits (ordem dos codões no
+    query map, offset na query e offset no subject).
+
+    Retorna um array (n, 2) com as colunas offset_q e offset_s.
+    """
+    codigos_q, ordens_q, offsets_q = tabela
+
+    codigos_s, validos = codigos_kmers(codificar_2bits(subject), w)
+    posicoes_s = np.flatnonzero(validos)
+    codigos_s  = codigos_s[validos]
+
+    inicio = np.searchsorted(codigos_q, codigos_s, side = 'left')
+    fim    = np.searchsorted(codigos_q, codigos_s, side = 'right')
+    contagens = fim - inicio
+
+    # Cada posição do subject é repetida uma vez por ocorrência do k-mer na query
+    offset_s = np.repeat(posicoes_s, contagens)
+    entradas = np.repeat(inicio - np.cumsum(contagens) + contagens, contagens) + np.arange(contagens.sum())
+
+    ordem = np.lexsort((offset_s, offsets_q[entradas], ordens_q[entradas]))
+
+    return np.stack((offsets_q[entradas][ordem], offset_s[ordem]), axis = 1)
+
+
+def pesquisar_base_dados(query : str, base_dados, window : int, x_drop : int = None, janela_dois_hits : int = None,
+                         estatisticas : dict = None):
+    """
+    Procura a query em todas as sequências de uma base de dados, uma sequência de cada vez
+
+    O query map é criado e validado uma única vez. As sequências da base de dados são lidas
+    de forma preguiçosa (um registo de cada vez), pelo que a base de dados nunca está toda em
+    memória. Os k-mers com bases que não sejam A, C, G ou T não geram hits.
+
+
+    Parâmetros
+    ----------
+    query : str, VistaSequencia ou PackedSeq
+        sequência de DNA válida correspondente à sequência de busca
+
+    base_dados : str ou iterável
+        caminho para um ficheiro FASTA, ou iterável de tuplos (nome, sequência) ou de sequências
+
+    window : int
+        o tamanho da janela para a criação de dicionários de substrings na função query map
+
+    x_drop : int, opcional
+        se indicado, os hits de cada sequência são estendidos de uma vez com estender_xdrop
+
+    janela_dois_hits : int, opcional
+        se indicado, os hits passam pela regra dos dois hits do estender_dois_hits, com esta
+        janela A (e x_drop 10 se x_drop não for indicado)
+
+    estatisticas : dict, opcional
+        dicionário onde são somadas as contagens devolvidas pelo estender_dois_hits
+
+
+    Retorna
+    -------
+    generator
+        Gera, à medida que cada sequência é processada, tuplos (nome, hit) com o melhor hit
+        dessa sequência (o mesmo que best_hit devolveria), para as sequências com hits
+
+
+    Levanta
+    -------
+    ValueError
+        Caso a query seja inválida
+
+    """
+    from scripts.auxiliares import aprimorar_seq, expande_dir
+    from scripts.ficheiros import ler_fasta
+
+    tabela = _tabela_kmers_query(query, window)
+    query  = aprimorar_seq(query)
+    codigos_query = codificar_2bits(query)
+
+    subjects = ler_fasta(base_dados) if isinstance(base_dados, str) else base_dados
+
+    for numero, registo in enumerate(subjects):
+        nome, subject = registo if isinstance(registo, tuple) else (str(numero), registo)
+        subject = aprimorar_seq(subject)
+
+        if len(subject) < window:
+            continue
+
+        melhor = (0,0,0,0)
+
+        if x_drop is not None or janela_dois_hits is not None:
+            seeds = _seeds(tabela, subject, window)
+            codigos_subject = codificar_2bits(subject)
+
+            if janela_dois_hits is not None:
+                estendidos, contagens = estender_dois_hits(codigos_query, codigos_subject, seeds, window, janela_dois_hits,
+                                                           10 if x_drop is None else x_drop)
+                if estatisticas is not None:
+                    for chave, valor in contagens.items():
+                        estatisticas[chave] = estatisticas.get(chave, 0) + valor
+
+            else:
+                estendidos = estender_xdrop(codigos_query, codigos_subject, seeds, window, x_drop)
+
+            for hit in estendidos:
+                if hit[3] > melhor[3]:
+                    melhor = hit
+
+            if melhor[3] > 0:
+                yield nome, melhor
+
+            continue
+
+        for h1, h2 in _seeds(tabela, subject, window).tolist():
+            tam_esq, matches_esq = expande_dir(query, subject, h1         , h2         , -1, validar = False)
+            tam_dt , matches_dt  = expande_dir(query, subject, h1 + window, h2 + window,  1, validar = False)
+
+            if matches_esq + window + matches_dt > melhor[3]:
+                melhor = (h1 - tam_esq, h2 - tam_esq, tam_esq + window + tam_dt, matches_esq + window + matches_dt)
+
+        if melhor[3] > 0:
+            yield nome, melhor
+
+
+def melhores_hits(query : str, base_dados, window : int, n : int = 10, x_drop : int = None,
+                  janela_dois_hits : int = None, estatisticas : dict = None) -> list:
+    """
+    Devolve os n melhores hits da query numa base de dados
+
+    Mantém um heap com no máximo n elementos enquanto percorre as sequências com
+    pesquisar_base_dados. Em caso de empate fica a sequência que aparece primeiro.
+
+
+    Parâmetros
+    ----------
+    query : str, VistaSequencia ou PackedSeq
+        sequência de DNA válida correspondente à sequência de busca
+
+    base_dados : str ou iterável
+        caminho para um ficheiro FASTA, ou iterável de tuplos (nome, sequência) ou de sequências
+
+    window : int
+        o tamanho da janela para a criação de dicionários de substrings na função query map
+
+    n : int
+        número de hits a devolver
+
+    x_drop, janela_dois_hits, estatisticas : opcionais
+        passados ao pesquisar_base_dados
+
+
+    Retorna
+    -------
+    list
+        lista de tuplos (nome, hit), do maior para o menor número de matches
+
+    """
+    import heapq
+
+    if not isinstance(n, int) or n <= 0:
+        raise ValueError('O número de hits deve ser um inteiro positivo.')
+
+    heap = []
+
+    for ordem, (nome, hit) in enumerate(pesquisar_base_dados(query, base_dados, window, x_drop,
+                                                                    janela_dois_hits, estatisticas)):
+        elemento = (hit[3], -ordem, nome, hit)
+
+        if len(heap) < n:
+            heapq.heappush(heap, elemento)
+        elif elemento > heap[0]:
+            heapq.heapreplace(heap, elemento)
+
+    return [(nome, hit) for _, _, nome, hit in sorted(heap, reverse = True)]
@@ -0,0 +1,284 @@
+import numpy as np
+
+
+# Tabela de 256 entradas que converte cada byte ASCII no código de 2 bits da base
+# (A = 0, C = 1, G = 2, T = 3). Qualquer outro caracter fica com o código INVALIDO.
+ALFABETO_2BITS = 'ACGT'
+INVALIDO = 4
+
+TABELA_2BITS = np.full(256, INVALIDO, dtype = np.uint8)
+for codigo, base in enumerate(ALFABETO_2BITS):
+    TABELA_2BITS[ord(base)] = codigo
+    TABELA_2BITS[ord(base.lower())] = codigo
+
+
+def codificar_2bits(seq):
+    """
+    Converte uma sequência de ADN num array com o código de 2 bits de cada base
+
+
+    Parâmetro
+    -------------
+    seq : str, bytes, numpy.ndarray, VistaSequencia ou PackedSeq
+        Sequência de ADN (texto, bytes ASCII, array uint8 de códigos ASCII, vista de um ficheiro ou
+        sequência já compactada)
+
+
+    Retorna
+    -------------
+    numpy.ndarray
+        Array uint8 com valores 0-3, ou INVALIDO (4) nas posições que não são A, C, G ou T
+
+    """
+    if isinstance(seq, PackedSeq):
+        return seq.codigos()
+
+    if isinstance(seq, str):
+        seq = seq.encode('ascii', errors = 'replace')
+    elif not isinstance(seq, (np.ndarray, bytes, bytearray, memoryview)) and hasattr(type(seq), '__bytes__'):
+        seq = bytes(seq)    # Vistas de scripts.ficheiros
+
+    if not isinstance(seq, np.ndarray):
+        seq = np.frombuffer(seq, dtype = np.uint8)
+
+    return TABELA_2BITS[seq]
+
+
+def codigos_kmers(codigos, w):
+    """
+    Calcula o código inteiro (2 bits por base) de todos os k-mers de tamanho w
+
+
+    Parâmetros
+    -------------
+    codigos : numpy.ndarray
+        Array devolvido pela função codificar_2bits
+
+    w : int
+        Tamanho dos k-mers (no máximo 32, para caberem num uint64)
+
+
+    Retorna
+    -------------
+    tuple
+        (códigos uint64 de cada k-mer, array bool que indica os k-mers sem bases inválidas),
+        ambos com len(codigos) - w + 1 elementos
+
+
+    Levanta
+    -------------
+    ValueError
+        Caso w não seja um inteiro entre 1 e 32
+
+    """
+    if not isinstance(w, int) or not 0 < w <= 32:
+        raise ValueError("O tamanho da janela deve ser um inteiro entre 1 e 32")
+
+    total = len(codigos) - w + 1
+
+    if total <= 0:
+        return np.zeros(0, dtype = np.uint64), np.zeros(0, dtype = bool)
+
+    # Número de bases inválidas em cada janela, a partir da soma acumulada
+    invalidas = np.concatenate(([0], np.cumsum(codigos == INVALIDO)))
+    validos = (invalidas[w:] - invalidas[:total]) == 0
+
+    bases = np.where(codigos == INVALIDO, 0, codigos).astype(np.uint64)
+
+    kmers = np.zeros(total, dtype = np.uint64)
+    for desvio in range(w):
+        kmers <<= np.uint64(2)
+        kmers |= bases[desvio:desvio + total]
+
+    return kmers, validos
+
+
+def codigo_kmer(kmer):
+    """
+    Devolve o código inteiro de um k-mer (2 bits por base), ou None se tiver bases inválidas
+
+
+    Parâmetro
+    -------------
+    kmer : str
+        k-mer de ADN
+
+
+    Retorna
+    -------------
+    int ou None
+
+    """
+    codigo = 0
+
+    for base in codificar_2bits(kmer):
+        if base == INVALIDO:
+            return None
+        codigo = (codigo << 2) | int(base)
+
+    return codigo
+
+
+class PackedSeq:
+    """
+    Sequência de ADN compacta: 2 bits por base (4 bases por byte) e uma máscara de N guardada
+    como intervalos [início, fim)
+
+    Ocupa cerca de 1/4 da memória de uma str. Qualquer caracter que não seja A, C, G ou T (depois de
+    passar a maiúsculas e retirar os espaços, como aprimorar_seq) é guardado como N. Cortar a sequência
+    (seq[inicio:fim]) e o complemento inverso devolvem vistas sobre o mesmo buffer, em O(1).
+
+    Como tem __bytes__, é aceite diretamente pelas funções de scripts.auxiliares, pelos alinhadores,
+    pelo índice de k-mers de scripts.blast (IndiceKmers, hits, best_hit) e pelas contagens da PWM e
+    da PSSM, sem passar por str. O query_map, a extensão dos hits e o seq_provavel leem-na para str,
+    porque trabalham com substrings.
+
+    """
+    __slots__ = ('_bases', '_n_inicios', '_n_fins', '_inicio', '_fim', '_inverso')
+
+    def __init__(self, seq):
+        """
+        Parâmetro
+        -------------
+        seq : str, bytes ou VistaSequencia
+            Sequência de ADN a compactar
+
+        """
+        from scripts.auxiliares import _normalizar_bytes
+
+        if isinstance(seq, PackedSeq):
+            seq = bytes(seq)
+
+        dados = _normalizar_bytes(seq)
+
+        if dados is None:
+            raise ValueError("A sequência tem caracteres fora do ASCII")
+
+        codigos = codificar_2bits(dados)
+        invalidos = np.concatenate(([False], codigos == INVALIDO, [False]))
+
+        # Intervalos de N a partir das transições da máscara
+        transicoes = np.flatnonzero(invalidos[1:] != invalidos[:-1])
+        self._n_inicios = transicoes[0::2].astype(np.int64)
+        self._n_fins = transicoes[1::2].astype(np.int64)
+
+        codigos = np.where(codigos == INVALIDO, 0, codigos).astype(np.uint8)
+        codigos = np.concatenate((codigos, np.zeros(-len(codigos) % 4, dtype = np.uint8))).reshape(-1, 4)
+
+        self._bases = (codigos[:, 0] << 6) | (codigos[:, 1] << 4) | (codigos[:, 2] << 2) | codigos[:, 3]
+        self._inicio, self._fim, self._inverso = 0, len(dados), False
+
+    def _vista(self, inicio, fim, inverso):
+        """Nova sequência sobre o mesmo buffer, entre as posições físicas inicio e fim"""
+        vista = object.__new__(PackedSeq)
+        vista._bases, vista._n_inicios, vista._n_fins = self._bases, self._n_inicios, self._n_fins
+        vista._inicio, vista._fim, vista._inverso = inicio, fim, inverso
+        return vista
+
+    def __len__(self):
+        return self._fim - self._inicio
+
+    @property
+    def nbytes(self):
+        """Memória ocupada pelo buffer partilhado e pela máscara de N, em bytes"""
+        return self._bases.nbytes + self._n_inicios.nbytes + self._n_fins.nbytes
+
+    def codigos(self):
+        """
+        Devolve o array uint8 com o código de 2 bits de cada base (A = 0, C = 1, G = 2, T = 3, N = INVALIDO),
+        no mesmo formato de codificar_2bits
+        """
+        inicio, fim = self._inicio, self._fim
+
+        if fim <= inicio:
+            return np.zeros(0, dtype = np.uint8)
+
+        blocos = self._bases[inicio >> 2:((fim - 1) >> 2) + 1]
+        codigos = ((blocos[:, None] >> np.array([6, 4, 2, 0], dtype = np.uint8)) & 3).reshape(-1)
+        desvio = inicio & 3
+        codigos = codigos[desvio:desvio + fim - inicio]
+
+        # Intervalos de N que tocam a região, marcados com uma soma acumulada
+        primeiro = np.searchsorted(self._n_fins, inicio, side = 'right')
+        ultimo = np.searchsorted(self._n_inicios, fim, side = 'left')
+
+        if primeiro < ultimo:
+            marcas = np.zeros(fim - inicio + 1, dtype = np.int32)
+            np.add.at(marcas, np.maximum(self._n_inicios[primeiro:ultimo], inicio) - inicio, 1)
+            np.add.at(marcas, np.minimum(self._n_fins[primeiro:ultimo], fim) - inicio, -1)
+            codigos[np.cumsum(marcas[:-1]) > 0] = INVALIDO
+
+        if self._inverso:
+            codigos = codigos[::-1]
+            codigos = np.where(codigos == INVALIDO, INVALIDO, 3 - codigos).astype(np.uint8)
+
+        return codigos
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio, fim, passo = indice.indices(len(self))
+
+            if passo != 1:
+                return str(self)[indice]
+
+            fim = max(fim, inicio)
+
+            if self._inverso:
+                return self._vista(self._fim - fim, self._fim - inicio, True)
+
+            return self._vista(self._inicio + inicio, self._inicio + fim, False)
+
+        if indice < 0:
+            indice += len(self)
+
+        if not 0 <= indice < len(self):
+            raise IndexError("Posição fora da sequência")
+
+        return str(self[indice:indice + 1])
+
+    def complemento_inverso(self):
+        """Devolve o complemento inverso como vista sobre o mesmo buffer, em O(1)"""
+        return self._vista(self._inicio, self._fim, not self._inverso)
+
+    def kmers(self, k, bloco = 1 << 16):
+        """
+        Gera os k-mers (str) da sequência por ordem, descompactando-a por blocos
+
+        Levanta
+        -------------
+        ValueError
+            Caso k não seja um inteiro positivo
+        """
+        if not isinstance(k, int) or k <= 0:
+            raise ValueError("O tamanho dos k-mers deve ser um inteiro positivo")
+
+        for inicio in range(0, len(self) - k + 1, bloco):
+            texto = str(self[inicio:inicio + bloco + k - 1])
+
+            for i in range(len(texto) - k + 1):
+                yield texto[i:i + k]
+
+    def codigos_kmers(self, k):
+        """Códigos inteiros de todos os k-mers, como codigos_kmers(self.codigos(), k)"""
+        return codigos_kmers(self.codigos(), k)
+
+    def __bytes__(self):
+        return _LETRAS_2BITS[self.codigos()].tobytes()
+
+    def __str__(self):
+        return bytes(self).decode('ascii')
+
+    def __repr__(self):
+        return f"PackedSeq({len(self)} bases)"
+
+    def __eq__(self, outra):
+        if isinstance(outra, (str, PackedSeq)):
+            return str(self) == str(outra)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+# Letra de cada código de 2 bits, com N para INVALIDO
+_LETRAS_2BITS = np.frombuffer(b'ACGTN', dtype = np.uint8)
@@ -0,0 +1,362 @@
+import numpy as np
+
+from scripts.codificacao import TABELA_2BITS, INVALIDO, codigos_kmers
+
+
+# Tamanho máximo dos k-mers do espectro (a tabela de contagens tem 4**k entradas)
+MAX_K_ESPECTRO = 12
+
+# Códigos de 2 bits de C e G
+_C, _G = 1, 2
+
+
+def _array_bloco(bloco):
+    """
+    Converte um bloco (str, bytes, array uint8 ou objeto com __bytes__, como as vistas de
+    scripts.ficheiros e a PackedSeq) num array uint8 com os códigos ASCII, sem copiar quando possível
+    """
+    if isinstance(bloco, np.ndarray):
+        return bloco
+
+    if isinstance(bloco, str):
+        bloco = bloco.encode('ascii', errors = 'replace')
+    elif not isinstance(bloco, (bytes, bytearray, memoryview)):
+        bloco = bytes(bloco)
+
+    return np.frombuffer(bloco, dtype = np.uint8)
+
+
+class Composicao:
+    """
+    Estatísticas de composição de uma sequência, acumuladas bloco a bloco
+
+    Cada bloco é lido uma única vez: um np.bincount dos bytes dá as contagens de todos os símbolos e,
+    se k for indicado, os k-mers do bloco (códigos de 2 bits) são somados ao espectro. As últimas k-1
+    bases de cada bloco são guardadas para contar os k-mers que atravessam a fronteira entre blocos.
+    Os k-mers com bases que não sejam A, C, G ou T não são contados.
+
+    """
+    __slots__ = ('k', 'contagens', 'espectro', '_cauda')
+
+    def __init__(self, k = None):
+        """
+        Parâmetro
+        -------------
+        k : int, opcional
+            Tamanho dos k-mers do espectro (1 a MAX_K_ESPECTRO); se None o espectro não é calculado
+
+
+        Levanta
+        -------------
+        ValueError
+            Caso k não seja um inteiro entre 1 e MAX_K_ESPECTRO
+
+        """
+        if k is not None and (not isinstance(k, int) or not 0 < k <= MAX_K_ESPECTRO):
+            raise ValueError(f"O tamanho dos k-mers deve ser um inteiro entre 1 e {MAX_K_ESPECTRO}")
+
+        self.k = k
+        self.contagens = np.zeros(256, dtype = np.int64)
+        self.espectro = np.zeros(4 ** k, dtype = np.int64) if k else None
+        self._cauda = np.zeros(0, dtype = np.uint8)
+
+    def atualizar(self, bloco):
+        """Acrescenta um bloco da sequência às contagens (e ao espectro) e devolve o próprio objeto"""
+        dados = _array_bloco(bloco)
+        self.contagens += np.bincount(dados, minlength = 256)
+
+        if self.k:
+            codigos = np.concatenate((self._cauda, TABELA_2BITS[dados]))
+            kmers, validos = codigos_kmers(codigos, self.k)
+
+            self.espectro += np.bincount(kmers[validos].astype(np.intp), minlength = len(self.espectro))
+            self._cauda = codigos[len(codigos) - min(len(codigos), self.k - 1):]
+
+        return self
+
+    def _base(self, base):
+        return int(self.contagens[ord(base)] + self.contagens[ord(base.lower())])
+
+    @property
+    def bases(self):
+        """Dicionário com as contagens de A, T, C e G (maiúsculas e minúsculas), como o contar_bases"""
+        return {base : self._base(base) for base in "ATCG"}
+
+    @property
+    def total(self):
+        """Número total de símbolos lidos"""
+        return int(self.contagens.sum())
+
+    @property
+    def outros(self):
+        """Número de símbolos que não são A, C, G ou T (por exemplo N)"""
+        return self.total - sum(self.bases.values())
+
+    @property
+    def gc(self):
+        """Percentagem de G e C entre as bases A, C, G e T (nan se não houver nenhuma)"""
+        acgt = sum(self.bases.values())
+
+        return 100.0 * (self._base("G") + self._base("C")) / acgt if acgt else float('nan')
+
+    @property
+    def gc_skew(self):
+        """GC skew, (G - C) / (G + C) (nan se não houver G nem C)"""
+        g, c = self._base("G"), self._base("C")
+
+        return (g - c) / (g + c) if g + c else float('nan')
+
+    def __repr__(self):
+        return f"Composicao({self.total} símbolos, GC = {self.gc:.1f}%)"
+
+
+def composicao(seq, k = None, bloco = 1 << 20):
+    """
+    Calcula a composição de uma sequência percorrendo-a em blocos
+
+
+    Parâmetros
+    -------------
+    seq : str, bytes, VistaSequencia ou PackedSeq
+        Sequência de ADN; as vistas de scripts.ficheiros são lidas bloco a bloco
+
+    k : int, opcional
+        Tamanho dos k-mers do espectro
+
+    bloco : int
+        Número de bases lidas de cada vez
+
+
+    Retorna
+    -------------
+    Composicao
+
+    """
+    if not isinstance(bloco, int) or bloco < 1:
+        raise ValueError("O tamanho do bloco deve ser um inteiro positivo")
+
+    resultado = Composicao(k)
+
+    for inicio in range(0, len(seq), bloco):
+        resultado.atualizar(seq[inicio:inicio + bloco])
+
+    return resultado
+
+
+def composicao_fasta(caminho, k = None, bloco = 1 << 20):
+    """
+    Calcula a composição de cada registo de um ficheiro FASTA, lendo o ficheiro uma única vez em blocos
+
+
+    Parâmetros
+    -------------
+    caminho : str
+        Caminho para o ficheiro FASTA
+
+    k : int, opcional
+        Tamanho dos k-mers do espectro
+
+    bloco : int
+        Número (aproximado) de bases lidas de cada vez
+
+
+    Retorna
+    -------------
+    generator
+        Gera tuplos (nome, Composicao), um por registo
+
+    """
+    from scripts.ficheiros import ler_fasta_blocos
+
+    nome, resultado = None, None
+
+    for nome_bloco, dados in ler_fasta_blocos(caminho, bloco):
+        if nome_bloco != nome or resultado is None:
+            if resultado is not None:
+                yield nome, resultado
+            nome, resultado = nome_bloco, Composicao(k)
+
+        resultado.atualizar(dados)
+
+    if resultado is not None:
+        yield nome, resultado
+
+
+class JanelasGC:
+    """
+    Perfil de GC (ou GC skew) em janelas deslizantes, calculado à medida que a sequência é lida
+
+    As janelas começam nas posições 0, passo, 2 * passo, ... e têm tamanho janela. Em cada bloco são
+    calculadas somas acumuladas de G, C e bases válidas, pelo que cada janela custa O(1)
+    independentemente do tamanho. Só é guardada a parte final do bloco onde começa a próxima janela
+    (menos de janela bases), para continuar no bloco seguinte. A última janela incompleta não é
+    devolvida.
+
+    """
+    __slots__ = ('janela', 'passo', 'medida', '_pendente', '_proximo', '_saltar')
+
+    def __init__(self, janela, passo = None, medida = 'gc'):
+        """
+        Parâmetros
+        -------------
+        janela : int
+            Tamanho das janelas
+
+        passo : int, opcional
+            Distância entre o início de janelas consecutivas (por omissão igual à janela)
+
+        medida : str
+            'gc' para a percentagem de G e C entre as bases A, C, G e T, ou 'skew' para (G - C) / (G + C)
+
+
+        Levanta
+        -------------
+        ValueError
+            Caso a janela ou o passo não sejam inteiros positivos ou a medida seja desconhecida
+
+        """
+        passo = janela if passo is None else passo
+
+        if not isinstance(janela, int) or janela < 1 or not isinstance(passo, int) or passo < 1:
+            raise ValueError("A janela e o passo devem ser inteiros positivos")
+
+        if medida not in ('gc', 'skew'):
+            raise ValueError(f"Medida desconhecida: {medida} (usar 'gc' ou 'skew')")
+
+        self.janela = janela
+        self.passo = passo
+        self.medida = medida
+        self._pendente = np.zeros(0, dtype = np.uint8)
+        self._proximo = 0
+        self._saltar = 0
+
+    def atualizar(self, bloco):
+        """
+        Lê o bloco seguinte da sequência e devolve as janelas que ficaram completas
+
+        Retorna
+        -------------
+        tuple
+            (posições de início das janelas, valores float64; nan nas janelas sem bases válidas)
+
+        """
+        codigos = TABELA_2BITS[_array_bloco(bloco)]
+
+        # Bases entre o fim da última janela e o início da próxima (quando passo > janela)
+        saltadas = min(self._saltar, len(codigos))
+        self._saltar -= saltadas
+
+        codigos = np.concatenate((self._pendente, codigos[saltadas:]))
+        janelas = (len(codigos) - self.janela) // self.passo + 1 if len(codigos) >= self.janela else 0
+        inicios = np.arange(janelas, dtype = np.int64) * self.passo
+
+        def somas(indicador):
+            acumulada = np.zeros(len(codigos) + 1, dtype = np.int64)
+            np.cumsum(indicador, out = acumulada[1:])
+            return acumulada[inicios + self.janela] - acumulada[inicios]
+
+        g, c = somas(codigos == _G), somas(codigos == _C)
+
+        if self.medida == 'gc':
+            numerador, denominador = 100.0 * (g + c), somas(codigos != INVALIDO)
+        else:
+            numerador, denominador = (g - c).astype(np.float64), g + c
+
+        valores = np.full(janelas, np.nan)
+        np.divide(numerador, denominador, out = valores, where = denominador > 0)
+
+        # A próxima janela começa em janelas * passo (relativo ao início de codigos)
+        seguinte = janelas * self.passo
+        resultado = (self._proximo + inicios, valores)
+
+        if seguinte <= len(codigos):
+            self._pendente = codigos[seguinte:].copy()
+        else:
+            self._pendente = codigos[:0].copy()
+            self._saltar = seguinte - len(codigos)
+
+        self._proximo += seguinte
+
+        return resultado
+
+
+def perfil_gc(seq, janela, passo = None, medida = 'gc', bloco = 1 << 22):
+    """
+    Perfil de GC (ou GC skew) de uma sequência em janelas deslizantes
+
+
+    Parâmetros
+    -------------
+    seq : str, bytes, VistaSequencia ou PackedSeq
+        Sequência de ADN
+
+    janela : int
+        Tamanho das janelas
+
+    passo : int, opcional
+        Distância entre o início de janelas consecutivas (por omissão igual à janela)
+
+    medida : str
+        'gc' ou 'skew', como em JanelasGC
+
+    bloco : int
+        Número de bases lidas de cada vez
+
+
+    Retorna
+    -------------
+    tuple
+        (posições de início das janelas, valores de cada janela)
+
+    """
+    if not isinstance(bloco, int) or bloco < 1:
+        raise ValueError("O tamanho do bloco deve ser um inteiro positivo")
+
+    janelas = JanelasGC(janela, passo, medida)
+    partes = [janelas.atualizar(seq[inicio:inicio + bloco]) for inicio in range(0, len(seq), bloco)]
+
+    if not partes:
+        return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.float64)
+
+    inicios, valores = zip(*partes)
+
+    return np.concatenate(inicios), np.concatenate(valores)
+
+
+def perfil_gc_fasta(caminho, janela, passo = None, medida = 'gc', bloco = 1 << 22):
+    """
+    Perfil de GC (ou GC skew) em janelas de todos os registos de um ficheiro FASTA, lido uma única vez
+    em blocos (a memória usada depende do bloco e não do tamanho dos registos)
+
+
+    Parâmetros
+    -------------
+    caminho : str
+        Caminho para o ficheiro FASTA
+
+    janela, passo, medida :
+        Como em JanelasGC
+
+    bloco : int
+        Número (aproximado) de bases lidas de cada vez
+
+
+    Retorna
+    -------------
+    generator
+        Gera tuplos (nome, posições de início, valores), um ou mais por registo (um por bloco com
+        janelas completas), pela ordem do ficheiro
+
+    """
+    from scripts.ficheiros import ler_fasta_blocos
+
+    nome, janelas = None, None
+
+    for nome_bloco, dados in ler_fasta_blocos(caminho, bloco):
+        if nome_bloco != nome or janelas is None:
+            nome, janelas = nome_bloco, JanelasGC(janela, passo, medida)
+
+        inicios, valores = janelas.atualizar(dados)
+
+        if len(inicios):
+            yield nome, inicios, valores
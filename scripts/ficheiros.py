@@ -0,0 +1,509 @@
+def ler_fasta(caminho):
+    """
+    Lê um ficheiro FASTA registo a registo, sem carregar o ficheiro inteiro para memória
+
+
+    Parâmetro
+    -------------
+    caminho : str
+        Caminho para o ficheiro FASTA
+
+
+    Retorna
+    -------------
+    generator
+        Gera tuplos (nome, sequência), em que o nome é a primeira palavra do cabeçalho
+
+
+    Levanta
+    -------------
+    ValueError
+        Caso o ficheiro tenha sequência antes do primeiro cabeçalho
+
+    """
+    nome, partes = None, []
+
+    with open(caminho) as ficheiro:
+        for linha in ficheiro:
+            linha = linha.strip()
+
+            if not linha:
+                continue
+
+            if linha.startswith('>'):
+                if nome is not None:
+                    yield nome, ''.join(partes)
+                nome, partes = (linha[1:].split() or [''])[0], []
+
+            elif nome is None:
+                raise ValueError("Ficheiro FASTA inválido: sequência antes do primeiro cabeçalho")
+
+            else:
+                partes.append(linha)
+
+    if nome is not None:
+        yield nome, ''.join(partes)
+
+
+def ler_fasta_blocos(caminho, bloco = 1 << 20):
+    """
+    Lê um ficheiro FASTA em blocos de bytes, sem juntar nenhum registo inteiro em memória
+
+    Cada registo é devolvido em pedaços consecutivos de cerca de bloco bases (sem quebras de linha);
+    um registo sem sequência é devolvido uma vez, com b''.
+
+
+    Parâmetros
+    -------------
+    caminho : str
+        Caminho para o ficheiro FASTA
+
+    bloco : int
+        Número (aproximado) de bases de cada pedaço
+
+
+    Retorna
+    -------------
+    generator
+        Gera tuplos (nome, bytes), pela ordem do ficheiro
+
+
+    Levanta
+    -------------
+    ValueError
+        Caso o ficheiro tenha sequência antes do primeiro cabeçalho ou bloco não seja positivo
+
+    """
+    if not isinstance(bloco, int) or bloco < 1:
+        raise ValueError("O tamanho do bloco deve ser um inteiro positivo")
+
+    nome, partes, tamanho, devolvido = None, [], 0, False
+
+    with open(caminho, 'rb') as ficheiro:
+        for linha in ficheiro:
+            linha = linha.strip()
+
+            if not linha:
+                continue
+
+            if linha.startswith(b'>'):
+                if nome is not None and (partes or not devolvido):
+                    yield nome, b''.join(partes)
+
+                nome = (linha[1:].decode('ascii', errors = 'replace').split() or [''])[0]
+                partes, tamanho, devolvido = [], 0, False
+
+            elif nome is None:
+                raise ValueError("Ficheiro FASTA inválido: sequência antes do primeiro cabeçalho")
+
+            else:
+                partes.append(linha)
+                tamanho += len(linha)
+
+                if tamanho >= bloco:
+                    yield nome, b''.join(partes)
+                    partes, tamanho, devolvido = [], 0, True
+
+    if nome is not None and (partes or not devolvido):
+        yield nome, b''.join(partes)
+
+
+class VistaSequencia:
+    """
+    Vista sobre uma sequência (ou região) de um ficheiro FASTA/FASTQ mapeado em memória
+
+    Não copia a sequência: guarda apenas o mapa do ficheiro e os offsets da região. Cortar a vista
+    (vista[inicio:fim]) devolve outra vista em O(1); os bytes só são lidos do ficheiro quando a
+    sequência é usada (bytes(vista) ou str(vista)), numa única passagem que retira as quebras de linha.
+    As funções de scripts.auxiliares e de scripts.alinhamentos aceitam estas vistas diretamente.
+
+    """
+    __slots__ = ('_mapa', '_offset', '_bases_linha', '_largura_linha', '_inicio', '_fim')
+
+    def __init__(self, mapa, offset, bases_linha, largura_linha, inicio, fim):
+        self._mapa = mapa
+        self._offset = offset
+        self._bases_linha = bases_linha
+        self._largura_linha = largura_linha
+        self._inicio = inicio
+        self._fim = fim
+
+    def _posicao(self, i):
+        """Posição no ficheiro da base i do registo"""
+        return self._offset + (i // self._bases_linha) * self._largura_linha + i % self._bases_linha
+
+    def __len__(self):
+        return self._fim - self._inicio
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio, fim, passo = indice.indices(len(self))
+
+            if passo != 1:
+                return str(self)[indice]
+
+            fim = max(fim, inicio)
+            return VistaSequencia(self._mapa, self._offset, self._bases_linha, self._largura_linha,
+                                  self._inicio + inicio, self._inicio + fim)
+
+        if indice < 0:
+            indice += len(self)
+
+        if not 0 <= indice < len(self):
+            raise IndexError("Posição fora da sequência")
+
+        posicao = self._posicao(self._inicio + indice)
+        return self._mapa[posicao:posicao + 1].decode('ascii')
+
+    def __bytes__(self):
+        if self._fim <= self._inicio:
+            return b''
+
+        bruto = self._mapa[self._posicao(self._inicio):self._posicao(self._fim - 1) + 1]
+        return bruto.translate(None, b'\r\n')
+
+    def __str__(self):
+        return bytes(self).decode('ascii')
+
+    def __repr__(self):
+        return f"VistaSequencia({len(self)} bases)"
+
+
+def indexar_ficheiro(caminho):
+    """
+    Constrói o índice (semelhante a um .fai do samtools) de um ficheiro FASTA ou FASTQ
+
+
+    Parâmetro
+    -------------
+    caminho : str
+        Caminho para o ficheiro FASTA ou FASTQ
+
+
+    Retorna
+    -------------
+    dict
+        Dicionário nome -> (comprimento, offset, bases por linha, bytes por linha, offset da qualidade),
+        pela ordem do ficheiro. O offset da qualidade é None nos ficheiros FASTA
+
+
+    Levanta
+    -------------
+    ValueError
+        Caso o ficheiro esteja vazio, não seja FASTA/FASTQ, tenha nomes repetidos ou linhas de
+        sequência com tamanhos diferentes dentro de um registo
+
+    """
+    import mmap
+
+    with open(caminho, 'rb') as ficheiro:
+        try:
+            mapa = mmap.mmap(ficheiro.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError("O ficheiro está vazio")
+
+    with mapa:
+        if mapa[:1] == b'>':
+            indice = _indexar_fasta(mapa)
+        elif mapa[:1] == b'@':
+            indice = _indexar_fastq(mapa)
+        else:
+            raise ValueError("O ficheiro não é FASTA nem FASTQ")
+
+    return indice
+
+
+def _linhas(mapa, posicao = 0):
+    """Gera (início, fim sem a quebra de linha, início da linha seguinte) de cada linha do mapa"""
+    tamanho = len(mapa)
+
+    while posicao < tamanho:
+        seguinte = mapa.find(b'\n', posicao)
+        seguinte = tamanho if seguinte < 0 else seguinte + 1
+
+        fim = seguinte
+        while fim > posicao and mapa[fim - 1:fim] in (b'\n', b'\r'):
+            fim -= 1
+
+        yield posicao, fim, seguinte
+        posicao = seguinte
+
+
+def _nome_cabecalho(mapa, inicio, fim):
+    return (mapa[inicio + 1:fim].decode().split() or [''])[0]
+
+
+def _acrescentar(indice, nome, entrada):
+    if nome in indice:
+        raise ValueError(f"Nome repetido no ficheiro: {nome}")
+    indice[nome] = entrada
+
+
+def _indexar_fasta(mapa):
+    indice = {}
+    nome = None
+
+    def fechar():
+        if nome is not None:
+            _acrescentar(indice, nome, (comprimento, offset, bases_linha, largura_linha, None))
+
+    for inicio, fim, seguinte in _linhas(mapa):
+        if mapa[inicio:inicio + 1] == b'>':
+            fechar()
+            nome = _nome_cabecalho(mapa, inicio, fim)
+            comprimento, offset, bases_linha, largura_linha, curta = 0, seguinte, 0, 0, False
+            continue
+
+        if fim == inicio:
+            curta = curta or bool(bases_linha)
+            continue
+
+        # Como no samtools, todas as linhas de um registo menos a última têm o mesmo tamanho
+        if curta or (bases_linha and fim - inicio > bases_linha):
+            raise ValueError(f"Linhas de tamanhos diferentes no registo {nome}")
+
+        if not bases_linha:
+            offset, bases_linha, largura_linha = inicio, fim - inicio, seguinte - inicio
+        elif fim - inicio < bases_linha:
+            curta = True
+
+        comprimento += fim - inicio
+
+    fechar()
+    return indice
+
+
+def _indexar_fastq(mapa):
+    indice = {}
+    linhas = _linhas(mapa)
+
+    for inicio, fim, _ in linhas:
+        if fim == inicio:
+            continue
+
+        if mapa[inicio:inicio + 1] != b'@':
+            raise ValueError("Ficheiro FASTQ inválido: registo sem cabeçalho '@'")
+
+        try:
+            seq_inicio, seq_fim, seq_seguinte = next(linhas)
+            mais_inicio, _, _ = next(linhas)
+            qual_inicio, qual_fim, _ = next(linhas)
+        except StopIteration:
+            raise ValueError("Ficheiro FASTQ inválido: registo incompleto")
+
+        if mapa[mais_inicio:mais_inicio + 1] != b'+' or qual_fim - qual_inicio != seq_fim - seq_inicio:
+            raise ValueError("Ficheiro FASTQ inválido: linha '+' ou qualidade em falta")
+
+        comprimento = seq_fim - seq_inicio
+        _acrescentar(indice, _nome_cabecalho(mapa, inicio, fim),
+                     (comprimento, seq_inicio, max(comprimento, 1), seq_seguinte - seq_inicio, qual_inicio))
+
+    return indice
+
+
+def guardar_indice(indice, caminho):
+    """
+    Guarda um índice no formato .fai (colunas separadas por tabs; os ficheiros FASTQ têm a coluna
+    extra com o offset da qualidade)
+
+
+    Parâmetros
+    -------------
+    indice : dict
+        Índice devolvido por indexar_ficheiro
+
+    caminho : str
+        Caminho do ficheiro .fai
+
+    """
+    with open(caminho, 'w') as ficheiro:
+        for nome, (comprimento, offset, bases_linha, largura_linha, qualidade) in indice.items():
+            colunas = [nome, comprimento, offset, bases_linha, largura_linha]
+            if qualidade is not None:
+                colunas.append(qualidade)
+            ficheiro.write('\t'.join(map(str, colunas)) + '\n')
+
+
+def carregar_indice(caminho):
+    """
+    Lê um índice no formato .fai
+
+
+    Parâmetro
+    -------------
+    caminho : str
+        Caminho do ficheiro .fai
+
+
+    Retorna
+    -------------
+    dict
+        Índice no mesmo formato de indexar_ficheiro
+
+
+    Levanta
+    -------------
+    ValueError
+        Caso alguma linha não tenha 5 ou 6 colunas
+
+    """
+    indice = {}
+
+    with open(caminho) as ficheiro:
+        for linha in ficheiro:
+            colunas = linha.rstrip('\n').split('\t')
+
+            if len(colunas) not in (5, 6):
+                raise ValueError("Índice .fai inválido")
+
+            numeros = [int(coluna) for coluna in colunas[1:]]
+            if len(numeros) == 4:
+                numeros.append(None)
+
+            indice[colunas[0]] = tuple(numeros)
+
+    return indice
+
+
+class FicheiroIndexado:
+    """
+    Ficheiro FASTA ou FASTQ mapeado em memória, com acesso aleatório aos registos através de um índice .fai
+
+    O índice é lido de caminho + '.fai' quando existe e é mais recente que o ficheiro; caso contrário é
+    construído e guardado (se a pasta o permitir). Os registos e as regiões são devolvidos como
+    VistaSequencia, sem copiar a sequência.
+
+    Exemplo
+    -------------
+    with FicheiroIndexado('genoma.fa') as genoma:
+        regiao = genoma.regiao('chr1:1001-2000')
+        validar_dna(regiao)
+
+    """
+    __slots__ = ('caminho', 'indice', '_ficheiro', '_mapa')
+
+    def __init__(self, caminho, indice = None):
+        """
+        Parâmetros
+        -------------
+        caminho : str
+            Caminho para o ficheiro FASTA ou FASTQ
+
+        indice : dict, opcional
+            Índice já construído; se None é carregado ou construído como descrito acima
+
+        """
+        import mmap
+        import os
+
+        self.caminho = caminho
+
+        if indice is None:
+            caminho_fai = caminho + '.fai'
+
+            if os.path.exists(caminho_fai) and os.path.getmtime(caminho_fai) >= os.path.getmtime(caminho):
+                indice = carregar_indice(caminho_fai)
+            else:
+                indice = indexar_ficheiro(caminho)
+                try:
+                    guardar_indice(indice, caminho_fai)
+                except OSError:
+                    pass
+
+        self.indice = indice
+        self._ficheiro = open(caminho, 'rb')
+        self._mapa = mmap.mmap(self._ficheiro.fileno(), 0, access = mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        self.fechar()
+
+    def fechar(self):
+        """Fecha o mapa e o ficheiro (as vistas deixam de poder ser lidas)"""
+        self._mapa.close()
+        self._ficheiro.close()
+
+    def __len__(self):
+        return len(self.indice)
+
+    def __contains__(self, nome):
+        return nome in self.indice
+
+    def nomes(self):
+        """Lista dos nomes dos registos, pela ordem do ficheiro"""
+        return list(self.indice)
+
+    def __getitem__(self, nome):
+        """Vista sobre a sequência completa do registo com este nome"""
+        comprimento, offset, bases_linha, largura_linha, _ = self.indice[nome]
+        return VistaSequencia(self._mapa, offset, bases_linha, largura_linha, 0, comprimento)
+
+    def __iter__(self):
+        """Gera tuplos (nome, vista), como ler_fasta"""
+        for nome in self.indice:
+            yield nome, self[nome]
+
+    def qualidade(self, nome):
+        """
+        Vista sobre a linha de qualidade de um registo FASTQ
+
+        Levanta
+        -------------
+        ValueError
+            Caso o ficheiro não seja FASTQ
+        """
+        comprimento, _, bases_linha, largura_linha, offset = self.indice[nome]
+
+        if offset is None:
+            raise ValueError("Os registos FASTA não têm qualidade")
+
+        return VistaSequencia(self._mapa, offset, bases_linha, largura_linha, 0, comprimento)
+
+    def regiao(self, texto):
+        """
+        Devolve a vista de uma região no formato do samtools: 'nome', 'nome:início' ou 'nome:início-fim'
+        (coordenadas a começar em 1, fim incluído; separadores de milhares ',' são ignorados)
+
+
+        Parâmetro
+        -------------
+        texto : str
+            Região pretendida
+
+
+        Retorna
+        -------------
+        VistaSequencia
+
+
+        Levanta
+        -------------
+        KeyError
+            Caso o registo não exista
+
+        ValueError
+            Caso as coordenadas não sejam válidas
+
+        """
+        # Nomes que contenham ':' têm prioridade sobre a leitura como região
+        if texto in self.indice:
+            return self[texto]
+
+        nome, separador, coordenadas = texto.rpartition(':')
+        if not separador or nome not in self.indice:
+            raise KeyError(texto)
+
+        inicio, _, fim = coordenadas.replace(',', '').partition('-')
+
+        try:
+            inicio = int(inicio)
+            fim = int(fim) if fim else self.indice[nome][0]
+        except ValueError:
+            raise ValueError(f"Região inválida: {texto}")
+
+        if inicio < 1 or fim < inicio - 1:
+            raise ValueError(f"Região inválida: {texto}")
+
+        return self[nome][inicio - 1:fim]
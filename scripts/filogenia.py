@@ -0,0 +1,689 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def nw_ciclico(sequencias, score_subst, score_space, banda = None):
+    """
+    Calcula a dissimilaridade entre todas as sequências usando o algoritmo de Needleman-Wunsch.
+
+    Cada par é pontuado com o nw_score (apenas duas linhas da matriz, sem traceback) ou, se for
+    indicada uma banda, com o nw_banda, que só calcula as células a menos de banda posições da
+    diagonal. A dissimilaridade é 1 - score / comprimento do alinhamento. Aceita qualquer alfabeto
+    (ADN, ARN ou proteínas). Os pares que não é possível alinhar ficam com nan, que o upgma e o
+    neighbor_joining recusam.
+
+    Parâmetros:
+    - sequencias (List[Tuple[str, str]]): Lista de tuplas contendo nomes e sequências.
+    - score_subst (int): Pontuação para correspondência ou penalidade para substituição no algoritmo de Needleman-Wunsch.
+    - score_space (int): Penalidade para espaços (inserção ou exclusão) no algoritmo de Needleman-Wunsch.
+    - banda (int, opcional): Largura da banda diagonal, para sequências quase idênticas.
+
+    Retorna:
+    List[List[float]]: Matriz de dissimilaridade simétrica entre as sequências.
+    """
+    # Inicialização da matriz de dissimilaridade
+    num_sequencias = len(sequencias)
+    distancia_matriz = [[0.0] * num_sequencias for _ in range(num_sequencias)]
+
+    # Iteração sobre combinações únicas de pares de sequências
+    for i in range(num_sequencias):
+        for j in range(i + 1, num_sequencias):
+            nome_i, seq_i = sequencias[i]
+            nome_j, seq_j = sequencias[j]
+
+            try:
+                dissimilaridade = distancia_nw(seq_i, seq_j, score_subst, score_space, banda)
+
+                # Preenchimento da matriz de dissimilaridade
+                distancia_matriz[i][j] = dissimilaridade
+                distancia_matriz[j][i] = dissimilaridade
+
+            except Exception as e:
+                # Um par que não foi alinhado fica a nan (e não a 0, que o tornaria idêntico)
+                distancia_matriz[i][j] = distancia_matriz[j][i] = float('nan')
+                print(f"Failed to align sequence {nome_i} and {nome_j}: {e!r}")
+
+    return distancia_matriz
+
+
+def distancia_nw(seq_i, seq_j, score_subst, score_space, banda = None):
+    """
+    Calcula a dissimilaridade de Needleman-Wunsch entre duas sequências, sem reconstruir o alinhamento.
+
+    Parâmetros:
+    - seq_i (str): Primeira sequência.
+    - seq_j (str): Segunda sequência.
+    - score_subst (int): Pontuação para correspondência (a substituição vale -score_subst).
+    - score_space (int): Penalidade para espaços.
+    - banda (int, opcional): Largura da banda diagonal; se None é calculada a matriz completa.
+
+    Retorna:
+    float: 1 - score / comprimento do alinhamento.
+    """
+    from scripts.alinhamentos import nw_score, nw_banda
+
+    if banda is None:
+        score, comprimento = nw_score(seq_i, seq_j, score_subst, -score_subst, score_space, comprimento = True)
+    else:
+        score, comprimento = nw_banda(seq_i, seq_j, banda, score_subst, -score_subst, score_space, comprimento = True)
+
+    return 1.0 - (score / comprimento)
+
+
+# Estado de cada processo do pool, definido uma única vez pelo _iniciar_processo
+_ESTADO = {}
+
+
+def _par_triangular(k, n):
+    """
+    Converte o índice k de um par do triângulo superior (percorrido linha a linha) nas coordenadas (i, j).
+    """
+    i = n - 2 - int(math.sqrt(-8 * k + 4 * n * (n - 1) - 7) / 2.0 - 0.5)
+    j = k + i + 1 - n * (n - 1) // 2 + (n - i) * (n - i - 1) // 2
+
+    return i, j
+
+
+def _iniciar_processo(nome_memoria, sequencias, score_subst, score_space, banda):
+    """
+    Inicializador do pool: recebe as sequências uma vez por processo e liga-se ao buffer partilhado.
+    """
+    memoria = shared_memory.SharedMemory(name = nome_memoria)
+    num_sequencias = len(sequencias)
+
+    _ESTADO['memoria']    = memoria  # mantém a referência para o buffer não ser libertado
+    _ESTADO['matriz']     = np.ndarray((num_sequencias, num_sequencias), dtype = np.float64, buffer = memoria.buf)
+    _ESTADO['sequencias'] = sequencias
+    _ESTADO['parametros'] = (score_subst, score_space, banda)
+
+
+def _calcular_bloco(inicio, fim):
+    """
+    Calcula as distâncias dos pares inicio..fim-1 do triângulo superior e escreve-as no buffer partilhado.
+
+    Retorna:
+    List[str]: Mensagens dos pares que não foi possível alinhar.
+    """
+    matriz, sequencias = _ESTADO['matriz'], _ESTADO['sequencias']
+    score_subst, score_space, banda = _ESTADO['parametros']
+    num_sequencias = len(sequencias)
+    falhas = []
+
+    if inicio >= fim:
+        return falhas
+
+    i, j = _par_triangular(inicio, num_sequencias)
+
+    for _ in range(inicio, fim):
+        nome_i, seq_i = sequencias[i]
+        nome_j, seq_j = sequencias[j]
+
+        try:
+            dissimilaridade = distancia_nw(seq_i, seq_j, score_subst, score_space, banda)
+            matriz[i, j] = dissimilaridade
+            matriz[j, i] = dissimilaridade
+
+        except Exception as e:
+            matriz[i, j] = matriz[j, i] = np.nan
+            falhas.append(f"Failed to align sequence {nome_i} and {nome_j}: {e!r}")
+
+        # Avança para o par seguinte do triângulo superior
+        j += 1
+        if j == num_sequencias:
+            i += 1
+            j  = i + 1
+
+    return falhas
+
+
+def nw_ciclico_paralelo(sequencias, score_subst, score_space, banda = None, n_processos = None, tamanho_bloco = 256):
+    """
+    Versão paralela do nw_ciclico, que distribui os pares por um pool de processos.
+
+    Os pares do triângulo superior são divididos em blocos contíguos de tamanho_bloco pares. As
+    sequências são enviadas uma única vez para cada processo (no inicializador do pool) e cada
+    processo escreve as distâncias diretamente numa matriz NumPy em memória partilhada.
+
+    Parâmetros:
+    - sequencias (List[Tuple[str, str]]): Lista de tuplas contendo nomes e sequências.
+    - score_subst (int): Pontuação para correspondência ou penalidade para substituição.
+    - score_space (int): Penalidade para espaços (inserção ou exclusão).
+    - banda (int, opcional): Largura da banda diagonal, como no nw_ciclico.
+    - n_processos (int, opcional): Número de processos; por omissão os CPUs disponíveis.
+    - tamanho_bloco (int): Número de pares por tarefa.
+
+    Retorna:
+    numpy.ndarray: Matriz de dissimilaridade simétrica, com os mesmos valores que o nw_ciclico (nan nos pares que falharam).
+    """
+    if n_processos is not None and (not isinstance(n_processos, int) or n_processos < 1):
+        raise ValueError("O número de processos deve ser um inteiro positivo")
+
+    if not isinstance(tamanho_bloco, int) or tamanho_bloco < 1:
+        raise ValueError("O tamanho do bloco deve ser um inteiro positivo")
+
+    num_sequencias = len(sequencias)
+    num_pares = num_sequencias * (num_sequencias - 1) // 2
+    sequencias = [tuple(par) for par in sequencias]
+
+    memoria = shared_memory.SharedMemory(create = True, size = max(1, num_sequencias * num_sequencias * 8))
+
+    try:
+        partilhada = np.ndarray((num_sequencias, num_sequencias), dtype = np.float64, buffer = memoria.buf)
+        partilhada[:] = 0.0
+
+        blocos = [(inicio, min(inicio + tamanho_bloco, num_pares)) for inicio in range(0, num_pares, tamanho_bloco)]
+        n_processos = min(n_processos or os.cpu_count() or 1, max(1, len(blocos)))
+
+        with ProcessPoolExecutor(max_workers = n_processos, initializer = _iniciar_processo,
+                                 initargs = (memoria.name, sequencias, score_subst, score_space, banda)) as pool:
+            inicios, fins = zip(*blocos) if blocos else ((), ())
+
+            for falhas in pool.map(_calcular_bloco, inicios, fins):
+                for mensagem in falhas:
+                    print(mensagem)
+
+        distancia_matriz = partilhada.copy()
+        del partilhada
+
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+    return distancia_matriz
+
+
+def nw_ciclico_esbocos(sequencias, score_subst, score_space, limiar = 0.3, banda = None, k = 21, tamanho_esboco = 1000,
+                       esbocos = None, valor_distante = None):
+    """
+    Versão do nw_ciclico que usa esboços MinHash como pré-filtro: só os pares com distância de Mash
+    (estimada pelos esboços) até limiar são alinhados com Needleman-Wunsch.
+
+    Os pares acima do limiar são claramente não relacionados e recebem valor_distante, por omissão
+    o limite superior da dissimilaridade, 1 - min(score_subst, -score_subst, score_space): nenhuma
+    coluna do alinhamento pontua menos do que esse mínimo, pelo que nenhum par alinhado pode ficar
+    mais afastado. Os pares que falham o alinhamento ficam a nan, como no nw_ciclico. Os esboços
+    podem ser guardados num ficheiro e reutilizados entre execuções.
+
+    Parâmetros:
+    - sequencias (List[Tuple[str, str]]): Lista de tuplas contendo nomes e sequências.
+    - score_subst (int): Pontuação para correspondência ou penalidade para substituição, como no nw_ciclico.
+    - score_space (int): Penalidade para espaços (inserção ou exclusão).
+    - limiar (float): Distância de Mash máxima para um par ser alinhado.
+    - banda (int, opcional): Largura da banda diagonal, como no nw_ciclico.
+    - k (int): Tamanho dos k-mers dos esboços.
+    - tamanho_esboco (int): Número de hashes de cada esboço.
+    - esbocos (dict ou str, opcional): Esboços já calculados ({nome: Esboco}) ou caminho do ficheiro .npz onde são guardados.
+    - valor_distante (float, opcional): Dissimilaridade atribuída aos pares que não são alinhados.
+
+    Retorna:
+    Tuple[numpy.ndarray, numpy.ndarray]: Matriz de dissimilaridade e matriz bool dos pares que foram alinhados.
+    """
+    from scripts.kmers import esbocos_sequencias
+
+    if esbocos is None or isinstance(esbocos, str):
+        esbocos = esbocos_sequencias(sequencias, k, tamanho_esboco, caminho = esbocos)
+
+    num_sequencias = len(sequencias)
+    distancia_matriz = np.zeros((num_sequencias, num_sequencias))
+    alinhados = np.eye(num_sequencias, dtype = bool)
+    falhados = []
+
+    for i in range(num_sequencias):
+        for j in range(i + 1, num_sequencias):
+            nome_i, seq_i = sequencias[i]
+            nome_j, seq_j = sequencias[j]
+
+            if esbocos[nome_i].distancia(esbocos[nome_j]) > limiar:
+                continue
+
+            try:
+                dissimilaridade = distancia_nw(seq_i, seq_j, score_subst, score_space, banda)
+
+                distancia_matriz[i, j] = distancia_matriz[j, i] = dissimilaridade
+                alinhados[i, j] = alinhados[j, i] = True
+
+            except Exception as e:
+                falhados.append((i, j))
+                print(f"Failed to align sequence {nome_i} and {nome_j}: {e!r}")
+
+    if valor_distante is None:
+        valor_distante = 1.0 - min(score_subst, -score_subst, score_space)
+
+    distancia_matriz[~alinhados] = valor_distante
+
+    for i, j in falhados:
+        distancia_matriz[i, j] = distancia_matriz[j, i] = np.nan
+
+    return distancia_matriz, alinhados
+
+
+def _preparar_distancias(distancia_matriz, nomes):
+    """
+    Converte a matriz de dissimilaridade (lista de listas ou numpy.ndarray) numa cópia float64 com a
+    diagonal a infinito, pronta para ser atualizada no próprio lugar.
+
+    Retorna:
+    numpy.ndarray: Cópia da matriz de distâncias.
+    """
+    matriz = np.array(distancia_matriz, dtype = np.float64)
+
+    if matriz.ndim != 2 or matriz.shape[0] != matriz.shape[1]:
+        raise ValueError("A matriz de distâncias deve ser quadrada")
+
+    if len(nomes) != matriz.shape[0]:
+        raise ValueError("O número de nomes deve ser igual ao número de linhas da matriz")
+
+    if matriz.shape[0] == 0:
+        raise ValueError("A matriz de distâncias está vazia")
+
+    if not np.isfinite(matriz).all() or not np.allclose(matriz, matriz.T):
+        raise ValueError("A matriz de distâncias deve ser simétrica e finita")
+
+    np.fill_diagonal(matriz, np.inf)
+
+    return matriz
+
+
+def _nome_newick(nome):
+    """
+    Nome de uma folha em formato Newick, entre plicas se tiver caracteres reservados.
+    """
+    nome = str(nome)
+
+    if any(caracter in nome for caracter in " \t\n()[]',:;"):
+        return "'" + nome.replace("'", "''") + "'"
+
+    return nome
+
+
+def _ramo(no, comprimento):
+    """
+    Nó Newick seguido do comprimento do ramo.
+    """
+    return f"{no}:{comprimento:.6g}"
+
+
+def _juncoes_upgma(matriz):
+    """
+    Junções UPGMA feitas no próprio lugar sobre a matriz (preparada por _preparar_distancias).
+
+    A linha e a coluna do primeiro grupo passam a ter a média (pesada pelo tamanho) das distâncias dos
+    dois e as do segundo ficam a infinito. O mínimo de cada linha é guardado, e em cada junção só são
+    recalculadas as linhas cujo mínimo apontava para um dos grupos unidos, pelo que cada passo custa
+    O(n) em vez de O(n^2).
+
+    Retorna:
+    Iterator[Tuple[int, int, float]]: Para cada junção, as linhas dos dois grupos unidos (o grupo novo
+    fica na primeira) e a altura do nó.
+    """
+    num_sequencias = matriz.shape[0]
+    tamanhos = np.ones(num_sequencias, dtype = np.float64)
+
+    # Mínimo de cada linha e a coluna onde está
+    minimos_coluna = matriz.argmin(axis = 1)
+    minimos = matriz[np.arange(num_sequencias), minimos_coluna]
+
+    for _ in range(num_sequencias - 1):
+        i = int(minimos.argmin())
+        j = int(minimos_coluna[i])
+
+        yield i, j, matriz[i, j] / 2.0
+
+        # O grupo unido fica na linha/coluna i e o grupo j deixa de existir
+        linha = (tamanhos[i] * matriz[i] + tamanhos[j] * matriz[j]) / (tamanhos[i] + tamanhos[j])
+        matriz[i, :] = linha
+        matriz[:, i] = linha
+        matriz[i, i] = np.inf
+        matriz[j, :] = np.inf
+        matriz[:, j] = np.inf
+
+        tamanhos[i] += tamanhos[j]
+        minimos[j] = np.inf
+
+        # Linhas cujo mínimo era um dos grupos unidos (a média nunca é menor que o mínimo dos dois)
+        recalcular = np.flatnonzero((minimos_coluna == i) | (minimos_coluna == j))
+        recalcular = np.union1d(recalcular[np.isfinite(minimos[recalcular])], [i])
+
+        minimos_coluna[recalcular] = matriz[recalcular].argmin(axis = 1)
+        minimos[recalcular] = matriz[recalcular, minimos_coluna[recalcular]]
+
+        # As restantes linhas só mudam se a distância ao novo grupo for menor que o mínimo atual
+        melhores = linha < minimos
+        melhores[i] = False
+        minimos[melhores] = linha[melhores]
+        minimos_coluna[melhores] = i
+
+
+def upgma(distancia_matriz, nomes):
+    """
+    Constrói uma árvore UPGMA diretamente a partir da matriz de dissimilaridade (sem recalcular distâncias).
+
+    As junções são feitas no próprio lugar sobre uma cópia da matriz (ver _juncoes_upgma), com O(n)
+    operações por junção.
+
+    Parâmetros:
+    - distancia_matriz (List[List[float]] ou numpy.ndarray): Matriz de dissimilaridade simétrica (por exemplo do nw_ciclico).
+    - nomes (List[str]): Nomes das sequências, pela ordem das linhas da matriz.
+
+    Retorna:
+    str: Árvore enraizada em formato Newick, com comprimentos dos ramos.
+    """
+    matriz = _preparar_distancias(distancia_matriz, nomes)
+
+    nos = [_nome_newick(nome) for nome in nomes]
+    alturas = np.zeros(len(nos), dtype = np.float64)
+    raiz = 0
+
+    for i, j, altura in _juncoes_upgma(matriz):
+        nos[i] = f"({_ramo(nos[i], altura - alturas[i])},{_ramo(nos[j], altura - alturas[j])})"
+        nos[j] = None
+        alturas[i] = altura
+        raiz = i
+
+    return nos[raiz] + ";"
+
+
+def _limite_inferior(valores):
+    """
+    Cópia float32 de valores arredondada para baixo, para poder ser usada como limite inferior.
+    """
+    reduzidos = valores.astype(np.float32)
+    acima = reduzidos > valores
+    reduzidos[acima] = np.nextafter(reduzidos[acima], np.float32(-np.inf))
+
+    return reduzidos
+
+
+def neighbor_joining(distancia_matriz, nomes, bloco = 16):
+    """
+    Constrói uma árvore por neighbor-joining diretamente a partir da matriz de dissimilaridade.
+
+    A matriz é compactada no próprio lugar: o nó novo ocupa a linha do primeiro vizinho e a última
+    linha ativa passa para a do segundo, pelo que cada passo só trabalha com a submatriz r x r dos
+    nós ativos. O par com o menor Q(i, j) = (r - 2) d(i, j) - R(i) - R(j) é procurado como no RapidNJ:
+    cada linha guarda os seus vizinhos ordenados por distância (a linha de um nó novo é ordenada
+    quando ele é criado) e é percorrida em blocos só enquanto (r - 2) d - R(i) - max R, um limite
+    inferior do Q das entradas que faltam, for menor que o melhor Q encontrado. Os vizinhos que
+    entretanto foram unidos são ignorados. O resultado é o mesmo da procura exaustiva.
+
+    Parâmetros:
+    - distancia_matriz (List[List[float]] ou numpy.ndarray): Matriz de dissimilaridade simétrica.
+    - nomes (List[str]): Nomes das sequências, pela ordem das linhas da matriz.
+    - bloco (int): Número de entradas de cada linha ordenada avaliadas no primeiro bloco (depois duplica).
+
+    Retorna:
+    str: Árvore não enraizada em formato Newick (trifurcação na raiz). Os comprimentos negativos são postos a 0 e
+    o do vizinho ajustado para que os dois ramos de cada junção somem a distância entre os nós unidos.
+    """
+    if not isinstance(bloco, int) or bloco < 1:
+        raise ValueError("O tamanho do bloco deve ser um inteiro positivo")
+
+    matriz = _preparar_distancias(distancia_matriz, nomes)
+    num_sequencias = ativos = matriz.shape[0]
+    nos = [_nome_newick(nome) for nome in nomes]
+
+    if ativos == 1:
+        return nos[0] + ";"
+
+    if ativos == 2:
+        return f"({_ramo(nos[0], matriz[0, 1] / 2.0)},{_ramo(nos[1], matriz[0, 1] / 2.0)});"
+
+    # Cada nó tem um identificador (as folhas 0..n-1, os nós novos n, n+1, ...); posicao[id] é a sua
+    # linha na matriz compactada, ou -1 depois de ser unido. O último identificador é uma sentinela.
+    sentinela = 2 * num_sequencias - 1
+    posicao = np.full(2 * num_sequencias, -1, dtype = np.int64)
+    posicao[:num_sequencias] = np.arange(num_sequencias)
+    identificadores = np.arange(num_sequencias, dtype = np.int64)
+
+    # Vizinhos de cada linha ordenados por distância e as distâncias (float32 arredondado para baixo)
+    # (com uma coluna extra no fim, a sentinela a infinito, que marca o fim de todas as linhas)
+    ordenados = np.full((num_sequencias, num_sequencias + 1), sentinela, dtype = np.int32)
+    ordenados[:, :-1] = matriz.argsort(axis = 1)
+    distancias = np.full((num_sequencias, num_sequencias + 1), np.inf, dtype = np.float32)
+    distancias[:, :-1] = _limite_inferior(np.take_along_axis(matriz, ordenados[:, :-1], axis = 1))
+    inicio = np.zeros(num_sequencias, dtype = np.int64)
+
+    somas = np.where(np.isinf(matriz), 0.0, matriz).sum(axis = 1)
+    novo_id = num_sequencias
+
+    while ativos > 3:
+        r = ativos
+        soma = somas[:r]
+        soma_maxima = soma.max()
+        linhas = np.arange(r)
+
+        # Limite inferior do Q de cada linha, a partir do vizinho mais próximo ainda por ver
+        limites = (r - 2) * distancias[linhas, inicio[:r]] - soma - soma_maxima
+        por_limite = linhas[np.argsort(limites, kind = 'stable')]
+        melhor, par = np.inf, None
+
+        # Primeiro as linhas mais promissoras, para ter logo um bom valor de corte, depois as restantes
+        for fase in range(2):
+            if fase == 0:
+                candidatas = por_limite[:bloco]
+            else:
+                candidatas = por_limite[bloco:]
+                candidatas = candidatas[limites[candidatas] < melhor]
+
+            deslocamentos = inicio[candidatas]
+            largura = bloco
+
+            while len(candidatas):
+                colunas = np.minimum(deslocamentos[:, None] + np.arange(largura), num_sequencias)
+                posicoes = posicao[ordenados[candidatas[:, None], colunas]]
+                vivos = posicoes >= 0
+                posicoes = np.where(vivos, posicoes, 0)
+
+                q = (r - 2) * matriz[candidatas[:, None], posicoes] - soma[posicoes]
+                q[~vivos] = np.inf
+                q -= soma[candidatas, None]
+
+                melhores = q.argmin(axis = 1)
+                valores = q[np.arange(len(candidatas)), melhores]
+                k = int(valores.argmin())
+
+                if valores[k] < melhor:
+                    melhor, par = valores[k], (int(candidatas[k]), int(posicoes[k, melhores[k]]))
+
+                # Os vizinhos já unidos no início de cada linha deixam de ser visitados nos passos seguintes
+                no_inicio = deslocamentos == inicio[candidatas]
+                mortos = np.where(vivos.any(axis = 1), vivos.argmax(axis = 1), largura)
+                inicio[candidatas[no_inicio]] = np.minimum(deslocamentos[no_inicio] + mortos[no_inicio], num_sequencias)
+
+                # Continua só nas linhas em que as entradas seguintes ainda podem ter um Q menor
+                deslocamentos = np.minimum(deslocamentos + largura, num_sequencias)
+                limite = (r - 2) * distancias[candidatas, deslocamentos] - soma[candidatas] - soma_maxima
+                continuar = limite < melhor
+
+                candidatas, deslocamentos = candidatas[continuar], deslocamentos[continuar]
+                largura *= 2
+
+        i, j = min(par), max(par)
+        d = matriz[i, j]
+        # Os ramos ficam em [0, d] e somam sempre d(i, j), mesmo numa matriz não aditiva
+        ramo_i = min(max(0.0, 0.5 * d + (somas[i] - somas[j]) / (2 * (r - 2))), d)
+        ramo_j = d - ramo_i
+
+        nos[i] = f"({_ramo(nos[i], ramo_i)},{_ramo(nos[j], ramo_j)})"
+
+        # Distâncias ao nó novo, que fica na linha i
+        ativa = matriz[:r, :r]
+        novo = 0.5 * (ativa[i] + ativa[j] - d)
+        novo[i] = np.inf
+        novo[j] = np.inf
+
+        # R(k) perde d(k, i) + d(k, j) e ganha d(k, novo), ou seja perde (d(k, i) + d(k, j) + d) / 2
+        somas[:r] -= 0.5 * (ativa[i] + ativa[j] + d)
+        matriz[i, :r] = novo
+        matriz[:r, i] = novo
+        somas[i] = novo[np.isfinite(novo)].sum()
+
+        posicao[identificadores[i]] = -1
+        posicao[identificadores[j]] = -1
+        posicao[novo_id] = i
+        identificadores[i] = novo_id
+        novo_id += 1
+
+        # A linha ordenada do nó novo tem todos os nós ativos (as outras linhas não o têm)
+        ordem = novo.argsort()
+        ordenados[i, :r] = identificadores[ordem]
+        ordenados[i, r:] = sentinela
+        distancias[i, :r] = _limite_inferior(novo[ordem])
+        distancias[i, r:] = np.inf
+        inicio[i] = 0
+
+        # A última linha ativa passa para a posição j
+        ultima = r - 1
+        if j != ultima:
+            matriz[j, :r] = matriz[ultima, :r]
+            matriz[:r, j] = matriz[:r, ultima]
+            matriz[j, j] = np.inf
+            somas[j] = somas[ultima]
+            nos[j] = nos[ultima]
+            ordenados[j] = ordenados[ultima]
+            distancias[j] = distancias[ultima]
+            inicio[j] = inicio[ultima]
+            identificadores[j] = identificadores[ultima]
+            posicao[identificadores[j]] = j
+
+        ativos -= 1
+
+    # Os três nós restantes ligam-se a um nó central; os dois primeiros são limitados como num passo de junção
+    d01, d02, d12 = matriz[0, 1], matriz[0, 2], matriz[1, 2]
+    ramo_0 = min(max(0.0, 0.5 * (d01 + d02 - d12)), d01)
+    ramos = (ramo_0, d01 - ramo_0, max(0.0, 0.5 * (d02 + d12 - d01)))
+
+    return "(" + ",".join(_ramo(nos[k], ramos[k]) for k in range(3)) + ");"
+
+
+def criar_arvore_newick(distancia_matriz, sequencias, metodo = 'upgma'):
+    """
+    Cria a árvore filogenética a partir da matriz de dissimilaridade já calculada (nw_ciclico ou
+    nw_ciclico_paralelo), sem alinhar nem recalcular distâncias.
+
+    Parâmetros:
+    - distancia_matriz (List[List[float]] ou numpy.ndarray): Matriz de dissimilaridade entre as sequências.
+    - sequencias (List[Tuple[str, str]]): Lista de tuplas contendo nomes e sequências (só os nomes são usados).
+    - metodo (str): 'upgma' ou 'nj' (neighbor-joining).
+
+    Retorna:
+    str: Árvore em formato Newick, que pode ser lida com Bio.Phylo.read(StringIO(newick), "newick").
+    """
+    metodos = {'upgma': upgma, 'nj': neighbor_joining}
+
+    if metodo not in metodos:
+        raise ValueError(f"Método desconhecido: {metodo} (usar 'upgma' ou 'nj')")
+
+    return metodos[metodo](distancia_matriz, [nome for nome, _ in sequencias])
+
+
+def _reordenar_colunas(valores, caminho, espaco):
+    """
+    Coloca as colunas (ou linhas) de valores pela ordem do caminho do alinhamento de perfis, com
+    espaco nas posições -1.
+    """
+    reordenados = valores[np.maximum(caminho, 0)] if len(valores) else np.zeros((len(caminho),) + valores.shape[1:], dtype = valores.dtype)
+    reordenados[caminho < 0] = espaco
+
+    return reordenados
+
+
+def alinhamento_progressivo(sequencias, distancia_matriz = None, score_subst = 2, score_space = -4, matriz = None):
+    """
+    Alinhamento múltiplo progressivo guiado pela árvore UPGMA da matriz de dissimilaridade.
+
+    As sequências (e depois os grupos já alinhados) são unidas pela ordem das junções UPGMA e cada
+    junção alinha os dois perfis com o alinhar_perfis (Needleman-Wunsch sum-of-pairs, com os scores
+    de uma linha inteira calculados a partir das contagens de cada coluna). Os espaços inseridos num
+    grupo são mantidos nas junções seguintes ("once a gap, always a gap").
+
+    Parâmetros:
+    - sequencias (List[Tuple[str, str]]): Lista de tuplas contendo nomes e sequências.
+    - distancia_matriz (List[List[float]] ou numpy.ndarray, opcional): Matriz de dissimilaridade já calculada; se None é calculada com o nw_ciclico (ou, com outra matriz, com os alinhamentos par a par).
+    - score_subst (int): Pontuação para correspondência (a substituição vale -score_subst), como no nw_ciclico.
+    - score_space (int): Penalidade para espaços.
+    - matriz (MatrizSubstituicao ou str, opcional): Matriz de substituição (por exemplo 'BLOSUM62'); se None as sequências têm de ser ADN.
+
+    Retorna:
+    List[Tuple[str, str]]: Nomes e sequências alinhadas (todas com o mesmo comprimento), pela ordem de entrada.
+
+    Levanta:
+    ValueError: Se a lista de sequências estiver vazia ou, sem matriz, alguma sequência não for ADN válido.
+    """
+    from scripts.auxiliares import validar_dna, aprimorar_seq
+    from scripts.alinhamentos import pontuacao_perfis, alinhar_perfis
+    from scripts.matrizes import MatrizSubstituicao, carregar_matriz
+
+    sequencias = list(sequencias)
+
+    if not sequencias:
+        raise ValueError("É necessária pelo menos uma sequência para o alinhamento múltiplo")
+
+    nomes = [nome for nome, _ in sequencias]
+
+    dna = matriz is None
+
+    if dna:
+        for nome, seq in sequencias:
+            if not validar_dna(seq):
+                raise ValueError(f"A sequência {nome} não é ADN válido")
+
+        matriz = MatrizSubstituicao.identidade('ACGT', score_subst, -score_subst)
+    else:
+        matriz = carregar_matriz(matriz)
+
+    pontuacao = pontuacao_perfis(matriz, score_space)
+    espaco = len(matriz.alfabeto)
+    simbolos = np.arange(espaco + 1)
+
+    # Cada grupo guarda os índices das suas sequências, as linhas alinhadas (códigos, com espaco
+    # para '-') e as contagens de cada símbolo por coluna
+    grupos = []
+    for _, seq in sequencias:
+        codigos = matriz.codificar(aprimorar_seq(seq))
+        grupos.append(([len(grupos)], codigos[None, :], (codigos[:, None] == simbolos).astype(np.int64)))
+
+    if distancia_matriz is None and dna:
+        distancia_matriz = nw_ciclico(sequencias, score_subst, score_space)
+
+    elif distancia_matriz is None:
+        # Com outra matriz as distâncias vêm dos alinhamentos par a par com a mesma pontuação
+        distancia_matriz = np.zeros((len(grupos), len(grupos)))
+
+        for i in range(len(grupos)):
+            for j in range(i + 1, len(grupos)):
+                score, caminho, _ = alinhar_perfis(grupos[i][2], grupos[j][2], pontuacao)
+                distancia_matriz[i, j] = distancia_matriz[j, i] = 1.0 - score / max(len(caminho), 1)
+
+    distancias = _preparar_distancias(distancia_matriz, nomes)
+
+    for i, j, _ in _juncoes_upgma(distancias):
+        membros_i, linhas_i, contagens_i = grupos[i]
+        membros_j, linhas_j, contagens_j = grupos[j]
+
+        _, caminho_i, caminho_j = alinhar_perfis(contagens_i, contagens_j, pontuacao)
+
+        coluna_espacos_i = np.zeros(espaco + 1, dtype = np.int64)
+        coluna_espacos_i[espaco] = len(membros_i)
+        coluna_espacos_j = np.zeros(espaco + 1, dtype = np.int64)
+        coluna_espacos_j[espaco] = len(membros_j)
+
+        linhas = np.vstack([_reordenar_colunas(linhas_i.T, caminho_i, espaco).T,
+                            _reordenar_colunas(linhas_j.T, caminho_j, espaco).T])
+        contagens = _reordenar_colunas(contagens_i, caminho_i, coluna_espacos_i) + _reordenar_colunas(contagens_j, caminho_j, coluna_espacos_j)
+
+        grupos[i] = (membros_i + membros_j, linhas, contagens)
+        grupos[j] = None
+
+    membros, linhas, _ = next(grupo for grupo in grupos if grupo is not None)
+    letras = np.frombuffer((matriz.alfabeto + '-').encode('ascii'), dtype = np.uint8)
+
+    alinhadas = [None] * len(sequencias)
+    for membro, linha in zip(membros, linhas):
+        alinhadas[membro] = (nomes[membro], letras[linha].tobytes().decode('ascii'))
+
+    return alinhadas
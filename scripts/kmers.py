@@ -0,0 +1,612 @@
+import numpy as np
+
+from scripts.codificacao import ALFABETO_2BITS, codificar_2bits, codigos_kmers, codigo_kmer
+
+
+# Tamanho máximo dos k-mers (2 bits por base num uint64)
+MAX_K = 32
+
+
+def complemento_kmers(codigos, k):
+    """
+    Códigos de 2 bits dos complementos inversos de k-mers já codificados
+
+
+    Parâmetros
+    -------------
+    codigos : numpy.ndarray ou int
+        Códigos uint64 dos k-mers (como os devolvidos por codigos_kmers)
+
+    k : int
+        Tamanho dos k-mers
+
+
+    Retorna
+    -------------
+    numpy.ndarray
+        Códigos uint64 dos complementos inversos
+
+    """
+    codigos = np.asarray(codigos, dtype = np.uint64)
+    inversos = np.zeros_like(codigos)
+
+    # O complemento de uma base é 3 - código (A <-> T, C <-> G) e a ordem das bases é invertida
+    for _ in range(k):
+        inversos = (inversos << np.uint64(2)) | (np.uint64(3) - (codigos & np.uint64(3)))
+        codigos = codigos >> np.uint64(2)
+
+    return inversos
+
+
+def canonico(codigos, k):
+    """Código canónico de cada k-mer: o menor entre o k-mer e o seu complemento inverso"""
+    return np.minimum(np.asarray(codigos, dtype = np.uint64), complemento_kmers(codigos, k))
+
+
+def descodificar_kmer(codigo, k):
+    """Converte o código de 2 bits de um k-mer de volta na str"""
+    codigo = int(codigo)
+
+    return ''.join(ALFABETO_2BITS[(codigo >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+
+def _contar_bloco(dados, k, canonicos, posicoes, deslocamento):
+    """
+    Conta os k-mers de um bloco de bytes (ou de códigos de 2 bits); é a tarefa de cada processo
+
+    Retorna (códigos únicos, contagens), ou, com posicoes, (códigos ordenados, posições), em que
+    as posições já incluem o deslocamento do bloco na sequência.
+    """
+    codigos = dados if isinstance(dados, np.ndarray) else codificar_2bits(dados)
+    kmers, validos = codigos_kmers(codigos, k)
+
+    if canonicos:
+        kmers = np.minimum(kmers, complemento_kmers(kmers, k))
+
+    kmers = kmers[validos]
+
+    if posicoes:
+        ordem = np.argsort(kmers, kind = 'stable')
+        return kmers[ordem], (np.flatnonzero(validos) + deslocamento)[ordem]
+
+    return np.unique(kmers, return_counts = True)
+
+
+def _juntar_contagens(partes):
+    """
+    Junta as contagens (códigos únicos, contagens) de vários blocos, somando as dos k-mers repetidos
+    """
+    if not partes:
+        return np.zeros(0, dtype = np.uint64), np.zeros(0, dtype = np.int64)
+
+    codigos = np.concatenate([parte[0] for parte in partes])
+    contagens = np.concatenate([parte[1] for parte in partes]).astype(np.int64)
+
+    if len(partes) == 1 or len(codigos) == 0:
+        return codigos, contagens
+
+    ordem = np.argsort(codigos, kind = 'stable')
+    codigos, contagens = codigos[ordem], contagens[ordem]
+
+    inicios = np.flatnonzero(np.concatenate(([True], codigos[1:] != codigos[:-1])))
+
+    return codigos[inicios], np.add.reduceat(contagens, inicios)
+
+
+def _juntar_posicoes(partes):
+    """
+    Junta os (códigos ordenados, posições) de vários blocos num índice: códigos únicos, contagens,
+    inícios de cada k-mer no array de posições e as posições (por ordem crescente dentro de cada k-mer)
+    """
+    if partes:
+        codigos = np.concatenate([parte[0] for parte in partes])
+        posicoes = np.concatenate([parte[1] for parte in partes]).astype(np.int64)
+    else:
+        codigos, posicoes = np.zeros(0, dtype = np.uint64), np.zeros(0, dtype = np.int64)
+
+    # Os blocos estão por ordem de posição, pelo que a ordenação estável mantém as posições crescentes
+    if len(partes) > 1:
+        ordem = np.argsort(codigos, kind = 'stable')
+        codigos, posicoes = codigos[ordem], posicoes[ordem]
+
+    unicos, contagens = np.unique(codigos, return_counts = True)
+
+    inicios = np.zeros(len(unicos) + 1, dtype = np.int64)
+    np.cumsum(contagens, out = inicios[1:])
+
+    return unicos, contagens.astype(np.int64), inicios, posicoes
+
+
+class ContagemKmers:
+    """
+    Contagens de k-mers guardadas em arrays NumPy ordenados por código (2 bits por base)
+
+    codigos tem os k-mers distintos por ordem crescente e contagens o número de ocorrências de cada um;
+    procurar um k-mer é uma pesquisa binária. Se as posições forem guardadas, posicoes[inicios[i]:
+    inicios[i + 1]] são as posições do k-mer i (por ordem crescente, em coordenadas concatenadas:
+    limites[s] é onde começa a sequência s), o mesmo formato CSR do IndiceKmers.
+
+    Com k-mers canónicos cada k-mer e o seu complemento inverso são contados juntos, com o código do
+    menor dos dois, e as posições são as do k-mer lido na cadeia dada.
+
+    """
+    __slots__ = ('k', 'canonicos', 'codigos', 'contagens', 'inicios', 'posicoes', 'limites')
+
+    def __init__(self, k, canonicos, codigos, contagens, inicios = None, posicoes = None, limites = None):
+        self.k = k
+        self.canonicos = canonicos
+        self.codigos = codigos
+        self.contagens = contagens
+        self.inicios = inicios
+        self.posicoes = posicoes
+        self.limites = limites
+
+    def __len__(self):
+        return len(self.codigos)
+
+    @property
+    def total(self):
+        """Número total de k-mers contados (com repetições)"""
+        return int(self.contagens.sum())
+
+    def _indice(self, kmer):
+        """Índice do k-mer em codigos, ou None se não existir"""
+        codigo = codigo_kmer(kmer) if len(kmer) == self.k else None
+
+        if codigo is None:
+            return None
+
+        if self.canonicos:
+            codigo = int(canonico(codigo, self.k))
+
+        indice = int(np.searchsorted(self.codigos, np.uint64(codigo)))
+
+        if indice < len(self.codigos) and int(self.codigos[indice]) == codigo:
+            return indice
+
+        return None
+
+    def contagem(self, kmer):
+        """Número de ocorrências do k-mer (0 se não existir ou tiver bases inválidas)"""
+        indice = self._indice(kmer)
+
+        return 0 if indice is None else int(self.contagens[indice])
+
+    def posicoes_kmer(self, kmer):
+        """
+        Posições (coordenadas concatenadas) das ocorrências do k-mer
+
+        Levanta
+        -------------
+        ValueError
+            Caso as posições não tenham sido guardadas
+        """
+        if self.posicoes is None:
+            raise ValueError("As posições não foram guardadas (usar posicoes = True)")
+
+        indice = self._indice(kmer)
+
+        if indice is None:
+            return self.posicoes[:0]
+
+        return self.posicoes[self.inicios[indice]:self.inicios[indice + 1]]
+
+    def mais_frequentes(self, n = 10):
+        """Lista dos n k-mers mais frequentes, como tuplos (k-mer, contagem)"""
+        ordem = np.argsort(-self.contagens, kind = 'stable')[:n]
+
+        return [(descodificar_kmer(self.codigos[i], self.k), int(self.contagens[i])) for i in ordem]
+
+    def espectro(self):
+        """Espectro de multiplicidades: espectro[c] é o número de k-mers distintos que ocorrem c vezes"""
+        return np.bincount(self.contagens, minlength = 1)
+
+    def jaccard(self, outra):
+        """
+        Índice de Jaccard entre os conjuntos de k-mers das duas contagens
+
+        Levanta
+        -------------
+        ValueError
+            Caso as contagens tenham k diferentes ou uma seja canónica e a outra não
+        """
+        if (self.k, self.canonicos) != (outra.k, outra.canonicos):
+            raise ValueError("As contagens devem ter o mesmo k e o mesmo tipo de k-mers")
+
+        comuns = len(np.intersect1d(self.codigos, outra.codigos, assume_unique = True))
+        uniao = len(self) + len(outra) - comuns
+
+        return comuns / uniao if uniao else 1.0
+
+    def distancia(self, outra):
+        """
+        Distância de Mash entre as duas sequências, -1/k ln(2J / (1 + J)), a partir do índice de Jaccard J
+        (1.0 quando não há k-mers em comum)
+        """
+        return distancia_mash(self.jaccard(outra), self.k)
+
+    def query_map(self):
+        """
+        Dicionário {k-mer: [posições]} igual ao devolvido por query_map (só k-mers válidos, pela ordem
+        da primeira ocorrência), para ser usado pelas funções de scripts.blast
+        """
+        if self.posicoes is None or self.canonicos:
+            raise ValueError("O query map precisa das posições de k-mers não canónicos")
+
+        primeiras = self.posicoes[self.inicios[:-1]]
+        mapa = {}
+
+        for indice in np.argsort(primeiras, kind = 'stable'):
+            mapa[descodificar_kmer(self.codigos[indice], self.k)] = self.posicoes[self.inicios[indice]:self.inicios[indice + 1]].tolist()
+
+        return mapa
+
+    def tabela_query(self):
+        """
+        Arrays (códigos, ordem do k-mer, offset na query) usados na procura de seeds de scripts.blast,
+        iguais aos que seriam obtidos a partir do query_map, sem passar por um dicionário
+        """
+        if self.posicoes is None or self.canonicos:
+            raise ValueError("A tabela da query precisa das posições de k-mers não canónicos")
+
+        # Ordem de cada k-mer no query map: a ordem da sua primeira ocorrência
+        primeiras = self.posicoes[self.inicios[:-1]]
+        ordens = np.empty(len(self), dtype = np.int64)
+        ordens[np.argsort(primeiras, kind = 'stable')] = np.arange(len(self))
+
+        return np.repeat(self.codigos, self.contagens), np.repeat(ordens, self.contagens), self.posicoes.copy()
+
+    def __repr__(self):
+        tipo = "canónicos" if self.canonicos else "diretos"
+        return f"ContagemKmers(k = {self.k}, {len(self)} k-mers {tipo} distintos, {self.total} no total)"
+
+
+def distancia_mash(jaccard, k):
+    """
+    Distância de Mash a partir do índice de Jaccard entre os conjuntos de k-mers de duas sequências
+
+
+    Parâmetros
+    -------------
+    jaccard : float
+        Índice de Jaccard (0 a 1)
+
+    k : int
+        Tamanho dos k-mers
+
+
+    Retorna
+    -------------
+    float
+        -1/k ln(2J / (1 + J)), ou 1.0 se J = 0
+
+    """
+    import math
+
+    if jaccard <= 0:
+        return 1.0
+
+    return max(0.0, -math.log(2 * jaccard / (1 + jaccard)) / k)
+
+
+def _blocos(seqs, k, bloco):
+    """
+    Divide as sequências em blocos de bloco bases que se sobrepõem em k - 1 bases (nenhum k-mer é
+    perdido nem contado duas vezes) e devolve os blocos, os seus deslocamentos e os limites das sequências
+    """
+    from scripts.auxiliares import _normalizar_bytes
+
+    if isinstance(seqs, (str, bytes, bytearray, memoryview)) or hasattr(type(seqs), '__bytes__'):
+        seqs = [seqs]
+
+    blocos, deslocamentos, limites = [], [], [0]
+
+    for seq in seqs:
+        seq = seq[1] if isinstance(seq, tuple) else seq
+
+        # As str são normalizadas (maiúsculas, sem espaços) como no query_map
+        if isinstance(seq, str):
+            seq = _normalizar_bytes(seq)
+
+            if seq is None:
+                raise ValueError("A sequência tem caracteres fora do ASCII")
+
+        for inicio in range(0, max(len(seq) - k + 1, 0), bloco):
+            blocos.append(seq[inicio:inicio + bloco + k - 1])
+            deslocamentos.append(limites[-1] + inicio)
+
+        limites.append(limites[-1] + len(seq))
+
+    return blocos, deslocamentos, np.array(limites, dtype = np.int64)
+
+
+def contar_kmers(seqs, k, canonicos = True, posicoes = False, n_processos = 1, bloco = 1 << 22):
+    """
+    Conta os k-mers de uma ou mais sequências de ADN
+
+    Cada bloco é codificado com 2 bits por base e os códigos de todos os k-mers são calculados de uma
+    vez (codigos_kmers); a contagem é feita ordenando os códigos (np.unique), sem dicionários nem
+    objetos Python por k-mer. Os blocos sobrepõem-se em k - 1 bases e, com n_processos > 1, são
+    contados em paralelo num pool de processos e depois juntados (cada bloco é um fragmento
+    independente da tabela final). Os k-mers com bases que não sejam A, C, G ou T são ignorados.
+
+
+    Parâmetros
+    -------------
+    seqs : str, bytes, VistaSequencia, PackedSeq ou lista
+        Sequência, ou lista de sequências (ou de tuplos (nome, sequência)); os k-mers não atravessam
+        a fronteira entre sequências
+
+    k : int
+        Tamanho dos k-mers (1 a MAX_K)
+
+    canonicos : bool
+        Se True cada k-mer é contado junto com o seu complemento inverso
+
+    posicoes : bool
+        Se True guarda também as posições de cada k-mer (necessárias para seeds do BLAST)
+
+    n_processos : int
+        Número de processos usados para contar os blocos
+
+    bloco : int
+        Número de bases de cada bloco
+
+
+    Retorna
+    -------------
+    ContagemKmers
+
+
+    Levanta
+    -------------
+    ValueError
+        Caso k, n_processos ou bloco sejam inválidos
+
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not isinstance(k, int) or not 0 < k <= MAX_K:
+        raise ValueError(f"O tamanho dos k-mers deve ser um inteiro entre 1 e {MAX_K}")
+
+    if not isinstance(n_processos, int) or n_processos < 1:
+        raise ValueError("O número de processos deve ser um inteiro positivo")
+
+    if not isinstance(bloco, int) or bloco < 1:
+        raise ValueError("O tamanho do bloco deve ser um inteiro positivo")
+
+    blocos, deslocamentos, limites = _blocos(seqs, k, bloco)
+    parametros = ([k] * len(blocos), [canonicos] * len(blocos), [posicoes] * len(blocos), deslocamentos)
+
+    if n_processos > 1 and len(blocos) > 1:
+        # Os processos recebem os códigos de 2 bits, que também servem para vistas e PackedSeq
+        with ProcessPoolExecutor(max_workers = min(n_processos, len(blocos))) as pool:
+            partes = list(pool.map(_contar_bloco, [codificar_2bits(parte) for parte in blocos], *parametros))
+    else:
+        partes = list(map(_contar_bloco, blocos, *parametros))
+
+    if posicoes:
+        return ContagemKmers(k, canonicos, *_juntar_posicoes(partes), limites = limites)
+
+    return ContagemKmers(k, canonicos, *_juntar_contagens(partes), limites = limites)
+
+
+##################################
+#   Esboços MinHash (bottom-k)   #
+##################################
+
+# Multiplicadores do finalizador do splitmix64, usado como função de hash dos códigos dos k-mers
+_MISTURA_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MISTURA_2 = np.uint64(0x94D049BB133111EB)
+_OURO = 0x9E3779B97F4A7C15
+
+
+def _hash_kmers(codigos, semente):
+    """Hash de 64 bits (splitmix64) dos códigos dos k-mers, com uma semente"""
+    with np.errstate(over = 'ignore'):
+        x = codigos.astype(np.uint64) + np.uint64((semente * _OURO) & 0xFFFFFFFFFFFFFFFF)
+        x ^= x >> np.uint64(30)
+        x *= _MISTURA_1
+        x ^= x >> np.uint64(27)
+        x *= _MISTURA_2
+        x ^= x >> np.uint64(31)
+
+    return x
+
+
+class Esboco:
+    """
+    Esboço MinHash bottom-k de uma sequência: os tamanho menores hashes dos seus k-mers canónicos
+
+    Dois esboços com os mesmos k e semente estimam o índice de Jaccard entre os conjuntos de k-mers
+    das sequências (e daí a distância de Mash) sem voltar a ler as sequências.
+
+    """
+    __slots__ = ('k', 'tamanho', 'semente', 'hashes', 'comprimento', 'assinatura')
+
+    def __init__(self, k, tamanho, semente, hashes, comprimento = 0, assinatura = 0):
+        self.k = k
+        self.tamanho = tamanho
+        self.semente = semente
+        self.hashes = hashes
+        self.comprimento = comprimento
+        self.assinatura = assinatura
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _compativel(self, outro):
+        if (self.k, self.semente) != (outro.k, outro.semente):
+            raise ValueError("Os esboços devem ter o mesmo k e a mesma semente")
+
+    def jaccard(self, outro):
+        """
+        Estimativa do índice de Jaccard: entre os s menores hashes da união dos dois esboços (s é o
+        tamanho do menor), a fração que está nos dois
+
+        Levanta
+        -------------
+        ValueError
+            Caso os esboços tenham k ou sementes diferentes
+        """
+        self._compativel(outro)
+
+        tamanho = min(len(self), len(outro))
+
+        if tamanho == 0:
+            return 1.0 if len(self) == len(outro) else 0.0
+
+        uniao = np.union1d(self.hashes, outro.hashes)[:tamanho]
+        comuns = np.intersect1d(self.hashes, outro.hashes, assume_unique = True)
+
+        return int(np.isin(uniao, comuns, assume_unique = True).sum()) / tamanho
+
+    def distancia(self, outro):
+        """Distância de Mash estimada a partir do esboço (ver distancia_mash)"""
+        return distancia_mash(self.jaccard(outro), self.k)
+
+    def __repr__(self):
+        return f"Esboco(k = {self.k}, {len(self)} hashes, {self.comprimento} bases)"
+
+
+def esboco(seq, k = 21, tamanho = 1000, semente = 42, bloco = 1 << 22):
+    """
+    Calcula o esboço MinHash bottom-k de uma sequência
+
+    A sequência é lida em blocos (como em contar_kmers) e só são guardados os tamanho menores hashes
+    vistos até ao momento, pelo que a memória não depende do tamanho da sequência.
+
+
+    Parâmetros
+    -------------
+    seq : str, bytes, VistaSequencia, PackedSeq ou lista
+        Sequência de ADN (ou lista de sequências, por exemplo os contigs de um genoma)
+
+    k : int
+        Tamanho dos k-mers (1 a MAX_K)
+
+    tamanho : int
+        Número de hashes guardados
+
+    semente : int
+        Semente da função de hash (os esboços só são comparáveis com a mesma semente)
+
+    bloco : int
+        Número de bases lidas de cada vez
+
+
+    Retorna
+    -------------
+    Esboco
+
+
+    Levanta
+    -------------
+    ValueError
+        Caso k, tamanho ou bloco sejam inválidos
+
+    """
+    if not isinstance(k, int) or not 0 < k <= MAX_K:
+        raise ValueError(f"O tamanho dos k-mers deve ser um inteiro entre 1 e {MAX_K}")
+
+    if not isinstance(tamanho, int) or tamanho < 1 or not isinstance(bloco, int) or bloco < 1:
+        raise ValueError("O tamanho do esboço e do bloco devem ser inteiros positivos")
+
+    blocos, deslocamentos, limites = _blocos(seq, k, bloco)
+    menores = np.zeros(0, dtype = np.uint64)
+
+    for parte, deslocamento in zip(blocos, deslocamentos):
+        codigos, _ = _contar_bloco(parte, k, True, False, deslocamento)
+        menores = np.union1d(menores, _hash_kmers(codigos, semente))[:tamanho]
+
+    return Esboco(k, tamanho, semente, menores, int(limites[-1]))
+
+
+def _assinatura(seq):
+    """Soma de verificação (CRC32) da sequência normalizada, para reconhecer esboços guardados"""
+    import zlib
+
+    from scripts.auxiliares import _normalizar_bytes
+
+    dados = _normalizar_bytes(seq)
+
+    return zlib.crc32(dados) if dados is not None else 0
+
+
+def guardar_esbocos(esbocos, caminho):
+    """
+    Guarda um dicionário {nome: Esboco} num ficheiro .npz (um array por esboço e os metadados em JSON)
+    """
+    import json
+
+    nomes = list(esbocos)
+    meta = [{'nome': nome, 'k': esbocos[nome].k, 'tamanho': esbocos[nome].tamanho, 'semente': esbocos[nome].semente,
+             'comprimento': esbocos[nome].comprimento, 'assinatura': esbocos[nome].assinatura} for nome in nomes]
+
+    arrays = {f"esboco_{numero}": esbocos[nome].hashes for numero, nome in enumerate(nomes)}
+
+    with open(caminho, 'wb') as ficheiro:
+        np.savez(ficheiro, meta = np.array(json.dumps(meta)), **arrays)
+
+
+def carregar_esbocos(caminho):
+    """
+    Lê um ficheiro criado por guardar_esbocos e devolve o dicionário {nome: Esboco}
+    """
+    import json
+
+    with np.load(caminho, allow_pickle = False) as dados:
+        meta = json.loads(str(dados['meta']))
+
+        return {entrada['nome']: Esboco(entrada['k'], entrada['tamanho'], entrada['semente'], dados[f"esboco_{numero}"],
+                                        entrada['comprimento'], entrada['assinatura'])
+                for numero, entrada in enumerate(meta)}
+
+
+def esbocos_sequencias(sequencias, k = 21, tamanho = 1000, semente = 42, caminho = None):
+    """
+    Esboços de uma lista de sequências, reutilizando os que estiverem guardados em caminho
+
+    Um esboço guardado só é reutilizado se tiver o mesmo nome, os mesmos parâmetros e a mesma soma
+    de verificação da sequência; os restantes são calculados e o ficheiro é atualizado.
+
+
+    Parâmetros
+    -------------
+    sequencias : List[Tuple[str, str]]
+        Lista de tuplas contendo nomes e sequências
+
+    k, tamanho, semente :
+        Parâmetros dos esboços, como em esboco
+
+    caminho : str, opcional
+        Ficheiro .npz onde os esboços são guardados entre execuções
+
+
+    Retorna
+    -------------
+    dict
+        {nome: Esboco}, pela ordem das sequências
+
+    """
+    import os
+
+    guardados = carregar_esbocos(caminho) if caminho is not None and os.path.exists(caminho) else {}
+    esbocos, alterados = {}, False
+
+    for nome, seq in sequencias:
+        assinatura = _assinatura(seq)
+        anterior = guardados.get(nome)
+
+        if anterior is not None and (anterior.k, anterior.tamanho, anterior.semente, anterior.assinatura) == (k, tamanho, semente, assinatura):
+            esbocos[nome] = anterior
+            continue
+
+        esbocos[nome] = esboco(seq, k, tamanho, semente)
+        esbocos[nome].assinatura = assinatura
+        alterados = True
+
+    if caminho is not None and alterados:
+        guardar_esbocos({**guardados, **esbocos}, caminho)
+
+    return esbocos
@@ -0,0 +1,200 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+# Matriz BLOSUM62 no formato NCBI (o mesmo que MatrizSubstituicao.de_ficheiro lê)
+BLOSUM62 = """
+#  Matrix made by matblas from blosum62.iij
+   A  R  N  D  C  Q  E  G  H  I  L  K  M  F  P  S  T  W  Y  V  B  Z  X  *
+A  4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0 -2 -1  0 -4
+R -1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3 -1  0 -1 -4
+N -2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3  3  0 -1 -4
+D -2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3  4  1 -1 -4
+C  0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1 -3 -3 -2 -4
+Q -1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2  0  3 -1 -4
+E -1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+G  0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3 -1 -2 -1 -4
+H -2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3  0  0 -1 -4
+I -1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3 -3 -3 -1 -4
+L -1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1 -4 -3 -1 -4
+K -1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2  0  1 -1 -4
+M -1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1 -3 -1 -1 -4
+F -2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1 -3 -3 -1 -4
+P -1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2 -2 -1 -2 -4
+S  1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2  0  0  0 -4
+T  0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0 -1 -1  0 -4
+W -3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3 -4 -3 -2 -4
+Y -2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1 -3 -2 -1 -4
+V  0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4 -3 -2 -1 -4
+B -2 -1  3  4 -3  0  1 -1  0 -3 -4  0 -3 -3 -2  0 -1 -4 -3 -3  4  1 -1 -4
+Z -1  0  0  1 -3  3  4 -2  0 -3 -3  1 -1 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+X  0 -1 -1 -1 -2 -1 -1 -1 -1 -1 -1 -1 -1 -1 -2  0  0 -2 -1 -1 -1 -1 -1 -4
+* -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4  1
+"""
+
+# Código dos caracteres que não pertencem ao alfabeto da matriz
+FORA_ALFABETO = 255
+
+
+class MatrizSubstituicao:
+    """
+    Matriz de substituição compilada numa tabela inteira densa
+
+    Cada resíduo é convertido num índice 0..K-1 (através de uma tabela de 256 entradas, que aceita
+    também minúsculas) e o score de um par é tabela[i, j], sem chamadas a funções por célula.
+    Os caracteres fora do alfabeto são tratados como X quando a matriz tem X.
+
+    """
+    __slots__ = ('nome', 'alfabeto', 'codigos', 'tabela')
+
+    def __init__(self, alfabeto, tabela, nome = None):
+        """
+        Parâmetros
+        -------------
+        alfabeto : str
+            Resíduos pela ordem das linhas/colunas da tabela
+
+        tabela : array
+            Matriz K x K com os scores inteiros
+
+        nome : str, opcional
+            Nome da matriz
+
+
+        Levanta
+        -------------
+        ValueError
+            Caso a tabela não seja K x K, não seja simétrica ou o alfabeto tenha resíduos repetidos
+
+        """
+        tabela = np.asarray(tabela, dtype = np.int32)
+
+        if tabela.shape != (len(alfabeto), len(alfabeto)) or len(set(alfabeto.upper())) != len(alfabeto):
+            raise ValueError("A tabela deve ser K x K, com K resíduos distintos no alfabeto")
+
+        if not (tabela == tabela.T).all():
+            raise ValueError("A matriz de substituição deve ser simétrica")
+
+        self.nome = nome
+        self.alfabeto = alfabeto.upper()
+        self.tabela = tabela
+        self.codigos = np.full(256, FORA_ALFABETO, dtype = np.uint8)
+
+        # com X na matriz, as letras (e '*') desconhecidas contam como X; gaps, dígitos e o resto continuam inválidos
+        if 'X' in self.alfabeto:
+            import string
+
+            for residuo in string.ascii_letters + '*':
+                self.codigos[ord(residuo)] = self.alfabeto.find('X')
+
+        for indice, residuo in enumerate(self.alfabeto):
+            self.codigos[ord(residuo)] = indice
+            self.codigos[ord(residuo.lower())] = indice
+
+    @classmethod
+    def de_texto(cls, texto, nome = None):
+        """
+        Lê uma matriz no formato NCBI: linhas começadas por '#' são comentários, a primeira linha
+        tem os resíduos e cada linha seguinte começa pelo resíduo e tem os scores
+
+        Levanta
+        -------------
+        ValueError
+            Caso o texto não tenha o formato esperado
+        """
+        linhas = [linha.split() for linha in texto.splitlines() if linha.strip() and not linha.lstrip().startswith('#')]
+
+        if not linhas:
+            raise ValueError("Matriz de substituição vazia")
+
+        alfabeto = ''.join(linhas[0])
+
+        try:
+            ordem = [linha[0] for linha in linhas[1:]]
+            valores = [[int(valor) for valor in linha[1:]] for linha in linhas[1:]]
+        except ValueError:
+            raise ValueError("Matriz de substituição com scores não inteiros")
+
+        if ''.join(ordem) != alfabeto:
+            raise ValueError("As linhas da matriz devem estar pela ordem do cabeçalho")
+
+        return cls(alfabeto, valores, nome)
+
+    @classmethod
+    def de_ficheiro(cls, caminho):
+        """Lê uma matriz (BLOSUM, PAM ou personalizada) de um ficheiro no formato NCBI"""
+        import os
+
+        with open(caminho) as ficheiro:
+            return cls.de_texto(ficheiro.read(), os.path.basename(caminho))
+
+    @classmethod
+    def identidade(cls, alfabeto = 'ACGT', equal = 2, subst = -1):
+        """Matriz com equal na diagonal e subst fora dela, como o score_subst (por omissão para ADN)"""
+        tabela = np.full((len(alfabeto), len(alfabeto)), subst, dtype = np.int32)
+        np.fill_diagonal(tabela, equal)
+
+        return cls(alfabeto, tabela, f"identidade({equal}, {subst})")
+
+    def codificar(self, seq):
+        """
+        Converte uma sequência no array com o índice de cada resíduo na tabela
+
+        Levanta
+        -------------
+        ValueError
+            Caso a sequência tenha resíduos fora do alfabeto; se a matriz tiver X, só
+            caracteres que não sejam letras nem '*' (gaps, dígitos, pontuação ou não ASCII)
+        """
+        if isinstance(seq, str):
+            seq = seq.encode('ascii', errors = 'replace')
+
+        codigos = self.codigos[np.frombuffer(seq, dtype = np.uint8)]
+
+        if (codigos == FORA_ALFABETO).any():
+            raise ValueError(f"A sequência tem resíduos fora do alfabeto da matriz {self.nome}")
+
+        return codigos
+
+    def score(self, residuo_1, residuo_2):
+        """Score de um par de resíduos"""
+        return int(self.tabela[self.codigos[ord(residuo_1)], self.codigos[ord(residuo_2)]])
+
+    def __repr__(self):
+        return f"MatrizSubstituicao({self.nome!r}, {len(self.alfabeto)} resíduos)"
+
+
+# Matrizes embutidas, pelo nome usado em carregar_matriz
+_EMBUTIDAS = {'BLOSUM62': BLOSUM62}
+
+
+@lru_cache(maxsize = None)
+def _compilar_embutida(nome):
+    """As matrizes embutidas são compiladas uma única vez"""
+    return MatrizSubstituicao.de_texto(_EMBUTIDAS[nome], nome)
+
+
+def carregar_matriz(matriz):
+    """
+    Devolve uma MatrizSubstituicao a partir de uma matriz já compilada, do nome de uma matriz
+    embutida ('BLOSUM62') ou do caminho de um ficheiro no formato NCBI
+
+
+    Parâmetro
+    -------------
+    matriz : MatrizSubstituicao ou str
+
+
+    Retorna
+    -------------
+    MatrizSubstituicao
+
+    """
+    if isinstance(matriz, MatrizSubstituicao):
+        return matriz
+
+    if matriz.upper() in _EMBUTIDAS:
+        return _compilar_embutida(matriz.upper())
+
+    return MatrizSubstituicao.de_ficheiro(matriz)
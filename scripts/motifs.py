@@ -0,0 +1,785 @@
+import numpy as np
+
+from scripts.codificacao import ALFABETO_2BITS, INVALIDO, codificar_2bits
+
+
+def _contagens(seqs, alfabeto):
+  '''
+  Conta, coluna a coluna, as ocorrências de cada letra do alfabeto nas sequências alinhadas
+
+  Tal como zip(*seqs), usa apenas as colunas comuns a todas as sequências (o comprimento da
+  mais curta). Só conta as letras exatamente iguais às do alfabeto.
+
+  Returns
+  -------
+  numpy.ndarray
+    matriz len(alfabeto) x L com as contagens
+  '''
+  comprimento = min((len(seq) for seq in seqs), default = 0)
+
+  if comprimento == 0:
+    return np.zeros((len(alfabeto), 0), dtype = np.int64)
+
+  # As vistas de scripts.ficheiros e a PackedSeq são lidas diretamente em bytes, sem passar por str
+  colunas = np.frombuffer(b''.join(seq[:comprimento].encode('ascii', errors = 'replace') if isinstance(seq, str)
+                                   else bytes(seq[:comprimento]) for seq in seqs),
+                          dtype = np.uint8).reshape(len(seqs), comprimento)
+
+  return np.stack([(colunas == ord(b)).sum(axis = 0) for b in alfabeto])
+
+
+def pwm(seqs: list[str], pseudo: float = 0) -> list[dict[str, float]]:
+
+  """
+  Calcula a matriz PWM (Matriz de Peso e Posição) para as sequências fornecidas
+
+  As contagens de todas as colunas são feitas de uma só vez com NumPy; o resultado é o
+  mesmo da versão do notebook.
+
+  Parâmetros
+  -------------
+  seqs : list[str]
+      Recebe uma lista de strings que representam as sequências
+
+  pseudo : float
+      Recebe um valor opcional, pseudo, que em caso de omissão é = 0
+
+
+  Retorna
+  -------------
+  pwm_matrix : list[dict[str, float]]
+      Retorna uma *lista de dicionários*, onde cada *dicionário* terá uma chave no formato de *string*, e um valor no formato de *float*
+
+  Levanta
+  -------------
+  AssertError
+      Caso a lista de sequências contenha sequências inválida
+
+
+  """
+
+  from scripts.auxiliares import validar_dna
+
+  for seq in seqs:
+    assert validar_dna(seq), ("Sequência inválida")
+
+
+  alfabeto = 'ACGT'
+
+  for seq in seqs:
+    for idx, b in enumerate(seq):
+      assert b in alfabeto, f'Caracter {b} na posição {idx} da sequência {seq} inválido!'
+
+  frequencias = (_contagens(seqs, alfabeto) + pseudo) / (len(seqs) + len(alfabeto) * pseudo)
+
+  pwm_matrix = [dict(zip(alfabeto, coluna)) for coluna in frequencias.T.tolist()]
+
+  return pwm_matrix
+
+
+def pssm(seqs, pseudo = 1):
+
+  """
+  Calcula a Matriz de Pontuação de Posição Específica (PSSM) para um conjunto de sequências de ADN
+
+  As contagens e os logaritmos de todas as colunas são calculados de uma só vez com NumPy; o
+  resultado é o mesmo da versão do notebook.
+
+  Parâmetros
+  -------------
+  seqs : list[str]
+    Lista de sequências de ADN
+
+  pseudo : float
+    Valor de pseudocount a ser adicionado para evitar problemas com probabilidades zero.
+
+
+  Retorna
+  -------------
+  lista : list[dict[str, float]]
+    Uma lista de dicionários que representa a PSSM
+
+
+  Levanta
+  -------------
+  AssertError
+      Caso a lista de sequências contenha sequências inválida
+
+  ValueError
+      Caso alguma base tenha probabilidade nula (pseudocount 0)
+
+  """
+  from scripts.auxiliares import validar_dna
+
+  for seq in seqs:
+    assert validar_dna(seq), ("Sequência inválida")
+
+  bases = 'ATCG'
+
+  frequencias = (_contagens(seqs, bases) + pseudo) / (len(seqs) + len(bases) * pseudo)
+
+  if (frequencias <= 0).any():
+    raise ValueError("Probabilidade nula: use um pseudocount positivo")
+
+  # Fórmula da PSSM: log2((contagem da base + pseudocount) / (total de sequências + total de bases * pseudocount)) / 0.25
+  valores = np.log2(frequencias) / 0.25
+
+  lista = [{b: round(valor, 2) for b, valor in zip(bases, coluna)} for coluna in valores.T.tolist()]
+
+  return lista
+
+
+# Probabilidade usada por prob_seq para bases que não estão na PWM
+PROB_MINIMA = 0.01
+
+# Tolerância (relativa e absoluta) abaixo da qual dois log scores de ModeloPWM são considerados iguais
+TOLERANCIA_EMPATE = 1e-9
+
+
+def prob_seq(sequence, resultado):
+    """
+    Calcula a probabilidade de uma sequência utilizando como base a função PWM
+
+    Para muitas sequências (ou sequências longas, em que o produto pode dar underflow) é
+    preferível ModeloPWM, que trabalha em espaço logarítmico e guarda os scores em cache.
+
+
+    Parâmetros
+    -------------
+    sequence : str
+        sequência de DNA
+
+    resultado : list[dict[str, float]]
+        Variável que contém o resultado da função PWM, onde cada dicionário representa as probabilidades para cada base numa posição
+
+
+    Retorna
+    -------------
+    probabilidade : float
+        A probabilidade da sequência com base na PWM
+
+
+    Levanta
+    -------------
+    AssertError
+      Caso a lista de sequências contenha sequências inválida
+
+    """
+
+    from scripts.auxiliares import validar_dna
+
+    assert validar_dna(sequence), ("Sequência inválida")
+
+    probabilidade = 1.0
+
+    for position, base in enumerate(sequence):
+        probabilidade *= resultado[position].get(base, PROB_MINIMA)
+
+    return probabilidade
+
+
+class ModeloPWM:
+  '''
+  Modelo de scores em espaço logarítmico construído uma única vez a partir do resultado de pwm
+
+  O log da probabilidade de cada caracter em cada posição fica numa tabela L x 256 (indexada
+  pelo código ASCII), com log(PROB_MINIMA) para os caracteres que não estão na PWM, como em
+  prob_seq. Os scores de cada k-mer são guardados numa cache LRU limitada, pelo que janelas
+  repetidas (frequentes em promotores) não voltam a ser calculadas, e as melhores janelas de
+  uma sequência são escolhidas numa lista ordenada de tamanho k, sem guardar todas as janelas.
+  '''
+  __slots__ = ('tabela', '_log_prob')
+
+  def __init__(self, resultado, cache = 1 << 16):
+    '''
+    Parâmetros
+    ----------
+    resultado : list[dict[str, float]]
+      resultado da função pwm
+
+    cache : int
+      número máximo de k-mers guardados na cache LRU
+    '''
+    import math
+    from functools import lru_cache
+
+    self.tabela = np.full((len(resultado), 256), math.log(PROB_MINIMA))
+
+    for posicao, coluna in enumerate(resultado):
+      for base, probabilidade in coluna.items():
+        self.tabela[posicao, ord(base)] = math.log(probabilidade) if probabilidade > 0 else -math.inf
+
+    self._log_prob = lru_cache(maxsize = cache)(self._calcular)
+
+  def __len__(self):
+    return len(self.tabela)
+
+  def _calcular(self, kmer):
+    codigos = np.frombuffer(kmer.encode('latin-1', errors = 'replace'), dtype = np.uint8)
+    return float(self.tabela[np.arange(len(codigos)), codigos].sum())
+
+  def log_prob(self, kmer):
+    '''
+    Log (natural) da probabilidade de um k-mer, igual a log(prob_seq(kmer, resultado))
+
+    Raises
+    ------
+    ValueError
+      se o k-mer for maior que a PWM
+    '''
+    if len(kmer) > len(self):
+      raise ValueError("O k-mer é maior que a PWM")
+
+    return self._log_prob(kmer)
+
+  def cache_info(self):
+    '''Estatísticas da cache LRU (hits, misses, maxsize, currsize)'''
+    return self._log_prob.cache_info()
+
+  def janelas(self, seq, tamanho = None):
+    '''
+    Gera (log da probabilidade, posição, janela) de todas as janelas de uma sequência
+
+    tamanho é o tamanho das janelas (por omissão o da PWM)
+    '''
+    from scripts.auxiliares import _texto_seq
+
+    tamanho = len(self) if tamanho is None else tamanho
+
+    if not 0 < tamanho <= len(self):
+      raise ValueError("O tamanho das janelas deve estar entre 1 e o tamanho da PWM")
+
+    # As vistas de scripts.ficheiros e a PackedSeq são lidas uma vez para str
+    seq = _texto_seq(seq)
+
+    for posicao in range(len(seq) - tamanho + 1):
+      janela = seq[posicao:posicao + tamanho]
+      yield self._log_prob(janela), posicao, janela
+
+  def melhores(self, seq, k = 1, tamanho = None):
+    '''
+    Devolve as k janelas mais prováveis de uma sequência
+
+    Parâmetros
+    ----------
+    seq : str
+      sequência de DNA
+
+    k : int
+      número de janelas pretendidas
+
+    tamanho : int, opcional
+      tamanho das janelas (por omissão o da PWM)
+
+    Returns
+    -------
+    list
+      tuplos (janela, posição, log da probabilidade), da mais provável para a menos provável;
+      nos empates (a menos de TOLERANCIA_EMPATE) fica primeiro a janela que aparece primeiro na
+      sequência
+    '''
+    from bisect import bisect_right
+
+    # Janelas com o mesmo produto de probabilidades podem ter somas de logs que diferem no último
+    # bit. As janelas chegam por ordem de posição, pelo que uma janela nova só passa à frente das
+    # que têm score menor fora da tolerância; nos empates fica atrás (é a que aparece depois)
+    chaves, melhores = [], []
+
+    for score, posicao, janela in self.janelas(seq, tamanho):
+      lugar = bisect_right(chaves, -score + max(TOLERANCIA_EMPATE, TOLERANCIA_EMPATE * abs(score)))
+
+      if lugar < k:
+        chaves.insert(lugar, -score)
+        melhores.insert(lugar, (janela, posicao, score))
+
+        if len(melhores) > k:
+          chaves.pop()
+          melhores.pop()
+
+    return melhores
+
+
+def seq_provavel(seq, resultado, tamanho = 4):
+
+  '''
+  Calcula qual a Sequência mais provável
+
+  As janelas são pontuadas em espaço logarítmico com ModeloPWM (com cache para janelas
+  repetidas) e a melhor é escolhida sem guardar os scores de todas as janelas.
+
+
+  Parâmetros
+  -------------
+  seq : str
+    A sequência de DNA
+
+  resultado : list[dict[str, float]]
+    Variável que contém o resultado da função PWM, onde cada dicionário representa as probabilidades para cada base em uma posição
+
+  tamanho : int
+    Tamanho das janelas (4, como na versão original, por omissão)
+
+
+  Retorna
+  -------------
+  str
+    A Sequência mais provável dentro da Sequência dada (a primeira, em caso de empate)
+
+
+  Levanta
+  -------------
+  AssertError
+      Caso a lista de sequências contenha sequências inválida
+
+  ValueError
+      Caso a sequência seja mais curta que as janelas
+
+  '''
+  from scripts.auxiliares import validar_dna
+
+  assert validar_dna(seq), ("Sequência inválida")
+
+  melhores = ModeloPWM(resultado).melhores(seq, 1, tamanho)
+
+  if not melhores:
+    raise ValueError("A sequência é mais curta que as janelas")
+
+  return melhores[0][0]
+
+
+class MatrizPWM:
+  '''
+  Motif probabilístico guardado como matrizes NumPy 4 x L (linhas pela ordem A, C, G, T)
+
+  probabilidades tem a frequência de cada base em cada posição e log_odds o respetivo
+  log2(probabilidade / fundo). O score de uma janela é a soma dos log-odds das suas bases,
+  pelo que a procura num genoma calcula os scores de todas as janelas de uma vez (uma soma
+  vetorial por coluna do motif), nas duas cadeias e para qualquer comprimento de motif.
+  '''
+  __slots__ = ('probabilidades', 'fundo', 'log_odds')
+
+  def __init__(self, probabilidades, fundo = None):
+    '''
+    Parâmetros
+    ----------
+    probabilidades : numpy.ndarray
+      matriz 4 x L com as probabilidades de cada base (A, C, G, T) em cada posição
+
+    fundo : sequence, opcional
+      probabilidades de fundo de A, C, G e T (uniforme por omissão)
+
+    Raises
+    ------
+    ValueError
+      se as matrizes não tiverem as dimensões certas ou o fundo tiver probabilidades nulas
+    '''
+    probabilidades = np.asarray(probabilidades, dtype = np.float64)
+    fundo = np.full(4, 0.25) if fundo is None else np.asarray(fundo, dtype = np.float64)
+
+    if probabilidades.ndim != 2 or probabilidades.shape[0] != 4 or fundo.shape != (4,):
+      raise ValueError("A matriz deve ter 4 linhas (A, C, G, T) e o fundo 4 probabilidades")
+
+    if (fundo <= 0).any():
+      raise ValueError("As probabilidades de fundo devem ser positivas")
+
+    self.probabilidades = probabilidades
+    self.fundo = fundo
+
+    with np.errstate(divide = 'ignore'):
+      self.log_odds = np.log2(probabilidades / fundo[:, None])
+
+  @classmethod
+  def de_sequencias(cls, seqs, pseudo = 1, fundo = None):
+    '''
+    Constrói o motif a partir de sequências alinhadas (todas do mesmo tamanho)
+
+    Parâmetros
+    ----------
+    seqs : list
+      sequências de ADN alinhadas
+
+    pseudo : float
+      pseudocount somado a cada contagem; com 0 as bases ausentes têm log-odds -inf
+
+    fundo : sequence, opcional
+      probabilidades de fundo de A, C, G e T
+
+    Raises
+    ------
+    AssertionError
+      se alguma sequência não for ADN válido
+
+    ValueError
+      se não houver sequências ou não tiverem todas o mesmo tamanho
+    '''
+    from scripts.auxiliares import validar_dna, aprimorar_seq
+
+    for seq in seqs:
+      assert validar_dna(seq), ("Sequência inválida")
+
+    seqs = [aprimorar_seq(seq) for seq in seqs]
+
+    if not seqs or len({len(seq) for seq in seqs}) != 1:
+      raise ValueError("As sequências devem ser não vazias e ter todas o mesmo tamanho")
+
+    contagens = _contagens(seqs, ALFABETO_2BITS)
+
+    return cls((contagens + pseudo) / (len(seqs) + 4 * pseudo), fundo)
+
+  @classmethod
+  def de_pwm(cls, matriz, fundo = None):
+    '''
+    Constrói o motif a partir do resultado de pwm (lista de dicionários base -> probabilidade)
+    '''
+    return cls([[coluna[b] for coluna in matriz] for b in ALFABETO_2BITS], fundo)
+
+  def __len__(self):
+    return self.log_odds.shape[1]
+
+  def consenso(self):
+    '''Sequência com a base mais provável em cada posição'''
+    return ''.join(ALFABETO_2BITS[b] for b in self.probabilidades.argmax(axis = 0))
+
+  def score_maximo(self):
+    '''Maior score possível de uma janela'''
+    return float(self.log_odds.max(axis = 0).sum())
+
+  def complemento_inverso(self):
+    '''Motif da cadeia complementar: as linhas trocam A <-> T e C <-> G e as colunas invertem'''
+    return MatrizPWM(self.probabilidades[::-1, ::-1].copy(), self.fundo[::-1].copy())
+
+  def _colunas(self):
+    '''Log-odds por coluna, com uma 5.ª entrada -inf para as bases inválidas (INVALIDO = 4)'''
+    colunas = np.full((len(self), INVALIDO + 1), -np.inf)
+    colunas[:, :4] = self.log_odds.T
+    return colunas
+
+  def score(self, seq):
+    '''
+    Score (soma dos log-odds) de uma sequência com o tamanho do motif
+
+    Raises
+    ------
+    ValueError
+      se a sequência não tiver o tamanho do motif
+    '''
+    if len(seq) != len(self):
+      raise ValueError("A sequência deve ter o tamanho do motif")
+
+    return float(self._colunas()[np.arange(len(self)), codificar_2bits(seq)].sum())
+
+  def scores(self, seq, cadeia = '+', bloco = 1 << 20):
+    '''
+    Scores de todas as janelas da sequência, indexados pela posição da janela na cadeia direta
+
+    Parâmetros
+    ----------
+    seq : str, bytes, VistaSequencia ou PackedSeq
+      sequência de ADN (as janelas com bases que não sejam A, C, G ou T têm score -inf)
+
+    cadeia : str
+      '+' para a cadeia direta ou '-' para o complemento inverso
+
+    bloco : int
+      número de janelas calculadas de cada vez
+
+    Returns
+    -------
+    numpy.ndarray
+      array float64 com len(seq) - len(self) + 1 scores
+    '''
+    if cadeia not in ('+', '-'):
+      raise ValueError("A cadeia deve ser '+' ou '-'")
+
+    matriz = self if cadeia == '+' else self.complemento_inverso()
+    colunas = matriz._colunas()
+    comprimento = len(self)
+    total = max(len(seq) - comprimento + 1, 0)
+    resultado = np.empty(total, dtype = np.float64)
+
+    for inicio in range(0, total, bloco):
+      fim = min(inicio + bloco, total)
+      codigos = codificar_2bits(seq[inicio:fim + comprimento - 1])
+
+      # Soma deslizante: uma soma vetorial por coluna do motif
+      scores = colunas[0][codigos[:fim - inicio]]
+      for j in range(1, comprimento):
+        scores += colunas[j][codigos[j:j + fim - inicio]]
+
+      resultado[inicio:fim] = scores
+
+    return resultado
+
+  def procurar(self, seq, limiar, ambas_cadeias = True, bloco = 1 << 20):
+    '''
+    Procura as ocorrências do motif numa sequência (por exemplo um genoma)
+
+    Parâmetros
+    ----------
+    seq : str, bytes, VistaSequencia ou PackedSeq
+      sequência de ADN
+
+    limiar : float
+      score mínimo de uma ocorrência
+
+    ambas_cadeias : bool
+      se True procura também no complemento inverso
+
+    Returns
+    -------
+    list
+      tuplos (posição, cadeia, score) ordenados pela posição, em que a posição é sempre o
+      início da janela na cadeia direta e a cadeia é '+' ou '-'
+    '''
+    hits = []
+
+    for cadeia in ('+', '-') if ambas_cadeias else ('+',):
+      scores = self.scores(seq, cadeia, bloco)
+      posicoes = np.flatnonzero(scores >= limiar)
+      hits.extend(zip(posicoes.tolist(), [cadeia] * len(posicoes), scores[posicoes].tolist()))
+
+    hits.sort()
+    return hits
+
+
+class _Janelas:
+  '''
+  Todas as janelas de tamanho w de um conjunto de sequências, guardadas uma única vez:
+  codigos tem as sequências concatenadas (2 bits por base), inicios a posição global de cada
+  janela e limites[i]:limites[i + 1] as janelas da sequência i
+  '''
+  __slots__ = ('w', 'codigos', 'inicios', 'limites')
+
+  def __init__(self, seqs, w):
+    partes = [codificar_2bits(seq) for seq in seqs]
+    offsets = np.concatenate(([0], np.cumsum([len(parte) for parte in partes])))
+
+    self.w = w
+    self.codigos = np.concatenate(partes)
+    self.inicios = np.concatenate([np.arange(offsets[i], offsets[i + 1] - w + 1) for i in range(len(partes))])
+    self.limites = np.concatenate(([0], np.cumsum([len(parte) - w + 1 for parte in partes])))
+
+  def bases(self, janelas):
+    '''Matriz len(janelas) x w com os códigos das bases das janelas indicadas (índices globais)'''
+    return self.codigos[self.inicios[janelas][:, None] + np.arange(self.w)]
+
+  def scores(self, log_odds, de = 0, ate = None):
+    '''Soma dos log-odds (4 x w) de cada janela global entre de e ate'''
+    inicios = self.inicios[de:ate]
+    scores = log_odds[self.codigos[inicios], 0]
+    for j in range(1, self.w):
+      scores = scores + log_odds[self.codigos[inicios + j], j]
+    return scores
+
+
+def _log_odds(contagens, total, pseudo):
+  '''log2(probabilidade / 0.25) de cada base em cada coluna, a partir das contagens'''
+  return np.log2((contagens + pseudo) / (total + 4 * pseudo)) + 2
+
+
+def _score_motif(janelas, escolhidas, pseudo):
+  '''
+  Score de um conjunto de sítios: soma dos log-odds (em relação a um fundo uniforme) de todas
+  as bases dos sítios, com a PWM estimada a partir desses mesmos sítios
+  '''
+  bases = janelas.bases(escolhidas)
+  contagens = np.zeros((4, janelas.w))
+  np.add.at(contagens, (bases, np.arange(janelas.w)), 1)
+
+  return float((contagens * _log_odds(contagens, len(escolhidas), pseudo)).sum())
+
+
+def _preparar(seqs, w):
+  from scripts.auxiliares import validar_dna, aprimorar_seq
+
+  for seq in seqs:
+    assert validar_dna(seq), ("Sequência inválida")
+
+  seqs = [aprimorar_seq(seq) for seq in seqs]
+
+  if not isinstance(w, int) or w <= 0:
+    raise ValueError("O tamanho do motif deve ser um inteiro positivo")
+
+  if len(seqs) < 2 or min(len(seq) for seq in seqs) < w:
+    raise ValueError("São precisas pelo menos 2 sequências, todas com tamanho >= w")
+
+  return _Janelas(seqs, w)
+
+
+def _gibbs(janelas, iteracoes, pseudo, rng):
+  n = len(janelas.limites) - 1
+  colunas = np.arange(janelas.w)
+
+  # Estado inicial aleatório: uma janela global por sequência
+  escolhidas = janelas.limites[:-1] + rng.integers(0, np.diff(janelas.limites))
+  contagens = np.zeros((4, janelas.w))
+  np.add.at(contagens, (janelas.bases(escolhidas), colunas), 1)
+
+  melhor, melhor_score = escolhidas.copy(), _score_motif(janelas, escolhidas, pseudo)
+
+  for _ in range(iteracoes):
+    i = rng.integers(n)
+
+    # Retira o sítio da sequência i das contagens (cada coluna muda numa só base)
+    contagens[janelas.bases(escolhidas[i:i + 1])[0], colunas] -= 1
+
+    scores = janelas.scores(_log_odds(contagens, n - 1, pseudo), janelas.limites[i], janelas.limites[i + 1])
+    pesos = np.exp2(scores - scores.max())
+
+    escolhidas[i] = janelas.limites[i] + rng.choice(len(pesos), p = pesos / pesos.sum())
+    contagens[janelas.bases(escolhidas[i:i + 1])[0], colunas] += 1
+
+    score = float((contagens * _log_odds(contagens, n, pseudo)).sum())
+    if score > melhor_score:
+      melhor, melhor_score = escolhidas.copy(), score
+
+  return melhor, melhor_score
+
+
+def _em(janelas, iteracoes, pseudo, rng, tolerancia = 1e-6):
+  n = len(janelas.limites) - 1
+  seq_janela = np.repeat(np.arange(n), np.diff(janelas.limites))
+
+  # Começa com a PWM de sítios aleatórios, como no Gibbs
+  escolhidas = janelas.limites[:-1] + rng.integers(0, np.diff(janelas.limites))
+  contagens = np.zeros((4, janelas.w))
+  np.add.at(contagens, (janelas.bases(escolhidas), np.arange(janelas.w)), 1)
+  log_odds = _log_odds(contagens, n, pseudo)
+
+  for _ in range(iteracoes):
+    # Passo E: probabilidade de cada janela ser o sítio da sua sequência (um sítio por sequência)
+    scores = janelas.scores(log_odds)
+    maximos = np.maximum.reduceat(scores, janelas.limites[:-1])
+    pesos = np.exp2(scores - maximos[seq_janela])
+    pesos /= np.add.reduceat(pesos, janelas.limites[:-1])[seq_janela]
+
+    # Passo M: contagens esperadas de cada base em cada coluna
+    for j in range(janelas.w):
+      contagens[:, j] = np.bincount(janelas.codigos[janelas.inicios + j], weights = pesos, minlength = 4)
+
+    novos = _log_odds(contagens, n, pseudo)
+    convergiu = np.abs(novos - log_odds).max() < tolerancia
+    log_odds = novos
+
+    if convergiu:
+      break
+
+  scores = janelas.scores(log_odds)
+  escolhidas = np.array([janelas.limites[i] + int(scores[janelas.limites[i]:janelas.limites[i + 1]].argmax())
+                         for i in range(n)])
+
+  return escolhidas, _score_motif(janelas, escolhidas, pseudo)
+
+
+_MODOS = {'gibbs': _gibbs, 'em': _em}
+
+
+def _reinicio(seqs, w, modo, iteracoes, pseudo, semente):
+  '''Um reinício da procura, com o seu próprio gerador (usado também pelos processos do pool)'''
+  janelas = _preparar(seqs, w)
+  escolhidas, score = _MODOS[modo](janelas, iteracoes, pseudo, np.random.default_rng(semente))
+
+  return (escolhidas - janelas.limites[:-1]).tolist(), score
+
+
+def procurar_motif(seqs, w, modo = 'gibbs', iteracoes = None, pseudo = 1, reinicios = 1, semente = None,
+                   n_processos = 1):
+
+  """
+  Descobre de novo um motif de tamanho w, com um sítio em cada sequência (por exemplo regiões
+  a montante de genes co-regulados)
+
+  O modo 'gibbs' é um Gibbs sampler: em cada iteração retira o sítio de uma sequência, que
+  só altera uma base em cada coluna das contagens (as contagens são atualizadas e não
+  reconstruídas), e escolhe o novo sítio com probabilidade proporcional ao seu score. O modo
+  'em' é o EM do MEME (modelo de um sítio por sequência), com os passos E e M vetorizados
+  sobre todas as janelas.
+
+  Os reinícios usam sementes independentes derivadas de semente (numpy SeedSequence), pelo
+  que o resultado é o mesmo qualquer que seja o número de processos.
+
+
+  Parâmetros
+  -------------
+  seqs : list[str]
+    Sequências de ADN
+
+  w : int
+    Tamanho do motif
+
+  modo : str
+    'gibbs' ou 'em'
+
+  iteracoes : int, opcional
+    Número de iterações de cada reinício (por omissão 1000 no Gibbs e 100 no EM)
+
+  pseudo : float
+    Pseudocount usado nas PWMs intermédias
+
+  reinicios : int
+    Número de reinícios a partir de sítios aleatórios
+
+  semente : int, opcional
+    Semente para resultados reprodutíveis
+
+  n_processos : int, opcional
+    Número de processos pelos quais os reinícios são distribuídos; None usa os CPUs disponíveis
+
+
+  Retorna
+  -------------
+  tuple
+    (posição do sítio em cada sequência, score) do melhor reinício; o score é a soma dos
+    log2-odds das bases dos sítios em relação a um fundo uniforme. pwm(sitios_motif(seqs,
+    posicoes, w)) dá a PWM do motif
+
+
+  Levanta
+  -------------
+  AssertError
+    Caso alguma sequência seja inválida
+
+  ValueError
+    Caso os parâmetros sejam inválidos ou haja menos de 2 sequências com tamanho >= w
+
+  """
+  import os
+  from concurrent.futures import ProcessPoolExecutor
+
+  if modo not in _MODOS:
+    raise ValueError("O modo deve ser 'gibbs' ou 'em'")
+
+  if not isinstance(reinicios, int) or reinicios < 1:
+    raise ValueError("O número de reinícios deve ser um inteiro positivo")
+
+  if n_processos is not None and (not isinstance(n_processos, int) or n_processos < 1):
+    raise ValueError("O número de processos deve ser um inteiro positivo")
+
+  iteracoes = (1000 if modo == 'gibbs' else 100) if iteracoes is None else iteracoes
+
+  # Valida as sequências antes de lançar os processos
+  _preparar(seqs, w)
+  seqs = [str(seq) for seq in seqs]
+
+  sementes = np.random.SeedSequence(semente).spawn(reinicios)
+  argumentos = [(seqs, w, modo, iteracoes, pseudo, filha) for filha in sementes]
+
+  n_processos = min(n_processos or os.cpu_count() or 1, reinicios)
+
+  if n_processos == 1:
+    resultados = [_reinicio(*args) for args in argumentos]
+  else:
+    with ProcessPoolExecutor(max_workers = n_processos) as pool:
+      resultados = list(pool.map(_reinicio, *zip(*argumentos)))
+
+  # Em caso de empate fica o primeiro reinício
+  return max(resultados, key = lambda resultado: resultado[1])
+
+
+def sitios_motif(seqs, posicoes, w):
+  '''
+  Devolve os sítios (subsequências de tamanho w) indicados por procurar_motif, prontos para pwm/pssm
+  '''
+  from scripts.auxiliares import aprimorar_seq
+
+  return [aprimorar_seq(seq)[posicao:posicao + w] for seq, posicao in zip(seqs, posicoes)]
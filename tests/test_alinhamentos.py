@@ -0,0 +1,319 @@
+import random
+import re
+import unittest
+from unittest import mock
+
+from scripts import alinhamentos as al
+from scripts.matrizes import MatrizSubstituicao, carregar_matriz
+
+
+NEG = -10 ** 9
+
+PARAMETROS = [(2, -1, -4), (1, -1, -1), (1, -1, -2), (3, -2, -1), (1, 0, -1)]
+
+
+def seq_aleatoria(rng, minimo, maximo, alfabeto = 'ACGT'):
+    return ''.join(rng.choice(alfabeto) for _ in range(rng.randint(minimo, maximo)))
+
+
+def nw_referencia(string_1, string_2, equal = 2, subst = -1, score_space = -4):
+    '''Needleman-Wunsch do notebook do tema 3: listas de listas e prioridade diagonal, esquerda, cima'''
+    ncols, nlins = len(string_1) + 1, len(string_2) + 1
+    score = [[0] * ncols for _ in range(nlins)]
+    traceback = [[0] * ncols for _ in range(nlins)]
+    for j in range(1, ncols):
+        score[0][j], traceback[0][j] = j * score_space, 'E'
+    for i in range(1, nlins):
+        score[i][0], traceback[i][0] = i * score_space, 'C'
+    for i in range(1, nlins):
+        for j in range(1, ncols):
+            par = equal if string_1[j - 1] == string_2[i - 1] else subst
+            escolhas = [score[i - 1][j - 1] + par, score[i][j - 1] + score_space, score[i - 1][j] + score_space]
+            score[i][j] = max(escolhas)
+            traceback[i][j] = 'DEC'[escolhas.index(score[i][j])]
+
+    alinhada_1, alinhada_2 = [], []
+    i, j = nlins - 1, ncols - 1
+    while traceback[i][j] != 0:
+        direcao = traceback[i][j]
+        alinhada_1.append(string_1[j - 1] if direcao in 'DE' else '-')
+        alinhada_2.append(string_2[i - 1] if direcao in 'DC' else '-')
+        i -= direcao in 'DC'
+        j -= direcao in 'DE'
+    return score[-1][-1], (''.join(reversed(alinhada_1)), ''.join(reversed(alinhada_2)))
+
+
+def sw_score_referencia(string_1, string_2, equal = 1, subst = -1, score_space = -4):
+    '''Score máximo de Smith-Waterman por programação dinâmica simples'''
+    anterior = [0] * (len(string_1) + 1)
+    melhor = 0
+    for b in string_2:
+        atual = [0]
+        for j, a in enumerate(string_1, 1):
+            atual.append(max(0, anterior[j - 1] + (equal if a == b else subst),
+                             atual[j - 1] + score_space, anterior[j] + score_space))
+        melhor = max(melhor, max(atual))
+        anterior = atual
+    return melhor
+
+
+def score_linear(alinhada_1, alinhada_2, equal, subst, score_space):
+    return sum(score_space if '-' in (a, b) else (equal if a == b else subst)
+               for a, b in zip(alinhada_1, alinhada_2))
+
+
+def banda_referencia(string_1, string_2, k, equal, subst, score_space):
+    '''NW restrito à banda |i - j| <= k, com o comprimento do alinhamento escolhido'''
+    n, m = len(string_2), len(string_1)
+    H = [[NEG] * (m + 1) for _ in range(n + 1)]
+    L = [[0] * (m + 1) for _ in range(n + 1)]
+    for j in range(min(k, m) + 1):
+        H[0][j], L[0][j] = j * score_space, j
+    for i in range(1, n + 1):
+        if i <= k:
+            H[i][0], L[i][0] = i * score_space, i
+        for j in range(max(1, i - k), min(m, i + k) + 1):
+            d = H[i - 1][j - 1] + (equal if string_1[j - 1] == string_2[i - 1] else subst)
+            e = H[i][j - 1] + score_space
+            c = H[i - 1][j] + score_space
+            H[i][j] = max(d, e, c)
+            if H[i][j] == d:
+                L[i][j] = L[i - 1][j - 1] + 1
+            elif H[i][j] == e:
+                L[i][j] = L[i][j - 1] + 1
+            else:
+                L[i][j] = L[i - 1][j] + 1
+    return H[n][m], L[n][m]
+
+
+def gotoh_referencia(string_1, string_2, matriz, abertura, extensao, local):
+    '''Score ótimo com gaps afins (Gotoh) em Python puro'''
+    n, m = len(string_2), len(string_1)
+    H = [[0] * (m + 1) for _ in range(n + 1)]
+    E = [[NEG] * (m + 1) for _ in range(n + 1)]
+    F = [[NEG] * (m + 1) for _ in range(n + 1)]
+    if not local:
+        for j in range(1, m + 1):
+            H[0][j] = E[0][j] = abertura + (j - 1) * extensao
+        for i in range(1, n + 1):
+            H[i][0] = F[i][0] = abertura + (i - 1) * extensao
+    melhor = 0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            E[i][j] = max(H[i][j - 1] + abertura, E[i][j - 1] + extensao)
+            F[i][j] = max(H[i - 1][j] + abertura, F[i - 1][j] + extensao)
+            H[i][j] = max(H[i - 1][j - 1] + matriz.score(string_1[j - 1], string_2[i - 1]), E[i][j], F[i][j])
+            if local:
+                H[i][j] = max(H[i][j], 0)
+                melhor = max(melhor, H[i][j])
+    return melhor if local else H[n][m]
+
+
+def score_afim(alinhada_1, alinhada_2, matriz, abertura, extensao):
+    score, gap_1, gap_2 = 0, False, False
+    for a, b in zip(alinhada_1, alinhada_2):
+        if a == '-':
+            score += extensao if gap_1 else abertura
+            gap_1, gap_2 = True, False
+        elif b == '-':
+            score += extensao if gap_2 else abertura
+            gap_1, gap_2 = False, True
+        else:
+            score += matriz.score(a, b)
+            gap_1 = gap_2 = False
+    return score
+
+
+class TestNWSWVetorizado(unittest.TestCase):
+
+    def test_casos_notebook(self):
+        self.assertEqual(al.needleman_wunsch_vetorizado('ATGCGTCGA', 'aagta'), (-9, ('ATGCGTCGA', 'A--AGT--A')))
+        self.assertEqual(al.needleman_wunsch_vetorizado('GGCATGCG', 'A'), (-26, ('GGCATGCG', '---A----')))
+        self.assertEqual(al.needleman_wunsch_vetorizado('aacgt', 'AACGT'), (10, ('AACGT', 'AACGT')))
+        self.assertEqual(al.smith_waterman_vetorizado('GTC', 'AAA'), (0, ('', '')))
+        self.assertEqual(al.smith_waterman_vetorizado('GGCATGCG', 'AAA'), (1, ('A', 'A')))
+        self.assertEqual(al.smith_waterman_vetorizado('aacgt', 'AACGT'), (5, ('AACGT', 'AACGT')))
+
+    def test_entradas_invalidas(self):
+        for invalido in [('', ' '), ('HGJK', 'ATC'), ('A--GCTG--ACG', 'AGTG$%$CACG')]:
+            with self.assertRaises(AssertionError):
+                al.needleman_wunsch_vetorizado(*invalido)
+            with self.assertRaises(AssertionError):
+                al.smith_waterman_vetorizado(*invalido)
+
+    def test_nw_igual_ao_notebook(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            a, b = seq_aleatoria(rng, 1, 15), seq_aleatoria(rng, 1, 15)
+            parametros = rng.choice(PARAMETROS)
+            self.assertEqual(al.needleman_wunsch_vetorizado(a, b, *parametros), nw_referencia(a, b, *parametros))
+
+    def test_sw_score_e_alinhamento(self):
+        rng = random.Random(2)
+        for _ in range(200):
+            a, b = seq_aleatoria(rng, 1, 15), seq_aleatoria(rng, 1, 15)
+            parametros = rng.choice(PARAMETROS)
+            score, (x, y) = al.smith_waterman_vetorizado(a, b, *parametros)
+            self.assertEqual(score, sw_score_referencia(a, b, *parametros))
+            self.assertEqual(score_linear(x, y, *parametros), score)
+            self.assertIn(x.replace('-', ''), a)
+            self.assertIn(y.replace('-', ''), b)
+
+
+class TestHirschberg(unittest.TestCase):
+
+    def test_igual_ao_vetorizado(self):
+        rng = random.Random(3)
+        for limite in (0, 4):
+            with mock.patch.object(al, 'LIMITE_HIRSCHBERG', limite):
+                for _ in range(150):
+                    alfabeto = 'ACGT'[:rng.randint(2, 4)]
+                    a, b = seq_aleatoria(rng, 1, 30, alfabeto), seq_aleatoria(rng, 1, 30, alfabeto)
+                    parametros = rng.choice(PARAMETROS)
+                    self.assertEqual(al.hirschberg(a, b, *parametros), al.needleman_wunsch_vetorizado(a, b, *parametros))
+
+    def test_sequencias_longas(self):
+        rng = random.Random(4)
+        a = seq_aleatoria(rng, 1500, 1500)
+        b = list(a)
+        for _ in range(150):
+            b[rng.randrange(len(b))] = rng.choice('ACGT')
+        b = ''.join(b[:500] + b[600:]) + 'ACGT' * 10
+        with mock.patch.object(al, 'LIMITE_HIRSCHBERG', 1 << 12):
+            self.assertEqual(al.hirschberg(a, b), al.needleman_wunsch_vetorizado(a, b))
+
+
+class TestNWScoreBanda(unittest.TestCase):
+
+    def test_score_e_comprimento(self):
+        rng = random.Random(5)
+        for _ in range(300):
+            a, b = seq_aleatoria(rng, 1, 25), seq_aleatoria(rng, 1, 25)
+            parametros = rng.choice(PARAMETROS)
+            score, (x, _) = al.needleman_wunsch_vetorizado(a, b, *parametros)
+            self.assertEqual(al.nw_score(a, b, *parametros), score)
+            self.assertEqual(al.nw_score(a, b, *parametros, comprimento = True), (score, len(x)))
+            self.assertEqual(al.nw_banda(a, b, 60, *parametros, comprimento = True), (score, len(x)))
+
+    def test_banda_estreita(self):
+        rng = random.Random(6)
+        for _ in range(300):
+            a, b = seq_aleatoria(rng, 1, 25), seq_aleatoria(rng, 1, 25)
+            parametros = rng.choice(PARAMETROS)
+            k = rng.randint(abs(len(a) - len(b)), abs(len(a) - len(b)) + 5)
+            self.assertEqual(al.nw_banda(a, b, k, *parametros, comprimento = True),
+                             banda_referencia(a, b, k, *parametros))
+
+    def test_qualquer_alfabeto(self):
+        self.assertEqual(al.nw_score('MKTAYIAKQR', 'MKTAYAKQR'), al.nw_banda('MKTAYIAKQR', 'MKTAYAKQR', 3))
+        self.assertEqual(al.nw_score('MKTAYIAKQR', 'MKTAYAKQR'), nw_referencia('MKTAYIAKQR', 'MKTAYAKQR')[0])
+
+    def test_banda_menor_que_diferenca(self):
+        with self.assertRaises(ValueError):
+            al.nw_banda('AAAA', 'A', 2)
+
+
+class TestAlinhamentoEstruturado(unittest.TestCase):
+
+    def test_coordenadas_e_cigar(self):
+        rng = random.Random(7)
+        for _ in range(150):
+            a, b = seq_aleatoria(rng, 1, 12), seq_aleatoria(rng, 1, 12)
+            for funcao in (al.needleman_wunsch_vetorizado, al.smith_waterman_vetorizado):
+                score, (x, y) = funcao(a, b)
+                alinhamento = funcao(a, b, estruturado = True)
+                self.assertEqual((alinhamento.score, tuple(alinhamento)), (score, (x, y)))
+                self.assertEqual(x.replace('-', ''), a[alinhamento.inicio_1:alinhamento.fim_1])
+                self.assertEqual(y.replace('-', ''), b[alinhamento.inicio_2:alinhamento.fim_2])
+                total = sum(int(op[:-1]) for op in re.findall(r'\d+[MID]', alinhamento.cigar()))
+                self.assertEqual(total, alinhamento.comprimento)
+
+    def test_exemplo(self):
+        alinhamento = al.needleman_wunsch_vetorizado('ATGCGTCGA', 'aagta', estruturado = True)
+        self.assertEqual(alinhamento.cigar(), '1M2D3M2D1M')
+        self.assertEqual(alinhamento.matches, 4)
+        self.assertAlmostEqual(alinhamento.identidade, 4 / 9)
+
+
+class TestGapsAfins(unittest.TestCase):
+
+    def test_igual_a_gotoh(self):
+        rng = random.Random(8)
+        blosum = carregar_matriz('BLOSUM62')
+        dna = MatrizSubstituicao.identidade('ACGT', 2, -1)
+        for _ in range(150):
+            proteina = rng.random() < 0.5
+            matriz = blosum if proteina else dna
+            alfabeto = 'ARNDCQEGHILKMFPSTWYV' if proteina else 'ACGT'
+            a, b = seq_aleatoria(rng, 0, 20, alfabeto), seq_aleatoria(rng, 0, 20, alfabeto)
+            extensao = -rng.randint(0, 3)
+            abertura = extensao - rng.randint(0, 10)
+            for local, funcao in ((False, al.needleman_wunsch_afim), (True, al.smith_waterman_afim)):
+                score, (x, y) = funcao(a, b, matriz, abertura, extensao)
+                self.assertEqual(score, gotoh_referencia(a, b, matriz, abertura, extensao, local))
+                self.assertEqual(score_afim(x, y, matriz, abertura, extensao), score)
+                if not local:
+                    self.assertEqual((x.replace('-', ''), y.replace('-', '')), (a, b))
+
+    def test_gap_linear_igual_ao_vetorizado(self):
+        rng = random.Random(9)
+        dna = MatrizSubstituicao.identidade('ACGT', 2, -1)
+        for _ in range(50):
+            a, b = seq_aleatoria(rng, 1, 20), seq_aleatoria(rng, 1, 20)
+            self.assertEqual(al.needleman_wunsch_afim(a, b, dna, -4, -4)[0], al.needleman_wunsch_vetorizado(a, b)[0])
+
+    def test_extensao_pior_que_abertura(self):
+        with self.assertRaises(ValueError):
+            al.needleman_wunsch_afim('AC', 'AC', abertura = -1, extensao = -5)
+
+
+class TestAlinharLote(unittest.TestCase):
+
+    def test_igual_aos_pares(self):
+        rng = random.Random(10)
+        query = seq_aleatoria(rng, 40, 40)
+        alvos = [seq_aleatoria(rng, 1, 60, 'ACGTacgt') for _ in range(60)]
+        for local in (False, True):
+            funcao = al.smith_waterman_vetorizado if local else al.needleman_wunsch_vetorizado
+            esperado = [funcao(query, alvo)[0] for alvo in alvos]
+            for ordenar in (True, False):
+                for tamanho_lote in (1, 7, 64):
+                    scores = al.alinhar_lote(query, alvos, local = local, ordenar = ordenar, tamanho_lote = tamanho_lote)
+                    self.assertEqual(scores.tolist(), esperado)
+
+    def test_proteinas(self):
+        rng = random.Random(11)
+        query = 'MKTAYIAKQRQISFVKSHFSRQ'
+        alvos = [seq_aleatoria(rng, 1, 30, 'ARNDCQEGHILKMFPSTWYV') for _ in range(30)]
+        self.assertEqual(al.alinhar_lote(query, alvos, matriz = 'BLOSUM62', score_space = -5).tolist(),
+                         [al.needleman_wunsch_afim(query, alvo, 'BLOSUM62', -5, -5)[0] for alvo in alvos])
+        self.assertEqual(al.alinhar_lote(query, alvos, local = True, matriz = 'BLOSUM62', score_space = -5).tolist(),
+                         [al.smith_waterman_afim(query, alvo, 'BLOSUM62', -5, -5)[0] for alvo in alvos])
+
+    def test_sem_alvos(self):
+        self.assertEqual(al.alinhar_lote('ACGT', []).tolist(), [])
+
+
+class TestAlinharPerfis(unittest.TestCase):
+
+    def test_perfis_de_uma_sequencia_igual_a_nw(self):
+        import numpy as np
+
+        rng = random.Random(12)
+        matriz = MatrizSubstituicao.identidade('ACGT', 2, -2)
+        pontuacao = al.pontuacao_perfis(matriz, -4)
+        simbolos = np.arange(5)
+        for _ in range(100):
+            a, b = seq_aleatoria(rng, 1, 25), seq_aleatoria(rng, 1, 25)
+            contagens_1 = (matriz.codificar(a)[:, None] == simbolos).astype(np.int64)
+            contagens_2 = (matriz.codificar(b)[:, None] == simbolos).astype(np.int64)
+            score, posicoes_1, posicoes_2 = al.alinhar_perfis(contagens_1, contagens_2, pontuacao)
+            esperado = al.needleman_wunsch_vetorizado(a, b, 2, -2, -4)
+            self.assertEqual(score, esperado[0])
+            alinhadas = (''.join(a[k] if k >= 0 else '-' for k in posicoes_1),
+                         ''.join(b[k] if k >= 0 else '-' for k in posicoes_2))
+            self.assertEqual(alinhadas, esperado[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import contextlib
+import io
+import random
+import unittest
+
+from scripts import auxiliares as aux
+
+
+COMPLEMENTO = str.maketrans('ACGT', 'TGCA')
+
+BASES = 'TCAG'
+AMINOACIDOS = 'FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG'
+CODOES = {a + b + c: AMINOACIDOS[16 * i + 4 * j + k]
+          for i, a in enumerate(BASES) for j, b in enumerate(BASES) for k, c in enumerate(BASES)}
+
+
+def traduzir_referencia(seq):
+    return ''.join(CODOES[seq[i:i + 3]] for i in range(0, len(seq) - len(seq) % 3, 3))
+
+
+def orfs_referencia(seq):
+    '''ORFs ATG...stop em cada frame por força bruta; a cadeia reversa usa coordenadas do complemento inverso'''
+    seq = seq.upper()
+    reversa = seq.translate(str.maketrans('ACGT', 'TGCA'))[::-1]
+    orfs = []
+    for cadeia, s in ((0, seq), (3, reversa)):
+        for frame in range(3):
+            inicio = None
+            for p in range(frame, len(s) - 2, 3):
+                codao = s[p:p + 3]
+                if codao == 'ATG' and inicio is None:
+                    inicio = p
+                if codao in ('TAA', 'TAG', 'TGA'):
+                    if inicio is not None:
+                        orfs.append((cadeia + frame, inicio, p + 3))
+                    inicio = None
+    return sorted(orfs)
+
+
+class TestValidacao(unittest.TestCase):
+
+    def test_validar_dna(self):
+        self.assertTrue(aux.validar_dna('acg t'))
+        self.assertTrue(aux.validar_dna(b'acgt'))
+        self.assertFalse(aux.validar_dna('ACGU'))
+        with self.assertRaises(AssertionError):
+            aux.validar_dna(12)
+
+    def test_normalizar_e_tipo(self):
+        self.assertEqual(aux.normalizar_seq(' acg t'), ('ACGT', 'ADN'))
+        self.assertEqual(aux.tipo_seq('ACGT'), 'ADN')
+        self.assertEqual(aux.tipo_seq('ACGU'), 'RNA')
+        self.assertEqual(aux.tipo_seq('MKV'), 'Sequência aminoácidos')
+        with self.assertRaises(ValueError):
+            aux.tipo_seq('')
+
+
+class TestTabelas(unittest.TestCase):
+
+    def test_complemento_e_transcricao(self):
+        rng = random.Random(11)
+        for _ in range(300):
+            seq = ''.join(rng.choice('ACGTacgt  ') for _ in range(rng.randint(1, 30)))
+            if not aux.validar_dna(seq):
+                continue
+            limpa = seq.replace(' ', '').upper()
+            self.assertEqual(aux.complemento_inverso(seq), limpa.translate(COMPLEMENTO)[::-1])
+            self.assertEqual(aux.transc(seq), limpa.translate(str.maketrans('ATCG', 'UAGC')))
+
+    def test_traducao(self):
+        rng = random.Random(12)
+        for _ in range(300):
+            seq = ''.join(rng.choice('ACGT') for _ in range(3 * rng.randint(0, 20)))
+            if seq:
+                self.assertEqual(aux.traducao_personalizada(seq), traduzir_referencia(seq))
+        with self.assertRaises(ValueError):
+            aux.traducao_personalizada('ACGT')
+
+    def test_seis_frames(self):
+        rng = random.Random(13)
+        for _ in range(200):
+            seq = ''.join(rng.choice('ACGT') for _ in range(rng.randint(1, 40)))
+            reversa = seq.translate(COMPLEMENTO)[::-1]
+            esperado = [traduzir_referencia(s[f:]) for s in (seq, reversa) for f in range(3)]
+            self.assertEqual(aux.traduzir_seis_frames(seq), esperado)
+
+    def test_sequencias_invalidas(self):
+        with self.assertRaises(AssertionError):
+            aux.complemento_inverso('ACX')
+        with self.assertRaises(AssertionError):
+            aux.traducao_personalizada('ACX')
+        with contextlib.redirect_stdout(io.StringIO()) as saida:
+            self.assertIsNone(aux.transc('ACX'))
+        self.assertIn('Sequência inválida', saida.getvalue())
+
+
+class TestProcurarOrfs(unittest.TestCase):
+
+    def test_igual_a_forca_bruta(self):
+        rng = random.Random(3)
+        for _ in range(60):
+            seq = ''.join(rng.choice('ACGTACGTACGTn') for _ in range(rng.randint(0, 200)))
+            esperado = orfs_referencia(seq)
+            for bloco in (1, 5, 7, 1 << 20):
+                for fonte in (seq, seq.encode(), memoryview(bytearray(seq.encode()))):
+                    self.assertEqual(sorted(aux.procurar_orfs(fonte, bloco = bloco)), esperado)
+            minimo = rng.randint(0, 60)
+            self.assertEqual(sorted(aux.procurar_orfs(seq, minimo)), [o for o in esperado if o[2] - o[1] >= minimo])
+
+    def test_so_cadeia_direta(self):
+        seq = 'CCATGAAATAGCTATTTCATGG'
+        self.assertEqual(list(aux.procurar_orfs(seq, ambas_cadeias = False)), [(2, 2, 11)])
+        self.assertEqual(sorted(aux.procurar_orfs(seq)), orfs_referencia(seq))
+
+
+if __name__ == '__main__':
+    unittest.main()
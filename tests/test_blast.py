@@ -0,0 +1,249 @@
+import os
+import random
+import tempfile
+import unittest
+
+from scripts.blast import (IndiceKmers, best_hit, estender_dois_hits, estender_xdrop, extend_hit, hits,
+                           melhores_hits, pesquisar_base_dados, query_map)
+from scripts.codificacao import PackedSeq
+
+
+def seq_aleatoria(rng, minimo, maximo):
+    return ''.join(rng.choice('ACGT') for _ in range(rng.randint(minimo, maximo)))
+
+
+def query_map_referencia(query, w):
+    mapa = {}
+    for i in range(len(query) - w + 1):
+        mapa.setdefault(query[i:i + w], []).append(i)
+    return mapa
+
+
+def hits_referencia(mapa, seq):
+    '''hits do notebook do tema 3: str.find sobre a sequência para cada k-mer da query'''
+    res = []
+    for kmer, offsets in mapa.items():
+        for offset_q in offsets:
+            offset_s = seq.find(kmer)
+            while offset_s != -1:
+                res.append((offset_q, offset_s))
+                offset_s = seq.find(kmer, offset_s + 1)
+    return res
+
+
+def expande_referencia(query, seq, off_q, off_s, way):
+    tam = matches = 0
+    while 0 < off_q < len(query) and 0 < off_s < len(seq):
+        tam += 1
+        matches += query[off_q] == seq[off_s]
+        off_q += way
+        off_s += way
+    return tam, matches
+
+
+def best_hit_referencia(query, seq, w):
+    '''best_hit do notebook: o primeiro hit estendido com mais matches'''
+    melhor = (0, 0, 0, 0)
+    for h1, h2 in hits_referencia(query_map_referencia(query, w), seq):
+        tam_esq, matches_esq = expande_referencia(query, seq, h1, h2, -1)
+        tam_dir, matches_dir = expande_referencia(query, seq, h1 + w, h2 + w, 1)
+        hit = (h1 - tam_esq, h2 - tam_esq, tam_esq + w + tam_dir, matches_esq + w + matches_dir)
+        if hit[3] > melhor[3]:
+            melhor = hit
+    return melhor
+
+
+def xdrop_direcao(query, seq, pos_q, pos_s, direcao, x_drop):
+    melhor = atual = tamanho = matches = melhor_matches = passos = 0
+    while 0 <= pos_q < len(query) and 0 <= pos_s < len(seq):
+        igual = query[pos_q] == seq[pos_s]
+        atual += 1 if igual else -1
+        matches += igual
+        passos += 1
+        if atual > melhor:
+            melhor, tamanho, melhor_matches = atual, passos, matches
+        if melhor - atual > x_drop:
+            break
+        pos_q += direcao
+        pos_s += direcao
+    return tamanho, melhor_matches
+
+
+def xdrop_referencia(query, seq, hit, w, x_drop):
+    h1, h2 = hit
+    tam_esq, matches_esq = xdrop_direcao(query, seq, h1 - 1, h2 - 1, -1, x_drop)
+    tam_dir, matches_dir = xdrop_direcao(query, seq, h1 + w, h2 + w, 1, x_drop)
+    return (h1 - tam_esq, h2 - tam_esq, tam_esq + w + tam_dir, matches_esq + w + matches_dir)
+
+
+class TestHitsBestHit(unittest.TestCase):
+
+    def test_igual_ao_notebook(self):
+        rng = random.Random(6)
+        for _ in range(200):
+            query, seq = seq_aleatoria(rng, 3, 20), seq_aleatoria(rng, 3, 60)
+            w = rng.randint(1, min(4, len(query)))
+            self.assertEqual(sorted(hits(query_map(query, w), seq)),
+                             sorted(hits_referencia(query_map_referencia(query, w), seq)))
+            self.assertEqual(best_hit(query, seq, w), best_hit_referencia(query, seq, w))
+
+    def test_packedseq_igual_a_str(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            query, seq = seq_aleatoria(rng, 5, 20), seq_aleatoria(rng, 5, 80)
+            self.assertEqual(best_hit(PackedSeq(query), PackedSeq(seq), 3), best_hit(query, seq, 3))
+
+    def test_query_invalida(self):
+        with self.assertRaises(TypeError):
+            query_map(12, 3)
+        with self.assertRaises(ValueError):
+            query_map('ACGT', 0)
+
+
+class TestIndiceKmers(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(8)
+        self.seqs = [seq_aleatoria(rng, 10, 80) for _ in range(20)]
+
+    def test_denso_e_esparso(self):
+        query = self.seqs[7][5:30]
+        esperado = None
+        for denso in (True, False, None):
+            indice = IndiceKmers.criar([('s%d' % i, s) for i, s in enumerate(self.seqs)], 4, denso = denso)
+            self.assertEqual(indice.codigos is None, denso is not False and 4 ** 4 <= 4 * sum(len(s) - 3 for s in self.seqs))
+            resultado = sorted(hits(query_map(query, 4), indice))
+            for offset_q, offset_indice in resultado:
+                numero, offset = indice.localizar(offset_indice)
+                self.assertEqual(self.seqs[numero][offset:offset + 4], query[offset_q:offset_q + 4])
+            total = sum(len(hits_referencia(query_map_referencia(query, 4), s)) for s in self.seqs)
+            self.assertEqual(len(resultado), total)
+            if esperado is not None:
+                self.assertEqual(resultado, esperado)
+            esperado = resultado
+
+    def test_guardar_carregar(self):
+        indice = IndiceKmers.criar([('s%d' % i, s) for i, s in enumerate(self.seqs)], 4)
+        numero = max(range(len(self.seqs)), key = lambda i: len(self.seqs[i]))
+        query = self.seqs[numero][10:40]
+        with tempfile.TemporaryDirectory() as pasta:
+            indice.guardar(pasta)
+            carregado = IndiceKmers.carregar(pasta)
+            self.assertEqual(carregado.nomes, indice.nomes)
+            self.assertEqual(sorted(hits(query_map(query, 4), carregado)), sorted(hits(query_map(query, 4), indice)))
+            self.assertEqual(best_hit(query, carregado, 4), best_hit(query, indice, 4))
+            hit = best_hit(query, carregado, 4, x_drop = 5)
+            self.assertEqual(hit[2:], (30, 30))
+            self.assertEqual(carregado.localizar(hit[1]), (numero, 10))
+
+
+class TestExtensaoXDrop(unittest.TestCase):
+
+    def test_igual_a_referencia(self):
+        rng = random.Random(9)
+        for _ in range(100):
+            base = seq_aleatoria(rng, 20, 300)
+            query = base[rng.randint(0, 10):]
+            seq = ''.join(c if rng.random() < 0.85 else rng.choice('ACGT') for c in base)
+            w, x_drop = rng.randint(1, 5), rng.randint(0, 8)
+            seeds = [(rng.randrange(len(query) - w + 1), rng.randrange(len(seq) - w + 1)) for _ in range(20)]
+            self.assertEqual(estender_xdrop(query, seq, seeds, w, x_drop),
+                             [xdrop_referencia(query, seq, h, w, x_drop) for h in seeds])
+            self.assertEqual(extend_hit(query, seq, seeds[0], w, x_drop = x_drop),
+                             xdrop_referencia(query, seq, seeds[0], w, x_drop))
+
+    def test_pesquisa_com_xdrop(self):
+        rng = random.Random(10)
+        seqs = [seq_aleatoria(rng, 200, 200) for _ in range(10)]
+        query = seqs[3][50:120]
+        resultado = dict(pesquisar_base_dados(query, seqs, 5, x_drop = 5))
+        self.assertEqual(resultado['3'][3], 70)
+
+
+class TestDoisHits(unittest.TestCase):
+
+    @staticmethod
+    def referencia(query, seq, seeds, w, A, x_drop):
+        por_diagonal = {}
+        for h1, h2 in sorted(set(seeds), key = lambda h: (h[1] - h[0], h[0])):
+            por_diagonal.setdefault(h2 - h1, []).append(h1)
+        mantidos, extensoes = 0, []
+        for diagonal, offsets in por_diagonal.items():
+            ativados = [x for x in offsets if any(w <= x - y <= A for y in offsets)]
+            mantidos += len(ativados)
+            coberto = -1
+            for x in ativados:
+                if x < coberto:
+                    continue
+                extensao = xdrop_referencia(query, seq, (x, x + diagonal), w, x_drop)
+                extensoes.append(extensao)
+                coberto = extensao[0] + extensao[2]
+        return sorted(extensoes), mantidos
+
+    def test_igual_a_referencia(self):
+        rng = random.Random(11)
+        for _ in range(100):
+            unidade = seq_aleatoria(rng, 3, 12)
+            seq = ''.join(unidade if rng.random() < 0.5 else rng.choice('ACGT') * 3 for _ in range(30))
+            query = seq[rng.randint(0, 20):][:rng.randint(30, 120)]
+            w = rng.randint(2, 5)
+            A, x_drop = rng.randint(w, 30), rng.randint(1, 8)
+            seeds = hits(query_map(query, w), seq)
+            extensoes, estatisticas = estender_dois_hits(query, seq, seeds, w, A, x_drop)
+            esperado, mantidos = self.referencia(query, seq, seeds, w, A, x_drop)
+            self.assertEqual(sorted(extensoes), esperado)
+            self.assertEqual(estatisticas['seeds_mantidos'], mantidos)
+            self.assertEqual(estatisticas['extensoes'], len(esperado))
+
+
+class TestPesquisaBaseDados(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(12)
+        cls.rng = rng
+        cls.seqs = [('s%d' % i, seq_aleatoria(rng, 2, 90)) for i in range(40)]
+        descritor, cls.caminho = tempfile.mkstemp(suffix = '.fa')
+        with os.fdopen(descritor, 'w') as f:
+            for nome, seq in cls.seqs:
+                f.write('>%s desc\n' % nome + ''.join(seq[i:i + 13] + '\n' for i in range(0, len(seq), 13)))
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.caminho)
+        if os.path.exists(cls.caminho + '.fai'):
+            os.remove(cls.caminho + '.fai')
+
+    def test_fasta_igual_ao_notebook(self):
+        for _ in range(20):
+            query = seq_aleatoria(self.rng, 3, 25)
+            w = self.rng.randint(1, 4)
+            resultado = dict(pesquisar_base_dados(query, self.caminho, w))
+            for nome, seq in self.seqs:
+                if len(seq) < w:
+                    continue
+                esperado = best_hit_referencia(query, seq, w)
+                if esperado[3] > 0:
+                    self.assertEqual(resultado[nome], esperado)
+                else:
+                    self.assertNotIn(nome, resultado)
+
+    def test_melhores_hits(self):
+        for _ in range(20):
+            query = seq_aleatoria(self.rng, 3, 25)
+            w = self.rng.randint(1, 4)
+            todos = [(best_hit_referencia(query, seq, w)[3], -i, nome)
+                     for i, (nome, seq) in enumerate(self.seqs) if len(seq) >= w]
+            esperado = [nome for score, _, nome in sorted(todos, reverse = True) if score > 0][:5]
+            self.assertEqual([nome for nome, _ in melhores_hits(query, self.seqs, w, 5)], esperado)
+
+    def test_estatisticas_dois_hits(self):
+        query = self.seqs[5][1] * 3
+        estatisticas = {}
+        resultado = list(pesquisar_base_dados(query, self.seqs, 4, janela_dois_hits = 20, estatisticas = estatisticas))
+        self.assertIn('s5', dict(resultado))
+        self.assertGreaterEqual(estatisticas['extensoes'], len(resultado))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import random
+import unittest
+
+from scripts import alinhamentos as al
+from scripts import auxiliares as aux
+from scripts import blast
+from scripts.codificacao import PackedSeq, codificar_2bits, codigos_kmers
+
+
+COMPLEMENTO = str.maketrans('ACGTN', 'TGCAN')
+
+
+class TestPackedSeq(unittest.TestCase):
+
+    def test_igual_a_str(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            texto = ''.join(rng.choice('ACGTacgtNNRy ') for _ in range(rng.randint(0, 60)))
+            seq = ''.join(c if c in 'ACGT' else 'N' for c in aux._normalizar_bytes(texto).decode())
+            packed = PackedSeq(texto)
+            self.assertEqual((str(packed), len(packed)), (seq, len(seq)))
+            self.assertEqual(packed, seq)
+            reversa = seq.translate(COMPLEMENTO)[::-1]
+            self.assertEqual(str(packed.complemento_inverso()), reversa)
+            for vista, referencia in ((packed, seq), (packed.complemento_inverso(), reversa)):
+                a = rng.randint(0, len(referencia))
+                b = rng.randint(a, len(referencia))
+                fatia = vista[a:b]
+                self.assertEqual(str(fatia), referencia[a:b])
+                self.assertEqual(str(fatia.complemento_inverso()), referencia[a:b].translate(COMPLEMENTO)[::-1])
+                self.assertTrue((fatia.codigos() == codificar_2bits(referencia[a:b])).all())
+                self.assertEqual(str(vista[::2]), referencia[::2])
+                if referencia:
+                    i = rng.randrange(-len(referencia), len(referencia))
+                    self.assertEqual(vista[i], referencia[i])
+                k = rng.randint(1, 5)
+                self.assertEqual(list(vista.kmers(k, bloco = rng.randint(1, 9))),
+                                 [referencia[i:i + k] for i in range(len(referencia) - k + 1)])
+                for obtido, esperado in zip(vista.codigos_kmers(k), codigos_kmers(codificar_2bits(referencia), k)):
+                    self.assertTrue((obtido == esperado).all())
+
+    def test_nas_funcoes(self):
+        a = PackedSeq('ACGTTGCAAGGCTTAGCA' * 5)
+        b = PackedSeq('ACGTAGCATGGCTTACCA' * 4)
+        self.assertEqual(al.needleman_wunsch_vetorizado(a, b), al.needleman_wunsch_vetorizado(str(a), str(b)))
+        self.assertTrue(aux.validar_dna(a))
+        self.assertEqual(aux.contar_bases(a), aux.contar_bases(str(a)))
+        self.assertEqual(blast.estender_xdrop(a, b, [(3, 3)], 3), blast.estender_xdrop(str(a), str(b), [(3, 3)], 3))
+        self.assertEqual(blast.best_hit(str(a)[:20], b, 4), blast.best_hit(str(a)[:20], str(b), 4))
+        self.assertEqual(blast.query_map(a[:20], 4), blast.query_map(str(a)[:20], 4))
+
+    def test_memoria(self):
+        packed = PackedSeq('ACGT' * 1000)
+        self.assertLessEqual(packed.nbytes, 4000 // 4 + 4000 // 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
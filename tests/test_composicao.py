@@ -0,0 +1,97 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from scripts.composicao import composicao, composicao_fasta, perfil_gc, perfil_gc_fasta
+from scripts.ficheiros import ler_fasta
+
+
+def espectro_referencia(seq, k):
+    espectro = np.zeros(4 ** k, dtype = np.int64)
+    for i in range(len(seq) - k + 1):
+        kmer = seq[i:i + k]
+        if all(base in 'ACGT' for base in kmer):
+            espectro[int(''.join(str('ACGT'.index(base)) for base in kmer), 4)] += 1
+    return espectro
+
+
+def janelas_referencia(seq, janela, passo, medida):
+    valores = []
+    for inicio in range(0, len(seq) - janela + 1, passo):
+        x = seq[inicio:inicio + janela]
+        g, c = x.count('G'), x.count('C')
+        validas = sum(x.count(base) for base in 'ACGT')
+        if medida == 'gc':
+            valores.append(100 * (g + c) / validas if validas else np.nan)
+        else:
+            valores.append((g - c) / (g + c) if g + c else np.nan)
+    return np.array(valores)
+
+
+class TestComposicao(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(1)
+        cls.seq = ''.join(rng.choice('ACGTNacgt') for _ in range(2003))
+
+    def test_contagens_e_espectro(self):
+        maiusculas = self.seq.upper()
+        for k in (1, 3, 5):
+            esperado = espectro_referencia(maiusculas, k)
+            for bloco in (1, 7, 1000, 1 << 20):
+                resultado = composicao(self.seq, k, bloco)
+                self.assertEqual(resultado.bases, {base: maiusculas.count(base) for base in 'ATCG'})
+                self.assertTrue((resultado.espectro == esperado).all())
+        g, c = maiusculas.count('G'), maiusculas.count('C')
+        self.assertAlmostEqual(resultado.gc, 100 * (g + c) / sum(maiusculas.count(b) for b in 'ACGT'))
+        self.assertAlmostEqual(resultado.gc_skew, (g - c) / (g + c))
+        self.assertEqual(resultado.outros, maiusculas.count('N'))
+
+    def test_k_invalido(self):
+        with self.assertRaises(ValueError):
+            composicao('ACGT', 0)
+
+    def test_perfil_gc(self):
+        maiusculas = self.seq.upper()
+        for janela, passo in [(1, 1), (5, 1), (50, 10), (10, 37), (100, 100), (5000, 5)]:
+            for bloco in (3, 64, 5000):
+                for medida in ('gc', 'skew'):
+                    inicios, valores = perfil_gc(self.seq, janela, passo, medida, bloco)
+                    esperado = janelas_referencia(maiusculas, janela, passo, medida)
+                    self.assertEqual(len(valores), len(esperado))
+                    self.assertTrue(np.allclose(valores, esperado, equal_nan = True))
+                    self.assertTrue((inicios == np.arange(len(esperado)) * passo).all())
+
+
+class TestComposicaoFasta(unittest.TestCase):
+
+    def test_igual_a_sequencia_inteira(self):
+        rng = random.Random(2)
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'g.fa')
+            with open(caminho, 'w') as f:
+                for i in range(3):
+                    seq = ''.join(rng.choice('ACGT') for _ in range(1234 + i))
+                    f.write(f'>r{i} desc\n' + ''.join(seq[j:j + 60] + '\n' for j in range(0, len(seq), 60)))
+                f.write('>vazio\n')
+            registos = dict(ler_fasta(caminho))
+            for bloco in (1, 100, 1 << 20):
+                composicoes = dict(composicao_fasta(caminho, 3, bloco))
+                self.assertEqual(composicoes.keys(), registos.keys())
+                for nome, seq in registos.items():
+                    self.assertEqual(composicoes[nome].bases, composicao(seq, 3).bases)
+                    self.assertTrue((composicoes[nome].espectro == espectro_referencia(seq, 3)).all())
+                perfis = {}
+                for nome, _, valores in perfil_gc_fasta(caminho, 100, 50, bloco = bloco):
+                    perfis.setdefault(nome, []).append(valores)
+                for nome, seq in registos.items():
+                    if len(seq) >= 100:
+                        self.assertTrue(np.allclose(np.concatenate(perfis[nome]), perfil_gc(seq, 100, 50)[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
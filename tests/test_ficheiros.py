@@ -0,0 +1,85 @@
+import os
+import random
+import tempfile
+import unittest
+
+from scripts import auxiliares as aux
+from scripts import alinhamentos as al
+from scripts.ficheiros import FicheiroIndexado, indexar_ficheiro, ler_fasta
+
+
+def escrever(caminho, texto):
+    with open(caminho, 'w', newline = '') as f:
+        f.write(texto)
+
+
+class TestFicheiroIndexado(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(5)
+        self.pasta = tempfile.TemporaryDirectory()
+        self.seqs = {f's{i}': ''.join(rng.choice('ACGTacgt') for _ in range(rng.randint(0, 200))) for i in range(15)}
+        self.rng = rng
+
+    def tearDown(self):
+        self.pasta.cleanup()
+
+    def fasta(self, largura, fim_linha):
+        caminho = os.path.join(self.pasta.name, f't{largura}.fa')
+        escrever(caminho, ''.join(f'>{nome} desc{fim_linha}' + ''.join(seq[i:i + largura] + fim_linha
+                                                                      for i in range(0, len(seq), largura))
+                                  for nome, seq in self.seqs.items()))
+        return caminho
+
+    def test_leitura_e_regioes(self):
+        for largura, fim_linha in ((60, '\n'), (7, '\r\n'), (1000, '\n')):
+            caminho = self.fasta(largura, fim_linha)
+            for _ in range(2):
+                with FicheiroIndexado(caminho) as ficheiro:
+                    self.assertEqual(ficheiro.nomes(), list(self.seqs))
+                    for nome, vista in ficheiro:
+                        seq = self.seqs[nome]
+                        self.assertEqual((str(vista), len(vista)), (seq, len(seq)))
+                        for _ in range(10):
+                            a = self.rng.randint(0, len(seq))
+                            b = self.rng.randint(a, len(seq))
+                            self.assertEqual(str(vista[a:b]), seq[a:b])
+                            self.assertEqual(str(ficheiro.regiao(f'{nome}:{a + 1}-{b}')), seq[a:b])
+                            self.assertEqual(str(vista[a:b][1:-1]), seq[a:b][1:-1])
+                            if seq:
+                                i = self.rng.randrange(-len(seq), len(seq))
+                                self.assertEqual(vista[i], seq[i])
+                self.assertTrue(os.path.exists(caminho + '.fai'))
+            self.assertEqual(dict(ler_fasta(caminho)), self.seqs)
+
+    def test_vistas_nas_funcoes(self):
+        with FicheiroIndexado(self.fasta(60, '\n')) as ficheiro:
+            for nome, vista in ficheiro:
+                seq = self.seqs[nome]
+                if seq:
+                    self.assertEqual(aux.contar_bases(vista), aux.contar_bases(seq))
+                    self.assertEqual(sorted(aux.procurar_orfs(vista, bloco = 37)), sorted(aux.procurar_orfs(seq)))
+            a, b = ficheiro['s1'][:80], ficheiro['s2'][:90]
+            self.assertEqual(al.needleman_wunsch_vetorizado(a, b), al.needleman_wunsch_vetorizado(str(a), str(b)))
+            self.assertEqual(al.nw_score(a, b), al.nw_score(str(a), str(b)))
+            self.assertEqual(str(ficheiro.regiao('s3:5')), self.seqs['s3'][4:])
+
+    def test_fastq(self):
+        caminho = os.path.join(self.pasta.name, 'r.fq')
+        registos = list(self.seqs.items())[:5]
+        escrever(caminho, ''.join(f'@{nome}\n{seq}\n+\n{"I" * len(seq)}\n' for nome, seq in registos))
+        with FicheiroIndexado(caminho) as ficheiro:
+            for nome, vista in ficheiro:
+                self.assertEqual(str(vista), self.seqs[nome])
+                self.assertEqual(str(ficheiro.qualidade(nome)), 'I' * len(self.seqs[nome]))
+
+    def test_ficheiros_mal_formados(self):
+        caminho = os.path.join(self.pasta.name, 'mau.fa')
+        for texto in ['>a\nACG\nACGT\n', '>a\nAC\nAC\n>a\nA\n', 'xx']:
+            escrever(caminho, texto)
+            with self.assertRaises(ValueError):
+                indexar_ficheiro(caminho)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import unittest
+
+import numpy as np
+
+from scripts import filogenia
+from scripts.filogenia import (alinhamento_progressivo, neighbor_joining, nw_ciclico, nw_ciclico_esbocos,
+                               nw_ciclico_paralelo, upgma)
+from tests.test_alinhamentos import nw_referencia
+
+
+def distancias_newick(newick):
+    '''Lê uma árvore Newick e devolve as folhas e a função da distância entre duas folhas'''
+    texto = newick.strip().rstrip(';')
+    pos = 0
+
+    def no():
+        nonlocal pos
+        filhos, nome = [], None
+        if texto[pos] == '(':
+            pos += 1
+            while True:
+                filhos.append(no())
+                pos += 1
+                if texto[pos - 1] == ')':
+                    break
+        else:
+            nome = re.match(r"'[^']*'|[^:,()]+", texto[pos:]).group()
+            pos += len(nome)
+        ramo = 0.0
+        if pos < len(texto) and texto[pos] == ':':
+            valor = re.match(r':([-0-9.eE+]+)', texto[pos:])
+            ramo = float(valor.group(1))
+            pos += len(valor.group())
+        return nome, filhos, ramo
+
+    caminhos = {}
+
+    def percorrer(n, caminho):
+        nome, filhos, _ = n
+        if nome is not None:
+            caminhos[nome] = caminho
+        for filho in filhos:
+            percorrer(filho, caminho + [(id(filho), filho[2])])
+
+    percorrer(no(), [])
+
+    def distancia(a, b):
+        ca, cb, k = caminhos[a], caminhos[b], 0
+        while k < min(len(ca), len(cb)) and ca[k][0] == cb[k][0]:
+            k += 1
+        return sum(r for _, r in ca[k:]) + sum(r for _, r in cb[k:])
+
+    return caminhos, distancia
+
+
+def arvore_aditiva(n, rng):
+    '''Matriz de distâncias de uma árvore binária aleatória (aditiva)'''
+    D = np.zeros((n, n))
+    grupos = [(np.array([i]), np.zeros(1)) for i in range(n)]
+    while len(grupos) > 1:
+        a = grupos.pop(rng.integers(len(grupos)))
+        b = grupos.pop(rng.integers(len(grupos)))
+        ra, rb = rng.uniform(0.01, 1, 2)
+        da, db = a[1] + ra, b[1] + rb
+        D[np.ix_(a[0], b[0])] = da[:, None] + db[None, :]
+        D[np.ix_(b[0], a[0])] = D[np.ix_(a[0], b[0])].T
+        grupos.append((np.concatenate([a[0], b[0]]), np.concatenate([da, db])))
+    return D
+
+
+def upgma_referencia(D, nomes):
+    '''UPGMA ingénuo: procura o mínimo em toda a matriz a cada junção'''
+    D = np.array(D, dtype = float)
+    np.fill_diagonal(D, np.inf)
+    ativos = list(range(len(D)))
+    tamanhos, alturas, nos = [1] * len(D), [0.0] * len(D), list(nomes)
+    while len(ativos) > 1:
+        sub = D[np.ix_(ativos, ativos)]
+        k = int(np.argmin(sub))
+        i, j = sorted((ativos[k // len(ativos)], ativos[k % len(ativos)]))
+        altura = D[i, j] / 2
+        nos[i] = f"({nos[i]}:{altura - alturas[i]:.6g},{nos[j]}:{altura - alturas[j]:.6g})"
+        linha = (tamanhos[i] * D[i] + tamanhos[j] * D[j]) / (tamanhos[i] + tamanhos[j])
+        D[i], D[:, i] = linha, linha
+        D[i, i] = np.inf
+        tamanhos[i] += tamanhos[j]
+        alturas[i] = altura
+        ativos.remove(j)
+    return nos[ativos[0]] + ';'
+
+
+def mutar(seq, taxa, rng):
+    saida = []
+    for base in seq:
+        x = rng.random()
+        if x < taxa / 3:
+            continue
+        if x < 2 * taxa / 3:
+            saida.append(rng.choice('ACGT'))
+        elif x < taxa:
+            saida.extend((base, rng.choice('ACGT')))
+        else:
+            saida.append(base)
+    return ''.join(saida)
+
+
+class TestNWCiclico(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(5)
+        self.seqs = [('x%d' % i, ''.join(rng.choice('ACGT') for _ in range(rng.randint(10, 40)))) for i in range(8)]
+
+    def test_dissimilaridade(self):
+        matriz = nw_ciclico(self.seqs, 2, -4)
+        for i, (_, a) in enumerate(self.seqs):
+            self.assertEqual(matriz[i][i], 0.0)
+            for j, (_, b) in enumerate(self.seqs):
+                if i != j:
+                    score, (x, _) = nw_referencia(a, b, 2, -2, -4)
+                    self.assertAlmostEqual(matriz[i][j], 1 - score / len(x))
+                    self.assertEqual(matriz[i][j], matriz[j][i])
+
+    def test_par_triangular(self):
+        for n in range(2, 30):
+            pares = [(i, j) for i in range(n) for j in range(i + 1, n)]
+            self.assertEqual([filogenia._par_triangular(k, n) for k in range(len(pares))], pares)
+        self.assertEqual(filogenia._par_triangular(3000 * 2999 // 2 - 1, 3000), (2998, 2999))
+
+    def test_paralelo_igual_ao_sequencial(self):
+        esperado = np.array(nw_ciclico(self.seqs, 2, -4))
+        obtido = nw_ciclico_paralelo(self.seqs, 2, -4, n_processos = 2, tamanho_bloco = 5)
+        self.assertTrue((obtido == esperado).all())
+        self.assertTrue((nw_ciclico_paralelo(self.seqs[:1], 2, -4) == np.zeros((1, 1))).all())
+        self.assertEqual(nw_ciclico_paralelo([], 2, -4).shape, (0, 0))
+
+    def test_proteinas_e_pares_falhados(self):
+        seqs = [('p1', 'MKTAYIAKQR'), ('p2', 'MKTAYAKQR'), ('mau', None)]
+        with contextlib.redirect_stdout(io.StringIO()) as saida:
+            matriz = np.array(nw_ciclico(seqs, 2, -4))
+        score, (x, _) = nw_referencia('MKTAYIAKQR', 'MKTAYAKQR', 2, -2, -4)
+        self.assertAlmostEqual(matriz[0, 1], 1 - score / len(x))
+        self.assertTrue(np.isnan(matriz[2, :2]).all() and np.isnan(matriz[:2, 2]).all())
+        self.assertIn('mau', saida.getvalue())
+        with contextlib.redirect_stdout(io.StringIO()):
+            paralela = nw_ciclico_paralelo(seqs, 2, -4)
+        self.assertTrue(np.array_equal(paralela, matriz, equal_nan = True))
+
+
+class TestEsbocos(unittest.TestCase):
+
+    def test_pares_alinhados_iguais_ao_nw_ciclico(self):
+        rng = random.Random(6)
+        familias = [''.join(rng.choice('ACGT') for _ in range(300)) for _ in range(3)]
+        seqs = [(f's{i}', mutar(familias[i % 3], 0.02, rng)) for i in range(9)]
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'esbocos.npz')
+            matriz, alinhados = nw_ciclico_esbocos(seqs, 2, -4, limiar = 0.2, k = 11, tamanho_esboco = 200,
+                                                   esbocos = caminho)
+            self.assertTrue(os.path.exists(caminho))
+        completa = np.array(nw_ciclico(seqs, 2, -4))
+        self.assertTrue(np.allclose(matriz[alinhados], completa[alinhados]))
+        self.assertTrue(alinhados[0, 3] and not alinhados[0, 1])
+        self.assertTrue((matriz[~alinhados] > completa.max()).all())
+
+
+class TestArvores(unittest.TestCase):
+
+    def test_nj_recupera_arvore_aditiva(self):
+        rng = np.random.default_rng(1)
+        for n in (3, 4, 5, 10, 40):
+            D = arvore_aditiva(n, rng)
+            nomes = [f't{i}' for i in range(n)]
+            for bloco in (1, 2, 64):
+                _, distancia = distancias_newick(neighbor_joining(D, nomes, bloco = bloco))
+                erro = max(abs(distancia(nomes[a], nomes[b]) - D[a, b]) for a in range(n) for b in range(a + 1, n))
+                self.assertLess(erro, 1e-4)
+
+    def test_nj_ramos_das_cerejas_somam_a_distancia(self):
+        D = np.array([[0, .382, .399, .889, .366], [.382, 0, .604, .768, .194], [.399, .604, 0, .606, .541],
+                      [.889, .768, .606, 0, .077], [.366, .194, .541, .077, 0]])
+        matrizes = [D]
+        rng = np.random.default_rng(3)
+        for n in (3, 4, 6, 12, 30):
+            X = rng.random((n, n))
+            matrizes.append(X + X.T)
+            np.fill_diagonal(matrizes[-1], 0)
+        for D in matrizes:
+            nomes = [f't{i}' for i in range(len(D))]
+            arvore = neighbor_joining(D, nomes)
+            self.assertTrue(all(float(r) >= 0 for r in re.findall(r':([-0-9.eE+]+)', arvore)))
+            cerejas = re.findall(r'\(t(\d+):([^,()]+),t(\d+):([^,()]+)\)', arvore)
+            if len(D) > 3:
+                self.assertTrue(cerejas)
+            for a, ra, b, rb in cerejas:
+                self.assertAlmostEqual(float(ra) + float(rb), D[int(a), int(b)], places = 5)
+
+    def test_upgma_igual_ao_ingenuo(self):
+        rng = np.random.default_rng(2)
+        for n in (1, 2, 3, 10, 40):
+            X = rng.random((n, n))
+            D = X + X.T
+            np.fill_diagonal(D, 0)
+            nomes = [f't{i}' for i in range(n)]
+            _, obtida = distancias_newick(upgma(D, nomes))
+            _, esperada = distancias_newick(upgma_referencia(D, nomes))
+            for a in nomes:
+                for b in nomes:
+                    self.assertAlmostEqual(obtida(a, b), esperada(a, b), places = 4)
+
+    def test_matriz_com_nan(self):
+        with self.assertRaises(ValueError):
+            upgma([[0, np.nan], [np.nan, 0]], ['a', 'b'])
+
+    def test_metodo_desconhecido(self):
+        with self.assertRaises(ValueError):
+            filogenia.criar_arvore_newick([[0, 1], [1, 0]], [('a', 'A'), ('b', 'C')], 'xpto')
+
+
+class TestAlinhamentoProgressivo(unittest.TestCase):
+
+    def test_msa(self):
+        rng = random.Random(2)
+        base = ''.join(rng.choice('ACGT') for _ in range(120))
+        seqs = [(f's{i}', mutar(base, 0.1, rng)) for i in range(12)]
+        msa = alinhamento_progressivo(seqs, nw_ciclico(seqs, 2, -4))
+        self.assertEqual([nome for nome, _ in msa], [nome for nome, _ in seqs])
+        self.assertEqual(len({len(s) for _, s in msa}), 1)
+        for (_, alinhada), (_, original) in zip(msa, seqs):
+            self.assertEqual(alinhada.replace('-', ''), original)
+
+    def test_pares_e_proteinas(self):
+        self.assertEqual(alinhamento_progressivo([('a', 'ACGT')]), [('a', 'ACGT')])
+        a, b = 'ACGTTGCA', 'ACGTGCA'
+        msa = alinhamento_progressivo([('a', a), ('b', b)], score_subst = 2, score_space = -4)
+        score, alinhadas = nw_referencia(a, b, 2, -2, -4)
+        self.assertEqual(tuple(s for _, s in msa), alinhadas)
+        msa = alinhamento_progressivo([('p1', 'MKTAYIAKQR'), ('p2', 'MKTAYAKQR'), ('p3', 'MKSAYIAKQRW')],
+                                      matriz = 'BLOSUM62', score_space = -5)
+        self.assertEqual([s.replace('-', '') for _, s in msa], ['MKTAYIAKQR', 'MKTAYAKQR', 'MKSAYIAKQRW'])
+
+    def test_entradas_invalidas(self):
+        with self.assertRaises(ValueError):
+            alinhamento_progressivo([('a', 'ACGT'), ('b', 'MKV')])
+        with self.assertRaises(ValueError):
+            alinhamento_progressivo([])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+
+from scripts.blast import _tabela_query, query_map
+from scripts.codificacao import PackedSeq
+from scripts.kmers import contar_kmers, descodificar_kmer, esboco, esbocos_sequencias
+
+
+def complemento_inverso(seq):
+    return seq.translate(str.maketrans('ACGT', 'TGCA'))[::-1]
+
+
+def contagens_referencia(seq, k, canonicos):
+    contagens = Counter()
+    for i in range(len(seq) - k + 1):
+        kmer = seq[i:i + k]
+        if 'N' in kmer:
+            continue
+        contagens[min(kmer, complemento_inverso(kmer)) if canonicos else kmer] += 1
+    return dict(contagens)
+
+
+def mutar(seq, taxa, rng):
+    return ''.join(rng.choice('ACGT') if rng.random() < taxa else base for base in seq)
+
+
+class TestContarKmers(unittest.TestCase):
+
+    def test_igual_a_counter(self):
+        rng = random.Random(3)
+        for tentativa in range(30):
+            seq = ''.join(rng.choice('ACGTN') if rng.random() < 0.05 else rng.choice('ACGT')
+                          for _ in range(rng.randint(0, 300)))
+            k = rng.choice([1, 2, 3, 5, 11, 32])
+            bloco = rng.choice([1, 3, 50, 1 << 22])
+            for canonicos in (False, True):
+                esperado = contagens_referencia(seq, k, canonicos)
+                for posicoes in (False, True):
+                    contagem = contar_kmers(seq.lower() if tentativa % 2 else seq, k, canonicos, posicoes, bloco = bloco)
+                    obtido = {descodificar_kmer(c, k): int(n) for c, n in zip(contagem.codigos, contagem.contagens)}
+                    self.assertEqual(obtido, esperado)
+                    for kmer in list(esperado)[:5]:
+                        self.assertEqual(contagem.contagem(kmer), esperado[kmer])
+                        if canonicos:
+                            self.assertEqual(contagem.contagem(complemento_inverso(kmer)), esperado[kmer])
+
+    def test_query_map_e_tabela(self):
+        rng = random.Random(4)
+        for _ in range(20):
+            seq = ''.join(rng.choice('ACGT') for _ in range(rng.randint(5, 200)))
+            k = rng.randint(1, 6)
+            contagem = contar_kmers(seq, k, canonicos = False, posicoes = True)
+            mapa = query_map(seq, k)
+            self.assertEqual(contagem.query_map(), mapa)
+            for obtido, esperado in zip(contagem.tabela_query(), _tabela_query(mapa)):
+                self.assertTrue((obtido == esperado).all())
+
+    def test_varias_sequencias_e_processos(self):
+        rng = random.Random(5)
+        seqs = [('a', ''.join(rng.choice('ACGT') for _ in range(3000))), ('b', ''.join(rng.choice('ACGT') for _ in range(2000)))]
+        um = contar_kmers(seqs, 7, True, True, bloco = 700)
+        dois = contar_kmers(seqs, 7, True, True, n_processos = 2, bloco = 700)
+        for atributo in ('codigos', 'contagens', 'posicoes', 'inicios'):
+            self.assertTrue((getattr(um, atributo) == getattr(dois, atributo)).all())
+        self.assertEqual(um.total, sum(len(s) - 6 for _, s in seqs))
+        packed = PackedSeq(seqs[0][1])
+        self.assertTrue((contar_kmers(packed, 9).codigos == contar_kmers(seqs[0][1], 9).codigos).all())
+
+    def test_descodificar(self):
+        self.assertEqual(descodificar_kmer(0b00011011, 4), 'ACGT')
+
+
+class TestEsbocos(unittest.TestCase):
+
+    def test_distancia_aproxima_a_exata(self):
+        rng = random.Random(6)
+        base = ''.join(rng.choice('ACGT') for _ in range(20000))
+        for taxa in (0.01, 0.03):
+            mutada = mutar(base, taxa, rng)
+            exata = contar_kmers(base, 21).distancia(contar_kmers(mutada, 21))
+            estimada = esboco(base, 21, 2000).distancia(esboco(mutada, 21, 2000))
+            self.assertAlmostEqual(estimada, exata, delta = 0.25 * exata + 0.002)
+
+    def test_blocos_e_cadeias(self):
+        rng = random.Random(7)
+        seq = ''.join(rng.choice('ACGT') for _ in range(5000))
+        a, b = esboco(seq, 15, 500, bloco = 777), esboco(seq, 15, 500)
+        self.assertTrue((a.hashes == b.hashes).all())
+        self.assertEqual(len(a), 500)
+        self.assertEqual(esboco(seq, 15, 500).distancia(esboco(complemento_inverso(seq), 15, 500)), 0)
+
+    def test_cache_em_ficheiro(self):
+        rng = random.Random(8)
+        seqs = [(f's{i}', ''.join(rng.choice('ACGT') for _ in range(400))) for i in range(5)]
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'esbocos.npz')
+            primeiros = esbocos_sequencias(seqs, 11, 200, caminho = caminho)
+            self.assertTrue(os.path.exists(caminho))
+            guardados = esbocos_sequencias(seqs, 11, 200, caminho = caminho)
+            for nome in primeiros:
+                self.assertTrue((primeiros[nome].hashes == guardados[nome].hashes).all())
+            alterados = esbocos_sequencias(seqs[:-1] + [('s4', seqs[0][1])], 11, 200, caminho = caminho)
+            self.assertTrue((alterados['s4'].hashes == primeiros['s0'].hashes).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
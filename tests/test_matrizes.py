@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+from scripts import alinhamentos as al
+from scripts.matrizes import BLOSUM62, MatrizSubstituicao, carregar_matriz
+
+
+class TestMatrizSubstituicao(unittest.TestCase):
+
+    def test_blosum62(self):
+        matriz = carregar_matriz('blosum62')
+        self.assertIs(matriz, carregar_matriz('BLOSUM62'))
+        self.assertIs(carregar_matriz(matriz), matriz)
+        linhas = [linha.split() for linha in BLOSUM62.splitlines() if linha.strip() and not linha.startswith('#')]
+        for linha in linhas[1:]:
+            for residuo, valor in zip(linhas[0], linha[1:]):
+                self.assertEqual(matriz.score(linha[0], residuo), int(valor))
+                self.assertEqual(matriz.score(residuo, linha[0]), int(valor))
+        self.assertEqual(matriz.score('w', 'W'), 11)
+
+    def test_identidade(self):
+        matriz = MatrizSubstituicao.identidade('ACGT', 2, -1)
+        for a in 'ACGT':
+            for b in 'ACGT':
+                self.assertEqual(matriz.score(a, b), 2 if a == b else -1)
+        self.assertEqual(matriz.codificar('acgT').tolist(), [0, 1, 2, 3])
+        with self.assertRaises(ValueError):
+            matriz.codificar('ACGX')
+
+    def test_x_so_para_letras(self):
+        matriz = carregar_matriz('BLOSUM62')
+        x = matriz.alfabeto.index('X')
+        self.assertEqual(matriz.codificar('AxJO*').tolist(), [0, x, x, x, matriz.alfabeto.index('*')])
+        for seq in ['AC-', 'A1', 'A$', 'A?', 'Aé', 'A C']:
+            with self.assertRaises(ValueError):
+                matriz.codificar(seq)
+        with self.assertRaises(ValueError):
+            al.needleman_wunsch_afim('AC-12$', 'ACxx')
+
+    def test_de_ficheiro(self):
+        texto = '# matriz pequena\n   A  B\nA  1 -2\nB -2  3\n'
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'PEQUENA')
+            with open(caminho, 'w') as f:
+                f.write(texto)
+            matriz = carregar_matriz(caminho)
+        self.assertEqual(matriz.nome, 'PEQUENA')
+        self.assertEqual((matriz.score('A', 'A'), matriz.score('A', 'B'), matriz.score('B', 'B')), (1, -2, 3))
+
+    def test_texto_invalido(self):
+        for texto in ['', '   A  B\nB -2  3\nA  1 -2\n', '   A\nA x\n']:
+            with self.assertRaises(ValueError):
+                MatrizSubstituicao.de_texto(texto)
+
+
+if __name__ == '__main__':
+    unittest.main()
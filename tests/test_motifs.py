@@ -0,0 +1,166 @@
+import math
+import random
+import re
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from scripts import motifs
+from scripts.codificacao import PackedSeq
+
+
+COMPLEMENTO = str.maketrans('ACGTN', 'TGCAN')
+
+
+def pwm_referencia(seqs, pseudo = 0):
+    '''pwm do notebook do tema 4'''
+    return [{b: (pos.count(b) + pseudo) / (len(seqs) + 4 * pseudo) for b in 'ACGT'} for pos in zip(*seqs)]
+
+
+def pssm_referencia(seqs, pseudo = 1):
+    '''pssm do notebook do tema 4'''
+    return [{b: round(math.log2((pos.count(b) + pseudo) / (len(seqs) + 4 * pseudo)) / 0.25, 2) for b in 'ATCG'}
+            for pos in zip(*seqs)]
+
+
+def prob_seq_referencia(seq, resultado):
+    p = 1.0
+    for posicao, base in enumerate(seq):
+        p *= resultado[posicao][base] if base in resultado[posicao] else 0.01
+    return p
+
+
+def seq_aleatoria(rng, minimo, maximo, alfabeto = 'ACGT'):
+    return ''.join(rng.choice(alfabeto) for _ in range(rng.randint(minimo, maximo)))
+
+
+class TestPWMPSSM(unittest.TestCase):
+
+    def test_igual_ao_notebook(self):
+        rng = random.Random(2)
+        for _ in range(300):
+            comprimento = rng.randint(1, 12)
+            seqs = [seq_aleatoria(rng, comprimento, comprimento + 2) for _ in range(rng.randint(1, 8))]
+            pseudo = rng.choice([0, 1, 0.5, 2])
+            self.assertEqual(motifs.pwm(seqs, pseudo), pwm_referencia(seqs, pseudo))
+            if pseudo > 0:
+                self.assertEqual(motifs.pssm(seqs, pseudo), pssm_referencia(seqs, pseudo))
+
+    def test_casos_notebook(self):
+        self.assertEqual(motifs.pssm(['AT', 'AG'], 1), [{'A': -4.0, 'T': -10.34, 'C': -10.34, 'G': -10.34},
+                                                      {'A': -10.34, 'T': -6.34, 'C': -10.34, 'G': -6.34}])
+        self.assertEqual(motifs.pwm(['AA', 'AA']), [{'A': 1.0, 'C': 0.0, 'G': 0.0, 'T': 0.0}] * 2)
+        self.assertEqual(motifs.pssm([]), [])
+
+    def test_entradas_invalidas(self):
+        for invalido in ([1, 'ATC'], ['', 'ATC'], ['atc']):
+            with self.assertRaises(AssertionError):
+                motifs.pwm(invalido)
+        with self.assertRaises(ValueError):
+            motifs.pssm(['ATA'], 0)
+
+    def test_packedseq(self):
+        seqs = ['ACGTAC', 'ACGTTC', 'AGGTAC']
+        self.assertEqual(motifs.pwm([PackedSeq(s) for s in seqs], 1), motifs.pwm(seqs, 1))
+
+
+class TestSeqProvavel(unittest.TestCase):
+
+    def test_igual_ao_notebook(self):
+        rng = random.Random(4)
+        for _ in range(300):
+            comprimento = rng.randint(4, 8)
+            resultado = motifs.pwm([seq_aleatoria(rng, comprimento, comprimento) for _ in range(rng.randint(1, 6))],
+                                   rng.choice([0, 1, 0.3]))
+            seq = seq_aleatoria(rng, 4, 40, 'ACGTacgt')
+            self.assertEqual(motifs.prob_seq(seq[:comprimento], resultado), prob_seq_referencia(seq[:comprimento], resultado))
+            janelas = re.findall('(?=(....))', seq)
+            melhor = max(prob_seq_referencia(j, resultado) for j in janelas)
+            self.assertTrue(math.isclose(prob_seq_referencia(motifs.seq_provavel(seq, resultado), resultado), melhor))
+
+    def test_empate_fica_a_primeira_janela(self):
+        self.assertEqual(motifs.seq_provavel('CATAC', motifs.pwm(['CATA', 'ATAC'], 0.3)), 'CATA')
+
+
+class TestModeloPWM(unittest.TestCase):
+
+    def test_melhores(self):
+        rng = random.Random(5)
+        for _ in range(300):
+            comprimento = rng.randint(4, 8)
+            resultado = motifs.pwm([seq_aleatoria(rng, comprimento, comprimento) for _ in range(rng.randint(1, 6))],
+                                   rng.choice([0, 1, 0.3]))
+            seq = seq_aleatoria(rng, comprimento, 40)
+            k = rng.randint(1, 6)
+            scores = [prob_seq_referencia(seq[i:i + comprimento], resultado) for i in range(len(seq) - comprimento + 1)]
+            scores = [math.log(p) if p > 0 else -math.inf for p in scores]
+            esperado = sorted(range(len(scores)), key = lambda i: (-round(scores[i], 9), i))[:k]
+            top = motifs.ModeloPWM(resultado).melhores(seq, k)
+            self.assertEqual([round(x[2], 9) if x[2] != -math.inf else x[2] for x in top],
+                             [round(scores[i], 9) if scores[i] != -math.inf else scores[i] for i in esperado])
+            self.assertEqual([x[1] for x in top], esperado)
+            self.assertEqual([x[0] for x in top], [seq[i:i + comprimento] for i in esperado])
+
+
+class TestMatrizPWM(unittest.TestCase):
+
+    def test_scores_igual_a_forca_bruta(self):
+        rng = random.Random(6)
+        for _ in range(60):
+            comprimento = rng.randint(1, 10)
+            matriz = motifs.MatrizPWM.de_sequencias([seq_aleatoria(rng, comprimento, comprimento) for _ in range(5)],
+                                                    pseudo = rng.choice([0, 1]))
+            genoma = seq_aleatoria(rng, 0, 150, 'ACGTN')
+            for fonte in (genoma, PackedSeq(genoma)):
+                for cadeia in '+-':
+                    scores = matriz.scores(fonte, cadeia, bloco = rng.randint(1, 50))
+                    self.assertEqual(len(scores), max(0, len(genoma) - comprimento + 1))
+                    for i, score in enumerate(scores):
+                        janela = genoma[i:i + comprimento]
+                        if cadeia == '-':
+                            janela = janela.translate(COMPLEMENTO)[::-1]
+                        if 'N' in janela:
+                            self.assertEqual(score, -np.inf)
+                        else:
+                            esperado = sum(matriz.log_odds['ACGT'.index(c), j] for j, c in enumerate(janela))
+                            self.assertTrue(np.isclose(score, esperado) or score == esperado == -np.inf)
+            limiar = matriz.score_maximo() - 3
+            self.assertTrue(all(score >= limiar for _, _, score in matriz.procurar(genoma, limiar)))
+
+    def test_consenso(self):
+        matriz = motifs.MatrizPWM.de_sequencias(['ACGTACGTTGCA', 'ACGTACGTTGCC', 'ACGAACGTTGCA'])
+        self.assertEqual(matriz.consenso(), 'ACGTACGTTGCA')
+        self.assertAlmostEqual(matriz.score(matriz.consenso()), matriz.score_maximo())
+
+
+class TestProcurarMotif(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(9)
+        motif = 'TTGACAGCTA'
+        cls.seqs, cls.posicoes = [], []
+        for _ in range(20):
+            seq = [rng.choice('ACGT') for _ in range(100)]
+            posicao = rng.randint(0, 90)
+            sitio = list(motif)
+            sitio[rng.randrange(10)] = rng.choice('ACGT')
+            seq[posicao:posicao + 10] = sitio
+            cls.seqs.append(''.join(seq))
+            cls.posicoes.append(posicao)
+
+    def test_recupera_motif_plantado(self):
+        for modo in ('gibbs', 'em'):
+            posicoes, score = motifs.procurar_motif(self.seqs, 10, modo, reinicios = 4, semente = 1)
+            self.assertEqual(motifs.procurar_motif(self.seqs, 10, modo, reinicios = 4, semente = 1), (posicoes, score))
+            # O EM pode convergir para o motif desfasado de algumas bases; conta-se o desvio mais comum
+            desvio, n = Counter(a - b for a, b in zip(posicoes, self.posicoes)).most_common(1)[0]
+            self.assertGreaterEqual(n, 15)
+            self.assertLess(abs(desvio), 5 if modo == 'em' else 1)
+            sitios = motifs.sitios_motif(self.seqs, posicoes, 10)
+            self.assertEqual(sitios, [s[p:p + 10] for s, p in zip(self.seqs, posicoes)])
+
+
+if __name__ == '__main__':
+    unittest.main()